@@ -2,20 +2,85 @@ import sys
 import os
 import csv
 import random
-import pandas as pd
-from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent
+from PyQt5.QtMultimedia import QMediaPlayer
 from PyQt5.QtMultimediaWidgets import QVideoWidget
-from PyQt5.QtCore import QUrl, Qt, QTimer, QRegExp
-from PyQt5.QtWidgets import QApplication, QMainWindow, QLabel, QPushButton, QVBoxLayout, QWidget, QFileDialog, QGridLayout, QGroupBox, QDialog, QMessageBox, QLineEdit, QHBoxLayout
+from PyQt5.QtCore import Qt, QTimer, QRegExp
+from PyQt5.QtWidgets import QApplication, QMainWindow, QLabel, QPushButton, QVBoxLayout, QWidget, QFileDialog, QGroupBox, QDialog, QMessageBox, QLineEdit, QHBoxLayout
 from PyQt5.QtGui import QRegExpValidator
 from pathlib import Path
-from functools import partial
+from label_journal import LabelJournal
+from clip_order import ClipOrder, load_catalog, read_seed, write_seed, read_catalog, write_catalog
+
+# Modules shared by all apps live in "Shared/Source Code" at the top of the repository
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "Shared" / "Source Code"))
+from player_pool import PlayerPool
+from read_ahead import ReadAheadCache
+from proxy_cache import ProxyIndex, proxy_folder
+from clip_index import load_clip_names
+from response_panel import ResponsePanel
+from trial_state import TrialStateMachine
+from background_writer import shared_writer
+
+
+LEASE_RENEW_MS = 60 * 1000
+
+
+def open_label_store():
+    # The SQLite store is used when a labels.db exists next to the program
+    db_path = os.path.join(Path(sys.argv[0]).parent, 'labels.db')
+    if os.path.exists(db_path):
+        from label_store import LabelStore
+        # Labels are saved on the writer thread; the main thread only uses the
+        # store before labeling starts or after the writer was flushed
+        return LabelStore(db_path, check_same_thread=False)
+    return None
+
+
+def load_clip_catalog():
+    """Names of the clips below Clips relative to it, the catalog new users are created from.
+
+    The clip index only saves listing the folder; load_catalog lists the
+    subfolders the same way, so both give the same names.
+    """
+    script_folder = Path(sys.argv[0]).parent
+    return load_clip_names(script_folder, 'Clips') or load_catalog(os.path.join(script_folder, 'Clips'))
+
+
+def open_work_queue():
+    # Clips are leased from a work queue server when work_queue.txt holds its URL
+    config_path = os.path.join(Path(sys.argv[0]).parent, 'work_queue.txt')
+    if os.path.exists(config_path):
+        # Imported here, the HTTP modules only slow down the start of stations without a queue
+        from work_queue import WorkQueueClient
+        with open(config_path) as f:
+            return WorkQueueClient(f.read().strip())
+    return None
+
+
+def start_labeling(dialog, main_app, username):
+    try:
+        main_app.start_program(username)
+    except OSError as error:
+        # The work queue server is not reachable
+        QMessageBox.warning(dialog, "Server nicht erreichbar",
+                            f"Die Clips konnten nicht vom Server geladen werden. Bitte später erneut anmelden.\n\n{error}")
+        return False
+    return True
+
+
+def user_exists(username, label_store):
+    if label_store is not None:
+        return label_store.user_exists(username)
+    return os.path.exists(username)
 
 
 class NewUserDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
 
+        self.label_store = parent.label_store if parent is not None else open_label_store()
+        self.work_queue = parent.work_queue if parent is not None else open_work_queue()
+
         self.setWindowTitle("Neuen Benutzer erstellen")
         self.setGeometry(100, 100, 500, 250)
 
@@ -46,24 +111,31 @@ class NewUserDialog(QDialog):
 
     def on_done_click(self):
         username = self.username_input.text().lower()
-        if os.path.exists(username):
+        if user_exists(username, self.label_store):
             self.warning_label.show()
         else:
             self.create_user_folder(username)
-            self.main_app.start_program(username)
-            self.accept()
+            if start_labeling(self, self.main_app, username):
+                self.accept()
 
     def create_user_folder(self, username):
+        if self.label_store is not None:
+            if self.work_queue is None:
+                # Only the seed and the id of the shared catalog snapshot are stored for the user
+                self.label_store.create_seeded_user(username, load_clip_catalog(), random.getrandbits(63))
+            else:
+                # The clips are leased later, the user only needs to be registered
+                self.label_store.create_user(username, [])
+            self.instructions_label.setText("Warte...")
+            return
+
         if not os.path.exists(username):
             os.makedirs(username)
 
-        clip_filenames = os.listdir("Clips")
-        random.shuffle(clip_filenames)
-
-        with open(f"{username}/clips.csv", "w", newline="") as f:
-            writer = csv.writer(f)
-            for filename in clip_filenames:
-                writer.writerow([filename, "False", "None", "None", "None"])
+        # The clip order is derived from this seed and catalog, clips.csv only receives labeled clips
+        write_seed(username, random.getrandbits(63))
+        write_catalog(username, load_clip_catalog())
+        open(f"{username}/clips.csv", "w").close()
 
         self.instructions_label.setText("Warte...")
 
@@ -72,6 +144,9 @@ class LoginDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
 
+        self.label_store = open_label_store()
+        self.work_queue = open_work_queue()
+
         self.setWindowTitle("Anmelden oder Neu")
         self.setGeometry(100, 100, 500, 250)
 
@@ -101,11 +176,11 @@ class LoginDialog(QDialog):
 
     def on_done_click(self):
         username = self.username_input.text().lower()
-        if os.path.exists(username):
-            self.main_app = EmotionalRecognitionApp()
-            self.main_app.start_program(username)
-            self.main_app.show()
-            self.accept()
+        if user_exists(username, self.label_store):
+            self.main_app = EmotionalRecognitionApp(self.label_store, self.work_queue)
+            if start_labeling(self, self.main_app, username):
+                self.main_app.show()
+                self.accept()
         else:
             self.warning_label.show()
 
@@ -122,7 +197,7 @@ class LoginDialog(QDialog):
 
 
     def on_new_click(self):
-        self.main_app = EmotionalRecognitionApp()
+        self.main_app = EmotionalRecognitionApp(self.label_store, self.work_queue)
         new_user_dialog = NewUserDialog(self)
         new_user_dialog.main_app = self.main_app
         if new_user_dialog.exec() == QDialog.Accepted:
@@ -133,27 +208,32 @@ class LoginDialog(QDialog):
 
 
 class EmotionalRecognitionApp(QMainWindow):
-    def __init__(self):
+    def __init__(self, label_store=None, work_queue=None):
         super().__init__()
 
         self.username = None
+        self.label_store = label_store
+        self.work_queue = work_queue
+        self.lease_id = None
+        self.lease_expired = False
+        self.rejected_labels = []  # clips whose label the work queue did not take, filled on the writer thread
+        self.label_journal = None
+        self.writer = shared_writer()
 
         self.setWindowTitle("Emotional Recognition Testing via video")
         self.setGeometry(100, 100, 1280, 720)
 
         self.video_list = []  # List of video file paths
-        self.answers = []  # List to store answers
+        self.video_folder_path = os.path.join(Path(sys.argv[0]).parent, 'Clips')
+        # Transcoded proxies from proxy_cache.py are played instead of the originals when present
+        self.proxies = ProxyIndex(proxy_folder(Path(sys.argv[0]).parent, 'labeling'))
+        self.labels = []  # labels saved in this session, for the export
         self.correct_answers = {}
         
         self.current_video = None
         self.current_video_index = -1
+        self.skipped_clips = set()  # labeled or missing clips of a seeded order
         self.total_videos = 720
-        self.videos_done = 0
-        self.autosave_count = 0
-
-        self.selected_button1 = None
-        self.selected_button2 = None
-        self.selected_button3 = None
 
         self.selected_emotion1 = None
         self.selected_emotion2 = None
@@ -161,6 +241,12 @@ class EmotionalRecognitionApp(QMainWindow):
 
         self.init_ui()
 
+        if work_queue is not None:
+            # Renewed while a clip is on screen, so a break does not lose the leased clips
+            self.renew_timer = QTimer(self)
+            self.renew_timer.timeout.connect(self.renew_lease)
+            self.renew_timer.start(LEASE_RENEW_MS)
+
     def enable_next_button(self):
         self.next_button.setEnabled(True)
 
@@ -176,35 +262,13 @@ class EmotionalRecognitionApp(QMainWindow):
         self.layout.addWidget(self.video_widget, alignment=Qt.AlignCenter)  # Add alignment option to center the video widget
         self.video_widget.setFixedSize(640, 480)
 
-        self.media_player = QMediaPlayer(self, QMediaPlayer.VideoSurface)
-        self.media_player.setVideoOutput(self.video_widget)
-        self.media_player.setMuted(True)
-        self.media_player.stateChanged.connect(self.media_state_changed)
-
-        # Create group box 1 for dominant emotion
-        self.group_box1 = QGroupBox("Dominante Emotion", self)
-        grid_layout1 = QGridLayout()
-        self.group_box1.setLayout(grid_layout1)
-
-        # Create group box 2 for co-dominant emotion
-        self.group_box2 = QGroupBox("Co-Dominante Emotion", self)
-        grid_layout2 = QGridLayout()
-        self.group_box2.setLayout(grid_layout2)
-
-        # Create group box 3 for secondary emotions
-        self.group_box3 = QGroupBox("Sekundär Emotionen", self)
-        grid_layout3 = QGridLayout()
-        self.group_box3.setLayout(grid_layout3)
-
-        # Create lists for emotion buttons for each group box
-        self.emotion_buttons1 = []
-        self.emotion_buttons2 = []
-        self.emotion_buttons3 = []
-        
-        # Create separate variables for the selected button in each group box
-        self.selected_button1 = None
-        self.selected_button2 = None
-        self.selected_button3 = None
+        self.player_pool = PlayerPool(self, self.video_widget, flags=QMediaPlayer.VideoSurface, muted=True,
+                                      read_ahead=ReadAheadCache())
+        # The emotion buttons open once the clip really plays and close while the label is saved
+        self.trial_state = TrialStateMachine(self, self.player_pool)
+        self.trial_state.responseWindowOpened.connect(self.enable_emotion_buttons)
+        self.trial_state.responseWindowClosed.connect(self.disable_emotion_buttons)
+        self.media_player = self.player_pool.current
 
         emotions = [
             ("Angst"),
@@ -231,34 +295,29 @@ class EmotionalRecognitionApp(QMainWindow):
             ("None")
         ]
 
-        for index, (emotion) in enumerate(emotions):
-            button1 = QPushButton(emotion, self)
-            button1.setStyleSheet(f"color: black")
-            button1.clicked.connect(partial(self.on_emotion_click1, button1))
-            button1.setEnabled(False)
-
-            row, col = divmod(index, 3)  # Aufteilung in 2 Zeilen und 3 Spalten
-            grid_layout1.addWidget(button1, row, col)
-            self.emotion_buttons1.append(button1)
-
-        for index, (emotion) in enumerate(coemotions):
-            button2 = QPushButton(emotion, self)
-            button2.setStyleSheet(f"color: black")
-            button2.clicked.connect(partial(self.on_emotion_click2, button2))  
-            button2.setEnabled(False)
-            row, col = divmod(index, 3)
-            grid_layout2.addWidget(button2, row, col)
-            self.emotion_buttons2.append(button2)
-
-        for index, (emotion) in enumerate(secondaryemotions):
-            button3 = QPushButton(emotion, self)
-            button3.setStyleSheet(f"color: black")
-            button3.clicked.connect(partial(self.on_emotion_click3, button3))
-            button3.setEnabled(False)
-
-            row, col = divmod(index, 3)  # Aufteilung in 2 Zeilen und 3 Spalten
-            grid_layout3.addWidget(button3, row, col)
-            self.emotion_buttons3.append(button3)
+        # One response panel per group box, 2 rows and 3 columns each; the selected button turns grey
+        self.response_panel1 = ResponsePanel(emotions, self, columns=3, selectable=True)
+        self.response_panel1.selected.connect(self.on_emotion_click1)
+        self.response_panel2 = ResponsePanel(coemotions, self, columns=3, selectable=True)
+        self.response_panel2.selected.connect(self.on_emotion_click2)
+        self.response_panel3 = ResponsePanel(secondaryemotions, self, columns=3, selectable=True)
+        self.response_panel3.selected.connect(self.on_emotion_click3)
+        self.response_panels = [self.response_panel1, self.response_panel2, self.response_panel3]
+
+        # Create group box 1 for dominant emotion
+        self.group_box1 = QGroupBox("Dominante Emotion", self)
+        QVBoxLayout(self.group_box1).addWidget(self.response_panel1)
+
+        # Create group box 2 for co-dominant emotion
+        self.group_box2 = QGroupBox("Co-Dominante Emotion", self)
+        QVBoxLayout(self.group_box2).addWidget(self.response_panel2)
+
+        # Create group box 3 for secondary emotions
+        self.group_box3 = QGroupBox("Sekundär Emotionen", self)
+        QVBoxLayout(self.group_box3).addWidget(self.response_panel3)
+
+        for panel in self.response_panels:
+            panel.setEnabled(False)
 
         hbox_layout = QHBoxLayout()
         hbox_layout.addWidget(self.group_box1)
@@ -289,10 +348,32 @@ class EmotionalRecognitionApp(QMainWindow):
 
     def load_video_list(self, username):
         script_folder = Path(sys.argv[0]).parent
-        video_folder = 'Clips'
-        video_folder_path = os.path.join(script_folder, video_folder)
+        video_folder_path = self.video_folder_path
         csv_file_path = os.path.join(script_folder, username, 'clips.csv')
-        
+
+        if self.label_store is not None:
+            order = self.label_store.clip_order(username)
+            if order is not None:
+                catalog, seed = order
+                self.load_seeded_video_list(self.label_store.labeled_clips(username), catalog, seed)
+                return
+            for filename in self.label_store.pending_clips(username):
+                self.video_list.append(os.path.join(video_folder_path, filename))
+            return
+
+        user_folder = os.path.join(script_folder, username)
+        seed = read_seed(user_folder)
+        if seed is not None:
+            with open(csv_file_path, 'r', newline='') as f:
+                labeled = {row[0] for row in csv.reader(f)}
+            catalog = read_catalog(user_folder)
+            if catalog is None:
+                # Users from before catalog snapshots keep the order of today's catalog from now on
+                catalog = load_clip_catalog()
+                write_catalog(user_folder, catalog)
+            self.load_seeded_video_list(labeled, catalog, seed)
+            return
+
         try:
             with open(csv_file_path, 'r') as f:
                 reader = csv.reader(f)
@@ -305,6 +386,20 @@ class EmotionalRecognitionApp(QMainWindow):
         except PermissionError:
             print(f"No permission to read the file {csv_file_path}.")
 
+    def load_seeded_video_list(self, labeled, catalog, seed):
+        current = load_clip_catalog()
+        self.video_list = ClipOrder(catalog, seed, self.video_folder_path)
+
+        # Labeled clips are skipped wherever they are in the order, clips removed from the folder as well
+        missing = set(catalog).difference(current)
+        if missing:
+            print(f"{len(missing)} Clips aus der Reihenfolge von {self.username} fehlen im Ordner und werden übersprungen.")
+        self.skipped_clips = labeled | missing
+
+    def clip_name(self, path):
+        # Clips in subfolders of Clips are named by their path below it, like in the catalog
+        return os.path.relpath(path, self.video_folder_path)
+
     def on_repeat_click(self):
         """Diese Funktion spielt das aktuelle Video erneut ab."""
         self.media_player.setPosition(0) # Setzt die Position des Media Players auf den Anfang des Videos
@@ -312,112 +407,130 @@ class EmotionalRecognitionApp(QMainWindow):
 
     def start_program(self, username):
         self.username = username
-        self.load_video_list(username)
+        if self.work_queue is not None:
+            self.lease_next_clips()
+        else:
+            if self.label_store is None:
+                script_folder = Path(sys.argv[0]).parent
+                self.label_journal = LabelJournal(os.path.join(script_folder, username))
+                # Replay labels left in the journal by an earlier session
+                self.label_journal.compact()
+            self.load_video_list(username)
         self.play_next_video()
 
+    def lease_next_clips(self):
+        # Commits of the old lease have to reach the server first
+        self.flush_writer()
+        self.lease_id, clip_filenames = self.work_queue.lease(self.username)
+        for filename in clip_filenames:
+            self.video_list.append(os.path.join(self.video_folder_path, filename))
+        return len(clip_filenames) > 0
+
     def play_next_video(self):
-        for button in self.emotion_buttons1:
-            button.setStyleSheet(None)
-            button.setStyleSheet(f"background-color: {button.palette().button().color().name()}; color: black")
-        for button in self.emotion_buttons2:
-            button.setStyleSheet(None)
-            button.setStyleSheet(f"background-color: {button.palette().button().color().name()}; color: black")
-        for button in self.emotion_buttons3:
-            button.setStyleSheet(None)
-            button.setStyleSheet(f"background-color: {button.palette().button().color().name()}; color: black")
-
-        # Write selected emotions to CSV
+        for panel in self.response_panels:
+            panel.reset()
+
+        # Save selected emotions to the label store or journal
         if self.selected_emotion1 is not None or self.selected_emotion3 is not None:
-            script_folder = Path(sys.argv[0]).parent
-            csv_file_path = os.path.join(script_folder, self.username, 'clips.csv')
-
-            # Temporäre Liste für die aktualisierten Zeilen
-            updated_rows = []
-            
-            with open(csv_file_path, 'r', newline='') as csvfile:
-                reader = csv.reader(csvfile)
-                # Durchlaufen der Zeilen der CSV-Datei
-                for row in reader:
-                    # Überprüfen, ob die aktuelle Zeile das aktuelle Video enthält
-                    if row[0] == os.path.basename(self.current_video):
-                        # Aktualisieren der Werte in den Spalten 2, 3 und 4
-                        row[1] = 'True'
-                        row[2] = self.selected_emotion1 if self.selected_emotion1 is not None else 'None'
-                        row[3] = self.selected_emotion2 if self.selected_emotion2 is not None else 'None'
-                        row[4] = self.selected_emotion3 if self.selected_emotion3 is not None else 'None'
-
-                    # Hinzufügen der aktualisierten Zeile zur Liste
-                    updated_rows.append(row)
-
-            # Überschreiben der CSV-Datei mit den aktualisierten Daten
-            with open(csv_file_path, 'w', newline='') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerows(updated_rows)
+            self.trial_state.respond()
+            label = (
+                self.clip_name(self.current_video),
+                self.selected_emotion1 if self.selected_emotion1 is not None else 'None',
+                self.selected_emotion2 if self.selected_emotion2 is not None else 'None',
+                self.selected_emotion3 if self.selected_emotion3 is not None else 'None',
+            )
+            self.labels.append(label)
+            if self.work_queue is not None:
+                save = self.commit_label
+                label = (self.lease_id,) + label
+            elif self.label_store is not None:
+                save = self.label_store.save_label
+                label = (self.username,) + label
+            else:
+                save = self.label_journal.append
+            # Saved on the writer thread so the next clip starts without waiting for the disk;
+            # relabeling a clip before its save ran only keeps the newer label
+            self.writer.submit(save, *label, key=('label', self.clip_name(self.current_video)))
 
         self.selected_emotion1 = None
         self.selected_emotion2 = None
         self.selected_emotion3 = None
         self.next_button.setEnabled(False)
 
+        self.warn_rejected_labels()
+        if self.lease_expired:
+            # The other clips of an expired lease may be with other labelers by now
+            del self.video_list[self.current_video_index + 1:]
+            self.lease_expired = False
+
         self.current_video_index += 1
+        while self.current_video_index < len(self.video_list) and \
+                self.clip_name(self.video_list[self.current_video_index]) in self.skipped_clips:
+            self.current_video_index += 1
+        if self.current_video_index == len(self.video_list) and self.work_queue is not None:
+            try:
+                self.lease_next_clips()
+            except OSError as error:
+                self.current_video_index -= 1
+                self.next_button.setEnabled(True)
+                QMessageBox.warning(self, "Server nicht erreichbar",
+                                    f"Es konnten keine weiteren Clips geladen werden. Bitte gleich erneut auf Weiter klicken.\n\n{error}")
+                return
         if self.current_video_index < len(self.video_list):
             self.current_video = self.video_list[self.current_video_index]
-            self.media_player.setMedia(QMediaContent(QUrl.fromLocalFile(os.path.abspath(self.current_video))))
-            self.media_player.play()
+            upcoming = self.video_list[self.current_video_index + 1:
+                                       self.current_video_index + 1 + self.player_pool.lookahead]
+            self.media_player = self.player_pool.play(self.proxies.resolve(self.current_video),
+                                                      [self.proxies.resolve(path) for path in upcoming])
+            self.trial_state.start_trial(self.media_player)
         else:
             self.show_export_button()
 
-    def on_emotion_click1(self, emotion):
-        if self.selected_button1:
-            self.selected_button1.setStyleSheet(f"background-color: {self.selected_button_color}; color: black")
-        self.selected_button1 = self.sender()
-        self.selected_button_color = self.selected_button1.palette().button().color().name()
-        self.selected_button1.setStyleSheet(f"background-color: #A9A9A9; color: black")
+    def commit_label(self, lease_id, filename, emotion1, emotion2, emotion3):
+        # Runs on the writer thread; an expired lease is taken over again by the server if it can
+        if not self.work_queue.commit(lease_id, filename, emotion1, emotion2, emotion3, user=self.username):
+            self.rejected_labels.append(filename)
 
-        self.selected_emotion1 = emotion.text()
-        self.enable_next_button()
+    def renew_lease(self):
+        if self.lease_id is not None:
+            self.writer.submit(self._renew_lease, self.lease_id, key=('renew', self.lease_id))
 
+    def _renew_lease(self, lease_id):
+        try:
+            renewed = self.work_queue.renew(lease_id)
+        except OSError:
+            return  # tried again with the next timeout
+        if not renewed and lease_id == self.lease_id:
+            self.lease_expired = True
+
+    def warn_rejected_labels(self):
+        filenames = []
+        while self.rejected_labels:
+            filenames.append(self.rejected_labels.pop(0))
+        if filenames:
+            QMessageBox.warning(self, "Labels nicht gespeichert",
+                                "Der Server hat die Labels dieser Clips nicht angenommen, sie wurden inzwischen "
+                                "von anderen gelabelt:\n\n" + "\n".join(filenames))
 
+    def on_emotion_click1(self, emotion):
+        self.selected_emotion1 = emotion
+        self.enable_next_button()
 
     def on_emotion_click2(self, emotion):
-        if self.selected_button2:
-            self.selected_button2.setStyleSheet(f"background-color: {self.selected_button_color}; color: black")
-        self.selected_button2 = self.sender()
-        self.selected_button_color = self.selected_button2.palette().button().color().name()
-        self.selected_button2.setStyleSheet(f"background-color: #A9A9A9; color: black")
-        self.selected_emotion2 = emotion.text()
+        self.selected_emotion2 = emotion
         # self.enable_next_button()
 
-
-
     def on_emotion_click3(self, emotion):
-        if self.selected_button3:
-            self.selected_button3.setStyleSheet(f"background-color: {self.selected_button_color}; color: black")
-        self.selected_button3 = self.sender()
-        self.selected_button_color = self.selected_button3.palette().button().color().name()
-        self.selected_button3.setStyleSheet(f"background-color: #A9A9A9; color: black")
-        self.selected_emotion3 = emotion.text()
+        self.selected_emotion3 = emotion
         self.enable_next_button()
 
-
-    def on_back_click(self):
-        if self.videos_done > 0:
-            self.videos_done -= 1
-            self.autosave_count -= 1
-            self.current_video_index -= 2
-            self.answers.pop()
-            self.play_next_video()
-
-    def media_state_changed(self, state):
-        QTimer.singleShot(1000, self.enable_emotion_buttons)
-
     def enable_emotion_buttons(self):
-        for button in self.emotion_buttons1:
-            button.setEnabled(True) 
-        for button in self.emotion_buttons2:
-            button.setEnabled(True) 
-        for button in self.emotion_buttons3:
-            button.setEnabled(True)      
+        for panel in self.response_panels:
+            panel.setEnabled(True)
+
+    def disable_emotion_buttons(self):
+        for panel in self.response_panels:
+            panel.setEnabled(False)
 
     def on_export_click(self):
         options = QFileDialog.Options()
@@ -434,18 +547,40 @@ class EmotionalRecognitionApp(QMainWindow):
 
 
     def export_results(self, file_name):
-        data = {"Video": self.video_list[:len(self.answers)], "Answer": self.answers}
-        df = pd.DataFrame(data)
-        df.to_csv(file_name, index=False)
+        with open(file_name, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["Video", "Emotion1", "Emotion2", "Emotion3"])
+            writer.writerows(self.labels)
 
-    def save_progress(self):
-        data = {"Video": self.video_list[:len(self.answers)], "Answer": self.answers}
-        df = pd.DataFrame(data)
-        df.to_csv("Video-test-progress"+str(self.autosave_count)+".csv", index=False)
+    def flush_writer(self):
+        # The writer retries failed saves; what still failed is shown once here
+        try:
+            self.writer.flush()
+        except Exception as error:
+            QMessageBox.warning(self, "Speichern fehlgeschlagen",
+                                f"Mindestens ein Label konnte nicht gespeichert werden:\n\n{error}")
 
     def show_export_button(self):
+        self.flush_writer()
+        self.warn_rejected_labels()
+        if self.label_journal is not None:
+            self.label_journal.compact()
         self.export_button.show()
 
+    def closeEvent(self, event):
+        self.flush_writer()
+        if self.label_journal is not None:
+            self.label_journal.compact()
+        if self.work_queue is not None:
+            # Hand unlabeled clips back right away instead of waiting for the lease to expire
+            if self.lease_id is not None:
+                try:
+                    self.work_queue.release(self.lease_id)
+                except OSError:
+                    pass  # the lease expires on the server instead
+            self.work_queue.close()
+        super().closeEvent(event)
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     
@@ -0,0 +1,169 @@
+import os
+import csv
+import argparse
+import numpy as np
+from build_dataset import CATEGORIES, collect_labels
+
+MISSING = -1
+
+
+class LabelMatrix:
+    """Dense users x clips x category matrix of int8 answer codes.
+
+    Codes index into the answer lists of build_dataset.CATEGORIES; MISSING
+    marks clips a user has not labeled.
+    """
+
+    def __init__(self, codes, users, clips):
+        self.codes = codes
+        self.users = users
+        self.clips = clips
+
+    @classmethod
+    def from_labels(cls, labels):
+        """Build from {user: [(clip, dominant, codominant, secondary)]} as returned by collect_labels."""
+        users = sorted(labels)
+        clips = sorted({row[0] for rows in labels.values() for row in rows})
+        clip_index = {clip: i for i, clip in enumerate(clips)}
+        lookups = [{value: code for code, value in enumerate(values)} for _, values in CATEGORIES]
+
+        codes = np.full((len(users), len(clips), len(CATEGORIES)), MISSING, dtype=np.int8)
+        for u, user in enumerate(users):
+            rows = labels[user]
+            if not rows:
+                continue
+            columns = list(zip(*rows))
+            clip_positions = np.fromiter((clip_index[clip] for clip in columns[0]), dtype=np.int64, count=len(rows))
+            for c, lookup in enumerate(lookups):
+                codes[u, clip_positions, c] = np.fromiter((lookup.get(value, MISSING) for value in columns[c + 1]),
+                                                          dtype=np.int8, count=len(rows))
+        return cls(codes, users, clips)
+
+    @classmethod
+    def from_table(cls, table):
+        """Build from the Arrow table written by build_dataset.py without touching rows in Python."""
+        table = table.unify_dictionaries().combine_chunks()
+        clip_column = table.column("clip").chunk(0)
+        user_column = table.column("user").chunk(0)
+        clips = clip_column.dictionary.to_pylist()
+        users = user_column.dictionary.to_pylist()
+
+        codes = np.full((len(users), len(clips), len(CATEGORIES)), MISSING, dtype=np.int8)
+        clip_positions = clip_column.indices.to_numpy()
+        user_positions = user_column.indices.to_numpy()
+        for c, (name, _) in enumerate(CATEGORIES):
+            values = table.column(name).chunk(0).indices.to_numpy(zero_copy_only=False)
+            codes[user_positions, clip_positions, c] = np.nan_to_num(values, nan=MISSING).astype(np.int8)
+        return cls(codes, users, clips)
+
+    def counts(self, category):
+        """clips x options matrix with the number of users choosing each option."""
+        options = len(CATEGORIES[category][1])
+        codes = self.codes[:, :, category]
+        counts = np.empty((codes.shape[1], options), dtype=np.int32)
+        for option in range(options):
+            counts[:, option] = np.count_nonzero(codes == option, axis=0)
+        return counts
+
+
+def fleiss_kappa(counts):
+    """Fleiss' kappa, generalised to a varying number of raters per clip."""
+    raters = counts.sum(axis=1)
+    rated = raters >= 2
+    counts = counts[rated].astype(np.float64)
+    raters = raters[rated].astype(np.float64)
+    if len(raters) == 0:
+        return float('nan')
+
+    per_clip = ((counts ** 2).sum(axis=1) - raters) / (raters * (raters - 1))
+    p_observed = per_clip.mean()
+    proportions = counts.sum(axis=0) / raters.sum()
+    p_expected = (proportions ** 2).sum()
+    if p_expected == 1:
+        return 1.0
+    return float((p_observed - p_expected) / (1 - p_expected))
+
+
+def krippendorff_alpha(counts):
+    """Krippendorff's alpha for nominal data from a clips x options count matrix."""
+    raters = counts.sum(axis=1)
+    pairable = raters >= 2
+    counts = counts[pairable].astype(np.float64)
+    weights = 1.0 / (raters[pairable] - 1)
+
+    # Coincidence matrix: o[c, k] = sum over clips of n_c * n_k / (m - 1), minus the self pairs
+    weighted = counts * weights[:, None]
+    coincidences = weighted.T @ counts
+    coincidences[np.diag_indices_from(coincidences)] -= weighted.sum(axis=0)
+
+    totals = coincidences.sum(axis=1)
+    n = totals.sum()
+    if n <= 1:
+        return float('nan')
+    disagreement_observed = n - np.trace(coincidences)
+    disagreement_expected = (n ** 2 - (totals ** 2).sum()) / (n - 1)
+    if disagreement_expected == 0:
+        return 1.0
+    return float(1 - disagreement_observed / disagreement_expected)
+
+
+def clip_statistics(counts):
+    """Per clip: majority option, share of the majority and answer entropy in bits."""
+    raters = counts.sum(axis=1)
+    majority = counts.argmax(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shares = counts / raters[:, None]
+        majority_share = np.where(raters > 0, shares.max(axis=1), np.nan)
+        entropy = np.where(shares > 0, shares * np.log2(1 / shares), 0).sum(axis=1)
+    majority = np.where(raters > 0, majority, MISSING)
+    return raters, majority, majority_share, entropy
+
+
+def load_matrix(source, workers=None):
+    if os.path.isdir(source):
+        labels, _ = collect_labels(source, os.path.join(source, '.dataset_cache.pickle'), workers)
+        return LabelMatrix.from_labels(labels)
+    if source.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return LabelMatrix.from_table(pq.read_table(source))
+    import pyarrow as pa
+    with pa.memory_map(source, 'r') as f:
+        return LabelMatrix.from_table(pa.ipc.open_file(f).read_all())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inter-rater agreement of the labeling results.")
+    parser.add_argument("source", help="folder with user folders, or a dataset written by build_dataset.py")
+    parser.add_argument("--clips", help="write per-clip statistics, most ambiguous clips first, to this CSV file")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes for parsing")
+    args = parser.parse_args()
+
+    matrix = load_matrix(args.source, args.workers)
+    print(f"{len(matrix.users)} Benutzer, {len(matrix.clips)} Clips")
+
+    per_clip = {}
+    for c, (name, values) in enumerate(CATEGORIES):
+        counts = matrix.counts(c)
+        print(f"{name}: Fleiss' kappa {fleiss_kappa(counts):.4f}, Krippendorff's alpha {krippendorff_alpha(counts):.4f}")
+        per_clip[name] = (values, clip_statistics(counts))
+
+    if args.clips:
+        # Sort by entropy of the dominant emotion, the most disputed clips first
+        order = np.argsort(-np.nan_to_num(per_clip["dominant"][1][3], nan=-1), kind='stable')
+        with open(args.clips, 'w', newline='') as f:
+            writer = csv.writer(f)
+            header = ["Clip", "Raters"]
+            for name, _ in CATEGORIES:
+                header += [f"{name} majority", f"{name} share", f"{name} entropy"]
+            writer.writerow(header)
+            for i in order:
+                row = [matrix.clips[i], int(per_clip["dominant"][1][0][i])]
+                for name, _ in CATEGORIES:
+                    values, (_, majority, share, entropy) = per_clip[name]
+                    row += [values[majority[i]] if majority[i] != MISSING else "",
+                            f"{share[i]:.3f}", f"{entropy[i]:.3f}"]
+                writer.writerow(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import os
+import csv
+import pickle
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from label_journal import LabelJournal
+
+# Answer options of the three button groups in APP.py
+DOMINANT = ["Angst", "Freude", "Trauer", "Wut", "Ekel", "Neutral"]
+CODOMINANT = ["Angst", "Freude", "Trauer", "Wut", "Ekel", "None"]
+SECONDARY = ["Scham", "Schuld", "Frustration", "Verwirrung", "Enttaeuschung", "None"]
+CATEGORIES = [("dominant", DOMINANT), ("codominant", CODOMINANT), ("secondary", SECONDARY)]
+
+LABEL_FILES = ('clips.csv', 'clips.journal')
+
+
+def folder_signature(user_folder):
+    signature = []
+    for name in LABEL_FILES:
+        try:
+            stat = os.stat(os.path.join(user_folder, name))
+            signature.append((name, stat.st_size, stat.st_mtime_ns))
+        except FileNotFoundError:
+            signature.append((name, None, None))
+    return tuple(signature)
+
+
+def read_user_labels(user_folder):
+    """Return [(clip, dominant, codominant, secondary)] for all labeled clips of one user.
+
+    Journal records that were not compacted yet take precedence over clips.csv.
+    The files are only read, a running labeling session is not disturbed.
+    """
+    labels = {}
+    csv_path = os.path.join(user_folder, 'clips.csv')
+    if os.path.exists(csv_path):
+        with open(csv_path, 'r', newline='') as f:
+            for row in csv.reader(f):
+                if len(row) == 5 and row[1] == 'True':
+                    labels[row[0]] = (row[2], row[3], row[4])
+
+    journal_path = os.path.join(user_folder, 'clips.journal')
+    if os.path.exists(journal_path):
+        with open(journal_path, 'r', newline='', encoding='utf-8') as f:
+            for line in f:
+                row = LabelJournal.decode(line)
+                if row is None:
+                    break
+                labels[row[0]] = (row[1], row[2], row[3])
+
+    return [(clip, *label) for clip, label in labels.items()]
+
+
+def _parse_folder(user_folder):
+    return folder_signature(user_folder), read_user_labels(user_folder)
+
+
+def find_user_folders(folder):
+    return sorted(entry.path for entry in os.scandir(folder)
+                  if entry.is_dir() and os.path.exists(os.path.join(entry.path, 'clips.csv')))
+
+
+def collect_labels(folder, cache_path=None, workers=None):
+    """Parse all user folders below folder; unchanged folders are taken from the cache."""
+    cache = {}
+    if cache_path is not None and os.path.exists(cache_path):
+        with open(cache_path, 'rb') as f:
+            cache = pickle.load(f)
+
+    user_folders = find_user_folders(folder)
+    changed = [user_folder for user_folder in user_folders
+               if user_folder not in cache or cache[user_folder][0] != folder_signature(user_folder)]
+
+    if changed:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for user_folder, result in zip(changed, executor.map(_parse_folder, changed, chunksize=8)):
+                cache[user_folder] = result
+
+    cache = {user_folder: cache[user_folder] for user_folder in user_folders}
+    if cache_path is not None:
+        temp_path = cache_path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+
+    labels = {os.path.basename(user_folder): rows for user_folder, (_, rows) in cache.items()}
+    return labels, len(changed)
+
+
+def build_table(labels):
+    """Columnar table keyed by clip and user; emotions are int8 dictionary codes."""
+    import pyarrow as pa
+
+    clips = []
+    users = []
+    codes = {name: [] for name, _ in CATEGORIES}
+    lookups = {name: {value: code for code, value in enumerate(values)} for name, values in CATEGORIES}
+
+    for user, rows in labels.items():
+        for clip, *emotions in rows:
+            clips.append(clip)
+            users.append(user)
+            for (name, _), emotion in zip(CATEGORIES, emotions):
+                codes[name].append(lookups[name].get(emotion))
+
+    columns = {
+        "clip": pa.array(clips, pa.string()).dictionary_encode(),
+        "user": pa.array(users, pa.string()).dictionary_encode(),
+    }
+    for name, values in CATEGORIES:
+        columns[name] = pa.DictionaryArray.from_arrays(pa.array(codes[name], pa.int8()), pa.array(values))
+    return pa.table(columns)
+
+
+def write_table(table, output_path):
+    if output_path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        pq.write_table(table, output_path)
+    else:
+        import pyarrow as pa
+        with pa.OSFile(output_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge the labels of all user folders into one dataset.")
+    parser.add_argument("folder", help="folder that contains the user folders")
+    parser.add_argument("output", help="output file, .parquet or .arrow (Arrow IPC)")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--full", action="store_true", help="ignore the cache and parse every folder")
+    args = parser.parse_args()
+
+    cache_path = os.path.join(args.folder, '.dataset_cache.pickle')
+    if args.full and os.path.exists(cache_path):
+        os.remove(cache_path)
+
+    labels, parsed = collect_labels(args.folder, cache_path, args.workers)
+    table = build_table(labels)
+    write_table(table, args.output)
+    print(f"{len(labels)} Benutzer, {parsed} neu eingelesen, {table.num_rows} Labels nach {args.output} geschrieben.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+import os
+import csv
+import uuid
+import hashlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from clip_staging import _copy_and_hash, hash_file
+
+PARTIAL_SIZE = 64 * 1024
+
+
+def partial_hash(path, size):
+    # Head and tail of the file; clips that differ usually differ there already
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        digest.update(f.read(PARTIAL_SIZE))
+        if size > 2 * PARTIAL_SIZE:
+            f.seek(-PARTIAL_SIZE, os.SEEK_END)
+            digest.update(f.read(PARTIAL_SIZE))
+    return digest.hexdigest()
+
+
+class HashCache:
+    """Partial and full hashes keyed by path, size and mtime, stored as CSV."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if path is not None and os.path.exists(path):
+            with open(path, 'r', newline='') as f:
+                for row in csv.reader(f):
+                    if len(row) == 5:
+                        self.entries[row[0]] = (int(row[1]), int(row[2]), row[3], row[4])
+        self.changed = False
+
+    def get(self, path, stat):
+        entry = self.entries.get(path)
+        if entry is None or entry[0] != stat.st_size or entry[1] != stat.st_mtime_ns:
+            return '', ''
+        return entry[2], entry[3]
+
+    def put(self, path, stat, partial='', full=''):
+        old_partial, old_full = self.get(path, stat)
+        self.entries[path] = (stat.st_size, stat.st_mtime_ns, partial or old_partial, full or old_full)
+        self.changed = True
+
+    def save(self):
+        if self.path is None or not self.changed:
+            return
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            for path, (size, mtime_ns, partial, full) in self.entries.items():
+                writer.writerow([path, size, mtime_ns, partial, full])
+        os.replace(temp_path, self.path)
+        self.changed = False
+
+
+class ClipDeduplicator:
+    """Finds clips with identical content below source_dir.
+
+    Files are compared by size first; only files sharing a size get a partial
+    hash, and only files sharing size and partial hash get a full hash. All
+    hashes are cached, so a rerun over an unchanged corpus only stats files.
+    """
+
+    def __init__(self, source_dir, cache_path=None, workers=8):
+        self.source_dir = source_dir
+        self.cache = HashCache(cache_path)
+        self.workers = workers
+
+    def _stats(self, names, executor):
+        paths = [os.path.join(self.source_dir, name) for name in names]
+        stats = {}
+        for name, stat in zip(names, executor.map(_stat_or_none, paths)):
+            if stat is not None:
+                stats[name] = stat
+        return stats
+
+    def _hash(self, names, stats, executor, kind):
+        """Fill the cache with partial or full hashes of names, in parallel; returns {name: hash}."""
+        index = 0 if kind == 'partial' else 1
+        hashes = {}
+        missing = []
+        for name in names:
+            cached = self.cache.get(os.path.join(self.source_dir, name), stats[name])[index]
+            if cached:
+                hashes[name] = cached
+            else:
+                missing.append(name)
+
+        def compute(name):
+            path = os.path.join(self.source_dir, name)
+            return partial_hash(path, stats[name].st_size) if kind == 'partial' else hash_file(path)
+
+        for name, value in zip(missing, executor.map(compute, missing)):
+            hashes[name] = value
+            path = os.path.join(self.source_dir, name)
+            if kind == 'partial':
+                self.cache.put(path, stats[name], partial=value)
+            else:
+                self.cache.put(path, stats[name], full=value)
+        return hashes
+
+    def _candidates(self, names, stats, executor):
+        """Names that may have duplicates, with their full hashes."""
+        by_size = defaultdict(list)
+        for name in names:
+            by_size[stats[name].st_size].append(name)
+        same_size = [name for group in by_size.values() if len(group) > 1 for name in group]
+
+        partials = self._hash(same_size, stats, executor, 'partial')
+        by_partial = defaultdict(list)
+        for name in same_size:
+            by_partial[(stats[name].st_size, partials[name])].append(name)
+        same_partial = [name for group in by_partial.values() if len(group) > 1 for name in group]
+
+        return self._hash(same_partial, stats, executor, 'full')
+
+    def find_duplicates(self, names):
+        """Return {representative: [duplicates]} for every content that occurs more than once.
+
+        The representative is the first name in sorted order.
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            stats = self._stats(names, executor)
+            full_hashes = self._candidates(sorted(stats), stats, executor)
+        self.cache.save()
+
+        by_hash = defaultdict(list)
+        for name in sorted(full_hashes):
+            by_hash[full_hashes[name]].append(name)
+        return {group[0]: group[1:] for group in by_hash.values() if len(group) > 1}
+
+    def unique(self, names):
+        """names without duplicates, keeping the original order."""
+        duplicates = {name for group in self.find_duplicates(names).values() for name in group}
+        return [name for name in names if name not in duplicates]
+
+    def store(self, names, store_dir):
+        """Copy every distinct clip once into store_dir/objects/<ab>/<hash><ext>.
+
+        Writes store_dir/names.csv mapping each name to its hash and returns
+        that mapping. Clips whose size is unique are hashed while they are
+        copied in, so they are read only once.
+        """
+        objects_dir = os.path.join(store_dir, 'objects')
+        os.makedirs(objects_dir, exist_ok=True)
+
+        def object_path(file_hash, name):
+            return os.path.join(objects_dir, file_hash[:2], file_hash + os.path.splitext(name)[1].lower())
+
+        def store_one(name):
+            path = os.path.join(self.source_dir, name)
+            file_hash = self.cache.get(path, stats[name])[1] or full_hashes.get(name, '')
+            if file_hash:
+                target_path = object_path(file_hash, name)
+                if os.path.exists(target_path):
+                    return file_hash
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                temp_path = os.path.join(objects_dir, uuid.uuid4().hex + '.part')
+                _copy_and_hash(path, temp_path, False)
+            else:
+                temp_path = os.path.join(objects_dir, uuid.uuid4().hex + '.part')
+                file_hash = _copy_and_hash(path, temp_path, True)
+                target_path = object_path(file_hash, name)
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            os.replace(temp_path, target_path)
+            return file_hash
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            stats = self._stats(names, executor)
+            full_hashes = self._candidates(sorted(stats), stats, executor)
+            # Candidates sharing a hash would race for the same object, store one of each first
+            names = sorted(stats)
+            first = {}
+            for name in names:
+                first.setdefault(full_hashes.get(name, name), name)
+            hashes = dict(zip(first.values(), executor.map(store_one, first.values())))
+            for name in names:
+                if name not in hashes:
+                    hashes[name] = hashes[first[full_hashes[name]]]
+
+        for name, file_hash in hashes.items():
+            self.cache.put(os.path.join(self.source_dir, name), stats[name], full=file_hash)
+        self.cache.save()
+
+        with open(os.path.join(store_dir, 'names.csv'), 'w', newline='') as f:
+            csv.writer(f).writerows(sorted(hashes.items()))
+        return hashes
+
+
+def sample_unique(deduplicator, make_sampler, names):
+    """A sampler filled from names() whose sample holds every clip content once.
+
+    Only the sample is hashed, so memory and hashing stay bounded by the
+    sample size. When two selected clips turn out to be identical, all but
+    the first name in sorted order are left out and the sample is taken
+    again; names() is called once per pass, e.g. a walk_files() generator.
+    Returns the sampler and the names left out.
+    """
+    excluded = set()
+    while True:
+        sampler = make_sampler()
+        for name in names():
+            if name not in excluded:
+                sampler.add(name)
+        duplicates = deduplicator.find_duplicates(sampler.sample())
+        if not duplicates:
+            return sampler, excluded
+        excluded.update(name for group in duplicates.values() for name in group)
+
+
+def _stat_or_none(path):
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,127 @@
+import os
+
+# Same file types as the clip index, so both catalogs list the same clips
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.avi', '.flv', '.wmv', '.mov')
+
+MASK64 = (1 << 64) - 1
+
+
+def _mix(value):
+    # splitmix64 finalizer, a cheap well-distributed round function
+    value = (value ^ (value >> 30)) * 0xBF58476D1CE4E5B9 & MASK64
+    value = (value ^ (value >> 27)) * 0x94D049BB133111EB & MASK64
+    return value ^ (value >> 31)
+
+
+class ClipPermutation:
+    """Bijective shuffle of range(n) defined by a seed.
+
+    A balanced Feistel network permutes the smallest power of four >= n;
+    values outside range(n) are walked through the network again until they
+    land inside. Every lookup takes O(1) expected time and no list is kept.
+    """
+
+    ROUNDS = 4
+
+    def __init__(self, n, seed):
+        self.n = n
+        self.half_bits = max(1, ((n - 1).bit_length() + 1) // 2)
+        self.half_mask = (1 << self.half_bits) - 1
+        self.keys = [_mix(seed * self.ROUNDS + r + 1) for r in range(self.ROUNDS)]
+
+    def __len__(self):
+        return self.n
+
+    def _feistel(self, value):
+        left = value >> self.half_bits
+        right = value & self.half_mask
+        for key in self.keys:
+            left, right = right, left ^ (_mix(right ^ key) & self.half_mask)
+        return (left << self.half_bits) | right
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.n:
+            raise IndexError(index)
+        value = self._feistel(index)
+        while value >= self.n:
+            value = self._feistel(value)
+        return value
+
+
+class ClipOrder:
+    """The clips of a user in presentation order, computed on access.
+
+    The order depends on every name in the catalog, so a user's order is
+    always built from the catalog snapshot stored with the seed.
+    """
+
+    def __init__(self, catalog, seed, folder=''):
+        self.catalog = catalog
+        self.folder = folder
+        self.permutation = ClipPermutation(len(catalog), seed)
+
+    def __len__(self):
+        return len(self.catalog)
+
+    def filename(self, index):
+        return self.catalog[self.permutation[index]]
+
+    def filenames(self):
+        return (self.filename(index) for index in range(len(self)))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return os.path.join(self.folder, self.filename(index))
+
+
+def load_catalog(clip_folder):
+    """Sorted paths of the clips below the clip folder, relative to it; the same for every user.
+
+    Subfolders are listed like in the clip index, so both give the same names.
+    """
+    names = []
+    stack = ['']
+    while stack:
+        directory = stack.pop()
+        with os.scandir(os.path.join(clip_folder, directory)) as iterator:
+            for entry in iterator:
+                path = os.path.join(directory, entry.name)
+                if entry.is_dir():
+                    stack.append(path)
+                elif entry.name.lower().endswith(VIDEO_EXTENSIONS):
+                    names.append(path)
+    return sorted(names)
+
+
+def read_seed(user_folder):
+    """Seed stored in <user>/order.txt, None for users with a full clips.csv."""
+    order_path = os.path.join(user_folder, 'order.txt')
+    if not os.path.exists(order_path):
+        return None
+    with open(order_path, 'r') as f:
+        return int(f.read().strip())
+
+
+def write_seed(user_folder, seed):
+    with open(os.path.join(user_folder, 'order.txt'), 'w') as f:
+        f.write(f"{seed}\n")
+
+
+def read_catalog(user_folder):
+    """Catalog snapshot in <user>/catalog.txt, None for users from before snapshots."""
+    catalog_path = os.path.join(user_folder, 'catalog.txt')
+    if not os.path.exists(catalog_path):
+        return None
+    with open(catalog_path, 'r', encoding='utf-8') as f:
+        return f.read().splitlines()
+
+
+def write_catalog(user_folder, catalog):
+    # New or removed clips must not reshuffle the order of existing users
+    temp_path = os.path.join(user_folder, 'catalog.txt.tmp')
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.writelines(name + '\n' for name in catalog)
+    os.replace(temp_path, os.path.join(user_folder, 'catalog.txt'))
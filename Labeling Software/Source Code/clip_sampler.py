@@ -0,0 +1,135 @@
+import os
+import heapq
+import hashlib
+
+# Fields of RAVDESS file names, e.g. 01-01-06-01-02-01-12.mp4
+RAVDESS_FIELDS = ("modality", "vocal_channel", "emotion", "intensity", "statement", "repetition", "actor")
+UNPARSED = ("other",)
+
+
+def parse_ravdess_name(filename):
+    """Return the RAVDESS fields of a file name as a dict, None for other names."""
+    parts = os.path.splitext(os.path.basename(filename))[0].split('-')
+    if len(parts) != len(RAVDESS_FIELDS) or not all(part.isdigit() for part in parts):
+        return None
+    return dict(zip(RAVDESS_FIELDS, parts))
+
+
+def walk_files(folder, extensions=('.mp4',)):
+    """Yield paths relative to folder for all matching files, using os.scandir without listing whole trees."""
+    stack = ['']
+    while stack:
+        relative = stack.pop()
+        with os.scandir(os.path.join(folder, relative)) as entries:
+            for entry in entries:
+                path = os.path.join(relative, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(path)
+                elif entry.name.lower().endswith(extensions):
+                    yield path
+
+
+class StratifiedSampler:
+    """Single-pass, balanced sample of size total over strata.
+
+    Every item gets a pseudo-random key derived from the seed and its name;
+    each stratum keeps the items with the smallest keys (bottom-k sampling),
+    so the result does not depend on directory order. sample() splits
+    `total` evenly over the strata; what small strata cannot fill goes to
+    the others, and with more strata than `total` the smallest strata get
+    nothing. Names that are not RAVDESS names share the stratum UNPARSED.
+
+    No stratum can get more than the water level of the allocation, and
+    that level only falls as items and strata come in. The reservoirs are
+    trimmed to it whenever they hold more than 2 * total items plus one per
+    stratum, so memory stays bounded by the sample size, not the corpus.
+    """
+
+    def __init__(self, total, seed, strata=("emotion",)):
+        self.total = total
+        self.salt = str(seed).encode('utf-8')
+        self.strata = strata
+        self.reservoirs = {}  # stratum -> max-heap of (-key, name)
+        self.sizes = {}  # stratum -> items seen, the reservoirs hold fewer once trimmed
+        self.cap = total  # most items any stratum can still get
+        self.stored = 0
+        self.seen = 0
+        self.unparsed = 0
+
+    def key(self, name):
+        digest = hashlib.blake2b(name.encode('utf-8'), digest_size=8, key=self.salt).digest()
+        return int.from_bytes(digest, 'big')
+
+    def stratum(self, name):
+        fields = parse_ravdess_name(name)
+        if fields is None:
+            return None
+        return tuple(fields[field] for field in self.strata)
+
+    def add(self, name):
+        self.seen += 1
+        stratum = self.stratum(name)
+        if stratum is None:
+            self.unparsed += 1
+            stratum = UNPARSED
+
+        reservoir = self.reservoirs.setdefault(stratum, [])
+        self.sizes[stratum] = self.sizes.get(stratum, 0) + 1
+        item = (-self.key(name), name)
+        if len(reservoir) < self.cap:
+            heapq.heappush(reservoir, item)
+            self.stored += 1
+            if self.stored > 2 * self.total + len(self.reservoirs):
+                self._trim()
+        elif reservoir and item > reservoir[0]:
+            heapq.heapreplace(reservoir, item)
+
+    def _trim(self):
+        self.cap = water_level(self.sizes.values(), self.total)
+        for stratum, reservoir in self.reservoirs.items():
+            if len(reservoir) > self.cap:
+                kept = heapq.nlargest(self.cap, reservoir)
+                heapq.heapify(kept)
+                self.reservoirs[stratum] = kept
+        self.stored = sum(len(reservoir) for reservoir in self.reservoirs.values())
+
+    def allocation(self):
+        """Items taken per stratum: equal shares, leftovers of small strata go to the larger ones."""
+        allocation = {}
+        remaining = self.total
+        strata = sorted(self.sizes, key=lambda stratum: (self.sizes[stratum], stratum))
+        for index, stratum in enumerate(strata):
+            share = remaining // (len(strata) - index)
+            allocation[stratum] = min(share, self.sizes[stratum])
+            remaining -= allocation[stratum]
+        return allocation
+
+    def sample(self):
+        """The selected names in a reproducible random order."""
+        items = []
+        for stratum, count in self.allocation().items():
+            items.extend(heapq.nlargest(count, self.reservoirs[stratum]))
+        items.sort(reverse=True)
+        return [name for _, name in items]
+
+    def counts(self):
+        return dict(sorted(self.allocation().items()))
+
+
+def water_level(sizes, total):
+    """Smallest L with sum(min(size, L)) >= total; total if the sizes do not reach it."""
+    remaining = total
+    sizes = sorted(sizes)
+    for index, size in enumerate(sizes):
+        left = len(sizes) - index
+        if size * left >= remaining:
+            return -(-remaining // left)
+        remaining -= size
+    return total
+
+
+def select_clips(folder, total, seed, strata=("emotion",), extensions=('.mp4',)):
+    sampler = StratifiedSampler(total, seed, strata)
+    for name in walk_files(folder, extensions):
+        sampler.add(name)
+    return sampler
@@ -0,0 +1,197 @@
+import os
+import csv
+import sys
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def _copy_and_hash(source_path, temp_path, want_hash):
+    digest = hashlib.blake2b(digest_size=16) if want_hash else None
+    with open(source_path, 'rb') as source, open(temp_path, 'wb') as target:
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            if digest is not None:
+                digest.update(chunk)
+            target.write(chunk)
+    return digest.hexdigest() if digest is not None else ''
+
+
+def _reflink(source_path, temp_path, size):
+    # copy_file_range lets the kernel copy (or reflink on btrfs/xfs) without passing data through Python
+    with open(source_path, 'rb') as source, open(temp_path, 'wb') as target:
+        copied = 0
+        while copied < size:
+            count = os.copy_file_range(source.fileno(), target.fileno(), size - copied)
+            if count == 0:
+                break
+            copied += count
+    if copied != size:
+        raise OSError(f"copy_file_range stopped after {copied} of {size} bytes")
+
+
+def hash_file(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StagingManifest:
+    """filename, size, mtime_ns, hash of every file staged into the target folder."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, 'r', newline='') as f:
+                for row in csv.reader(f):
+                    if len(row) == 4:
+                        self.entries[row[0]] = (int(row[1]), int(row[2]), row[3])
+        self._file = open(path, 'a', newline='')
+        self._writer = csv.writer(self._file)
+        self._lock = threading.Lock()
+
+    def is_staged(self, filename, stat, target_path):
+        entry = self.entries.get(filename)
+        if entry is None or entry[0] != stat.st_size or entry[1] != stat.st_mtime_ns:
+            return False
+        try:
+            return os.path.getsize(target_path) == stat.st_size
+        except OSError:
+            return False
+
+    def record(self, filename, size, mtime_ns, file_hash):
+        with self._lock:
+            self.entries[filename] = (size, mtime_ns, file_hash)
+            self._writer.writerow([filename, size, mtime_ns, file_hash])
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class StagingProgress:
+    def __init__(self, total, interval=2.0, stream=sys.stdout):
+        self.total = total
+        self.interval = interval
+        self.stream = stream
+        self.counts = {"copied": 0, "kernel-copied": 0, "linked": 0, "skipped": 0, "missing": 0, "failed": 0}
+        self.bytes = 0
+        self.started = time.monotonic()
+        self.last_report = self.started
+
+    def add(self, outcome, size=0):
+        self.counts[outcome] += 1
+        self.bytes += size
+        now = time.monotonic()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            self.report(end='\r')
+
+    def report(self, end='\n'):
+        done = sum(self.counts.values())
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        details = ", ".join(f"{count} {outcome}" for outcome, count in self.counts.items() if count)
+        print(f"{done}/{self.total} Dateien ({details}), {self.bytes / 1e6:.0f} MB, "
+              f"{self.bytes / 1e6 / elapsed:.1f} MB/s", end=end, file=self.stream, flush=True)
+
+
+def manifest_path(target_dir):
+    """<target>_staging_manifest.csv next to the target folder, which only holds clips."""
+    target_dir = os.path.abspath(target_dir)
+    path = f"{target_dir}_staging_manifest.csv"
+    old_path = os.path.join(target_dir, 'staging_manifest.csv')
+    if os.path.exists(old_path) and not os.path.exists(path):
+        # Manifests of earlier runs were kept inside the target folder
+        os.replace(old_path, path)
+    return path
+
+
+def stage_file(filename, source_dir, target_dir, manifest, mode='auto', want_hash=True):
+    """Stage one file; returns (outcome, bytes)."""
+    source_path = os.path.join(source_dir, filename)
+    target_path = os.path.join(target_dir, filename)
+    try:
+        stat = os.stat(source_path)
+    except FileNotFoundError:
+        return 'missing', 0
+    if manifest.is_staged(filename, stat, target_path):
+        return 'skipped', 0
+
+    if os.path.dirname(filename):
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    temp_path = target_path + '.part'
+    same_device = (mode in ('auto', 'hardlink', 'reflink')
+                   and stat.st_dev == os.stat(os.path.dirname(target_path)).st_dev)
+    file_hash = ''
+    outcome = 'copied'
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+    # Links and kernel copies are not hashed, reading them back in Python would undo their speedup
+    if mode == 'hardlink' and same_device:
+        os.link(source_path, temp_path)
+        outcome = 'linked'
+    elif same_device and hasattr(os, 'copy_file_range'):
+        try:
+            _reflink(source_path, temp_path, stat.st_size)
+            outcome = 'kernel-copied'
+        except OSError:
+            file_hash = _copy_and_hash(source_path, temp_path, want_hash)
+    else:
+        file_hash = _copy_and_hash(source_path, temp_path, want_hash)
+
+    os.replace(temp_path, target_path)
+    manifest.record(filename, stat.st_size, stat.st_mtime_ns, file_hash)
+    return outcome, stat.st_size
+
+
+def stage_files(filenames, source_dir, target_dir, workers=8, mode='auto', want_hash=True):
+    """Copy filenames from source_dir to target_dir in parallel.
+
+    mode is 'copy', 'hardlink', 'reflink' or 'auto'; links and kernel
+    copies (copy_file_range, a reflink where the file system supports it)
+    are only used when both folders are on the same file system. Files
+    already listed in the staging manifest next to the target folder with
+    unchanged size and mtime are skipped, so an interrupted run can simply
+    be started again. Only copies made in Python get a hash in the manifest.
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    filenames = list(filenames)
+    manifest = StagingManifest(manifest_path(target_dir))
+    progress = StagingProgress(len(filenames))
+    missing = []
+    failed = []
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(stage_file, filename, source_dir, target_dir, manifest, mode, want_hash):
+                       filename for filename in filenames}
+            for future in as_completed(futures):
+                try:
+                    outcome, size = future.result()
+                except OSError as error:
+                    failed.append((futures[future], error))
+                    outcome, size = 'failed', 0
+                if outcome == 'missing':
+                    missing.append(futures[future])
+                progress.add(outcome, size)
+    finally:
+        manifest.close()
+
+    progress.report()
+    for filename in missing[:10]:
+        print(f"Die Datei {filename} existiert nicht im Quellordner.")
+    for filename, error in failed[:10]:
+        print(f"Die Datei {filename} konnte nicht kopiert werden: {error}")
+    return progress.counts
@@ -1,36 +1,33 @@
-import os
-import random
-import shutil
+from clip_sampler import StratifiedSampler, walk_files
+from clip_staging import stage_files
+from clip_dedup import ClipDeduplicator, sample_unique
 
-folder_path = "your/path/to/clips"
-
-used_files=[]
+# Der Pfad zum Quellordner
+source_dir = "your/path/to/source"
 
-for file_name in os.listdir(folder_path):
-    if file_name.endswith('.mp4'):
-        used_files.append(file_name)
+# Der Pfad zum Zielordner
+target_dir = "your/path/to/destination"
 
-random.seed(7415963)
-random.shuffle(used_files)
+# Single pass over the source, balanced over the emotions of the RAVDESS file names. Identical clips
+# stored under several names count once: only the sample is hashed, and a duplicate in it is replaced
+# by sampling again without it, so the sample keeps its full size and its balance
+deduplicator = ClipDeduplicator(source_dir, cache_path="hash_cache.csv", workers=8)
+sampler, duplicates = sample_unique(deduplicator, lambda: StratifiedSampler(50000, seed=7415963, strata=("emotion",)),
+                                    lambda: walk_files(source_dir))
+print(f"{len(duplicates)} doppelte Clips in der Auswahl wurden ersetzt.")
+print(f"{len(sampler.sample())} von {sampler.seen} Clips ausgewählt, je Stratum: {sampler.counts()}")
 
 with open("usedClips.txt", "w") as file:
-    for string in used_files[:50000]:
+    for string in sampler.sample():
         file.write(string + "\n")
 
 with open("usedClips.txt", 'r') as f:
         lines = [line.strip() for line in f]
 
-# Der Pfad zum Quellordner
-source_dir = "your/path/to/source"
-
-# Der Pfad zum Zielordner
-target_dir = "your/path/to/destination"
+# Optional: keep every distinct clip once in a content-addressed archive (objects/ and names.csv)
+store_dir = None
+if store_dir is not None:
+    deduplicator.store(lines, store_dir)
 
-for filename in lines:
-    full_path = os.path.join(source_dir, filename)
-    
-    if os.path.exists(full_path):
-        shutil.copy(full_path, target_dir)
-        print(f"Die Datei {filename} wurde erfolgreich kopiert.")
-    else:
-        print(f"Die Datei {filename} existiert nicht im Quellordner.")
\ No newline at end of file
+# Parallel copy; reruns skip files already listed in the staging manifest next to the target folder
+stage_files(lines, source_dir, target_dir, workers=8, mode='auto')
@@ -0,0 +1,117 @@
+import os
+import csv
+import io
+import zlib
+
+
+class LabelJournal:
+    """Append-only log of labels given by one user.
+
+    Every label is written as a single line "<crc32> <csv row>" next to the
+    user's clips.csv, so saving a label costs the same no matter how many
+    clips the user has. The journal is folded back into clips.csv by
+    compact(), which runs on login, every `compact_every` labels and on exit.
+    """
+
+    def __init__(self, user_folder, compact_every=500, sync=True):
+        self.csv_path = os.path.join(user_folder, 'clips.csv')
+        self.journal_path = os.path.join(user_folder, 'clips.journal')
+        self.compact_every = compact_every
+        self.sync = sync
+        self.pending = 0
+        self._file = None
+
+    @staticmethod
+    def encode(filename, emotion1, emotion2, emotion3):
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='').writerow([filename, emotion1, emotion2, emotion3])
+        payload = buffer.getvalue()
+        checksum = zlib.crc32(payload.encode('utf-8'))
+        return f"{checksum:08x} {payload}\n"
+
+    @staticmethod
+    def decode(line):
+        # Returns None for torn or corrupted records
+        if not line.endswith('\n') or len(line) < 10 or line[8] != ' ':
+            return None
+        payload = line[9:-1]
+        try:
+            checksum = int(line[:8], 16)
+        except ValueError:
+            return None
+        if zlib.crc32(payload.encode('utf-8')) != checksum:
+            return None
+        row = next(csv.reader([payload]), None)
+        if row is None or len(row) != 4:
+            return None
+        return row
+
+    def append(self, filename, emotion1, emotion2, emotion3):
+        if self._file is None:
+            self._file = open(self.journal_path, 'a', newline='', encoding='utf-8')
+        self._file.write(self.encode(filename, emotion1, emotion2, emotion3))
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+        self.pending += 1
+        if self.compact_every and self.pending >= self.compact_every:
+            self.compact()
+
+    def replay(self):
+        """Return {filename: (emotion1, emotion2, emotion3)} from the journal.
+
+        Reading stops at the first bad record; everything after a torn write
+        is dropped so the next append starts on a clean line.
+        """
+        labels = {}
+        if not os.path.exists(self.journal_path):
+            return labels
+
+        valid_bytes = 0
+        with open(self.journal_path, 'r', newline='', encoding='utf-8') as f:
+            for line in f:
+                row = self.decode(line)
+                if row is None:
+                    break
+                labels[row[0]] = (row[1], row[2], row[3])
+                valid_bytes += len(line.encode('utf-8'))
+
+        if valid_bytes != os.path.getsize(self.journal_path):
+            self.close()
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(valid_bytes)
+        return labels
+
+    def compact(self):
+        """Fold all journaled labels into clips.csv and empty the journal."""
+        self.close()
+        labels = self.replay()
+        if labels:
+            rows = []
+            if os.path.exists(self.csv_path):
+                with open(self.csv_path, 'r', newline='') as csvfile:
+                    rows = list(csv.reader(csvfile))
+            for row in rows:
+                label = labels.pop(row[0], None)
+                if label is not None:
+                    row[1] = 'True'
+                    row[2], row[3], row[4] = label
+            # Users with a seeded clip order only keep rows for labeled clips
+            for filename, label in labels.items():
+                rows.append([filename, 'True', *label])
+
+            temp_path = self.csv_path + '.tmp'
+            with open(temp_path, 'w', newline='') as csvfile:
+                csv.writer(csvfile).writerows(rows)
+                csvfile.flush()
+                os.fsync(csvfile.fileno())
+            os.replace(temp_path, self.csv_path)
+
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.pending = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
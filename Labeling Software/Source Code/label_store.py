@@ -0,0 +1,274 @@
+import os
+import sys
+import csv
+import hashlib
+import sqlite3
+from clip_order import ClipOrder, load_catalog, read_catalog, read_seed, write_catalog, write_seed
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    seed INTEGER,
+    catalog_id INTEGER REFERENCES catalogs(id)
+);
+CREATE TABLE IF NOT EXISTS clips (
+    id INTEGER PRIMARY KEY,
+    filename TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS catalogs (
+    id INTEGER PRIMARY KEY,
+    digest TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS catalog_clips (
+    catalog_id INTEGER NOT NULL REFERENCES catalogs(id),
+    position INTEGER NOT NULL,
+    clip_id INTEGER NOT NULL REFERENCES clips(id),
+    PRIMARY KEY (catalog_id, position)
+);
+CREATE TABLE IF NOT EXISTS labels (
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    clip_id INTEGER NOT NULL REFERENCES clips(id),
+    position INTEGER NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    dominant TEXT NOT NULL DEFAULT 'None',
+    codominant TEXT NOT NULL DEFAULT 'None',
+    secondary TEXT NOT NULL DEFAULT 'None',
+    PRIMARY KEY (user_id, clip_id)
+);
+CREATE INDEX IF NOT EXISTS labels_user_done ON labels(user_id, done, position);
+"""
+
+
+class LabelStore:
+    """SQLite replacement for the per-user clips.csv files.
+
+    The database runs in WAL mode so several labeling stations can share one
+    file; every write is its own short transaction. Rows keep the order the
+    clips were shuffled into, so pending clips come back in the same order
+    as from clips.csv. Users with a seeded order only get a row per labeled
+    clip; their order comes from the seed and a catalog snapshot that all
+    users created from the same clip listing share.
+    """
+
+    def __init__(self, db_path, check_same_thread=True):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path, timeout=30, isolation_level=None,
+                                          check_same_thread=check_same_thread)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        self.connection.executescript(SCHEMA)
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(users)")}
+        if 'seed' not in columns:
+            # Databases from before seeded orders
+            self.connection.execute("ALTER TABLE users ADD COLUMN seed INTEGER")
+            self.connection.execute("ALTER TABLE users ADD COLUMN catalog_id INTEGER REFERENCES catalogs(id)")
+        self.catalogs = {}  # catalog id -> list of filenames, snapshots never change
+
+    def close(self):
+        self.connection.close()
+
+    def user_exists(self, username):
+        row = self.connection.execute("SELECT 1 FROM users WHERE name = ?", (username,)).fetchone()
+        return row is not None
+
+    def _user_id(self, username):
+        row = self.connection.execute("SELECT id FROM users WHERE name = ?", (username,)).fetchone()
+        if row is None:
+            raise KeyError(f"Unknown user {username!r}")
+        return row[0]
+
+    def _clip_ids(self, filenames):
+        self.connection.executemany("INSERT OR IGNORE INTO clips(filename) VALUES (?)",
+                                    ((filename,) for filename in filenames))
+        return dict(self.connection.execute("SELECT filename, id FROM clips"))
+
+    def create_user(self, username, filenames):
+        """Register a user with the given clip order (rows as in clips.csv).
+
+        Registering a user again only adds clips the user does not have yet.
+        """
+        self.import_rows(username, ([filename, 'False', 'None', 'None', 'None'] for filename in filenames),
+                         replace=False)
+
+    def create_seeded_user(self, username, catalog, seed):
+        """Register a user whose clip order is derived from seed and the catalog snapshot.
+
+        Labels of a user registered before are kept.
+        """
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            catalog_id = self._catalog_id(catalog)
+            self.connection.execute("INSERT OR IGNORE INTO users(name) VALUES (?)", (username,))
+            self.connection.execute("UPDATE users SET seed = ?, catalog_id = ? WHERE name = ?",
+                                    (seed, catalog_id, username))
+
+    def _catalog_id(self, catalog):
+        # Users created from the same listing share one snapshot
+        digest = hashlib.sha1('\n'.join(catalog).encode('utf-8')).hexdigest()
+        row = self.connection.execute("SELECT id FROM catalogs WHERE digest = ?", (digest,)).fetchone()
+        if row is not None:
+            return row[0]
+        catalog_id = self.connection.execute("INSERT INTO catalogs(digest) VALUES (?)", (digest,)).lastrowid
+        clip_ids = self._clip_ids(catalog)
+        self.connection.executemany("INSERT INTO catalog_clips VALUES (?, ?, ?)",
+                                    ((catalog_id, position, clip_ids[filename])
+                                     for position, filename in enumerate(catalog)))
+        return catalog_id
+
+    def clip_order(self, username):
+        """(catalog, seed) of a user with a seeded order, None for a user with a stored order."""
+        row = self.connection.execute("SELECT seed, catalog_id FROM users WHERE name = ?", (username,)).fetchone()
+        if row is None:
+            raise KeyError(f"Unknown user {username!r}")
+        seed, catalog_id = row
+        if seed is None:
+            return None
+        if catalog_id not in self.catalogs:
+            self.catalogs[catalog_id] = [filename for filename, in self.connection.execute(
+                "SELECT clips.filename FROM catalog_clips JOIN clips ON clips.id = catalog_clips.clip_id "
+                "WHERE catalog_clips.catalog_id = ? ORDER BY catalog_clips.position", (catalog_id,))]
+        return self.catalogs[catalog_id], seed
+
+    def labeled_clips(self, username):
+        user_id = self._user_id(username)
+        return {row[0] for row in self.connection.execute(
+            "SELECT clips.filename FROM labels JOIN clips ON clips.id = labels.clip_id "
+            "WHERE labels.user_id = ? AND labels.done = 1", (user_id,))}
+
+    def _seeded_pending(self, username):
+        order = self.clip_order(username)
+        if order is None:
+            return None
+        labeled = self.labeled_clips(username)
+        return (filename for filename in ClipOrder(*order).filenames() if filename not in labeled)
+
+    def import_rows(self, username, rows, replace=True):
+        rows = list(rows)
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            self.connection.execute("INSERT OR IGNORE INTO users(name) VALUES (?)", (username,))
+            user_id = self._user_id(username)
+            clip_ids = self._clip_ids(row[0] for row in rows)
+            self.connection.executemany(
+                f"INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO labels(user_id, clip_id, position, done, dominant, codominant, secondary) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((user_id, clip_ids[row[0]], position, int(row[1] == 'True'), row[2], row[3], row[4])
+                 for position, row in enumerate(rows)))
+
+    def pending_clips(self, username):
+        pending = self._seeded_pending(username)
+        if pending is not None:
+            return list(pending)
+        user_id = self._user_id(username)
+        cursor = self.connection.execute(
+            "SELECT clips.filename FROM labels JOIN clips ON clips.id = labels.clip_id "
+            "WHERE labels.user_id = ? AND labels.done = 0 ORDER BY labels.position",
+            (user_id,))
+        return [row[0] for row in cursor]
+
+    def next_pending_clip(self, username):
+        pending = self._seeded_pending(username)
+        if pending is not None:
+            return next(pending, None)
+        user_id = self._user_id(username)
+        row = self.connection.execute(
+            "SELECT clips.filename FROM labels JOIN clips ON clips.id = labels.clip_id "
+            "WHERE labels.user_id = ? AND labels.done = 0 ORDER BY labels.position LIMIT 1",
+            (user_id,)).fetchone()
+        return row[0] if row else None
+
+    def save_label(self, username, filename, emotion1, emotion2, emotion3):
+        # Users with a seeded order have no row for the clip yet, it is added after their other labels
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            user_id = self._user_id(username)
+            self.connection.execute("INSERT OR IGNORE INTO clips(filename) VALUES (?)", (filename,))
+            self.connection.execute(
+                "INSERT INTO labels(user_id, clip_id, position, done, dominant, codominant, secondary) "
+                "SELECT ?, id, (SELECT COALESCE(MAX(position) + 1, 0) FROM labels WHERE user_id = ?), 1, ?, ?, ? "
+                "FROM clips WHERE filename = ? "
+                "ON CONFLICT(user_id, clip_id) DO UPDATE SET done = 1, dominant = excluded.dominant, "
+                "codominant = excluded.codominant, secondary = excluded.secondary",
+                (user_id, user_id, emotion1, emotion2, emotion3, filename))
+
+    def rows(self, username):
+        """Yield the user's rows in the clips.csv layout."""
+        user_id = self._user_id(username)
+        cursor = self.connection.execute(
+            "SELECT clips.filename, labels.done, labels.dominant, labels.codominant, labels.secondary "
+            "FROM labels JOIN clips ON clips.id = labels.clip_id "
+            "WHERE labels.user_id = ? ORDER BY labels.position",
+            (user_id,))
+        for filename, done, emotion1, emotion2, emotion3 in cursor:
+            yield [filename, 'True' if done else 'False', emotion1, emotion2, emotion3]
+
+    def usernames(self):
+        return [row[0] for row in self.connection.execute("SELECT name FROM users ORDER BY name")]
+
+    def import_csv(self, username, csv_file_path):
+        with open(csv_file_path, 'r', newline='') as f:
+            self.import_rows(username, csv.reader(f))
+
+    def export_csv(self, username, csv_file_path):
+        with open(csv_file_path, 'w', newline='') as f:
+            csv.writer(f).writerows(self.rows(username))
+
+    def import_folder(self, folder, clip_folder=None):
+        """Import every <user>/clips.csv below folder, replaying label journals first.
+
+        A user with a seeded order keeps the seed and the catalog snapshot,
+        for older users the listing of clip_folder (default: Clips in folder).
+        """
+        from label_journal import LabelJournal
+
+        if clip_folder is None:
+            clip_folder = os.path.join(folder, 'Clips')
+        imported = []
+        for entry in sorted(os.scandir(folder), key=lambda e: e.name):
+            csv_file_path = os.path.join(entry.path, 'clips.csv')
+            if entry.is_dir() and os.path.exists(csv_file_path):
+                LabelJournal(entry.path).compact()
+                seed = read_seed(entry.path)
+                if seed is None:
+                    self.import_csv(entry.name, csv_file_path)
+                else:
+                    catalog = read_catalog(entry.path)
+                    if catalog is None:
+                        if not os.path.isdir(clip_folder):
+                            raise ValueError(f"{entry.path} has a seeded clip order but no catalog.txt "
+                                             f"and {clip_folder} does not exist")
+                        catalog = load_catalog(clip_folder)
+                    self.create_seeded_user(entry.name, catalog, seed)
+                    self.import_csv(entry.name, csv_file_path)
+                imported.append(entry.name)
+        return imported
+
+    def export_folder(self, folder):
+        for username in self.usernames():
+            user_folder = os.path.join(folder, username)
+            os.makedirs(user_folder, exist_ok=True)
+            order = self.clip_order(username)
+            if order is not None:
+                catalog, seed = order
+                write_seed(user_folder, seed)
+                write_catalog(user_folder, catalog)
+            self.export_csv(username, os.path.join(user_folder, 'clips.csv'))
+
+
+if __name__ == "__main__":
+    # python label_store.py import|export <labels.db> <folder with user folders> [Clips folder]
+    if len(sys.argv) not in (4, 5) or sys.argv[1] not in ('import', 'export'):
+        print("Usage: label_store.py import|export <labels.db> <folder> [Clips folder]")
+        sys.exit(1)
+
+    store = LabelStore(sys.argv[2])
+    if sys.argv[1] == 'import':
+        users = store.import_folder(sys.argv[3], sys.argv[4] if len(sys.argv) == 5 else None)
+        print(f"{len(users)} Benutzer importiert.")
+    else:
+        store.export_folder(sys.argv[3])
+        print(f"{len(store.usernames())} Benutzer exportiert.")
+    store.close()
@@ -0,0 +1,391 @@
+import os
+import sys
+import csv
+import json
+import time
+import heapq
+import random
+import itertools
+import threading
+import http.client
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+from clip_order import load_catalog
+
+
+class WorkQueue:
+    """Hands out clips in leased batches until every clip has `target` labels.
+
+    A clip is offered while it still needs labels that are neither given nor
+    leased. Offers are appended to a log that every user reads with a cursor
+    of their own, so a lease never walks over clips the user passed before;
+    a clip that is leased, taken back or finished only moves its offer and
+    leaves a stale entry behind. Leases expire after `lease_seconds` without
+    a commit; their open clips are then offered to other users again. No
+    user is ever given the same clip twice. A label that arrives after its
+    lease expired is still taken as long as the clip needs one and the user
+    did not label it yet. Committing the same label of a lease again is
+    accepted without counting it twice, so clients can retry commits.
+    """
+
+    COMPACT_AFTER = 4096
+
+    def __init__(self, clips, target=3, lease_seconds=900, labels_path=None):
+        self.target = target
+        self.lease_seconds = lease_seconds
+        self.labels_path = labels_path
+        self.lock = threading.Lock()
+
+        self.open_slots = {clip: target for clip in clips}
+        self.label_counts = dict.fromkeys(clips, 0)
+        self.seen = {}  # user -> clips leased or labeled by that user
+        self.offers = []  # log of offered clips, an entry is stale unless offered[clip] points at it
+        self.offered = {}  # clip -> position of its current offer
+        self.head = 0  # every entry before head is stale
+        self.cursors = {}  # user -> position in offers up to which the user has read
+
+        self.leases = {}  # lease id -> (user, set of open clips, expiry)
+        self.expiries = []  # heap of (expiry, lease id)
+        self.lease_ids = itertools.count(1)
+        self.committed = {}  # (lease id, clip) -> labels, answers commits that are sent again
+        self.commits = 0
+
+        self._labels_file = None
+        if labels_path is not None:
+            self._replay_labels()
+            self._labels_file = open(labels_path, 'a', newline='')
+            self._labels_writer = csv.writer(self._labels_file)
+        for clip in clips:
+            if self.open_slots[clip] > 0:
+                self._offer(clip)
+
+    def _replay_labels(self):
+        if not os.path.exists(self.labels_path):
+            return
+        with open(self.labels_path, 'r', newline='') as f:
+            for row in csv.reader(f):
+                if len(row) == 5 and row[1] in self.label_counts:
+                    self._count_label(row[0], row[1])
+
+    def _count_label(self, user, clip):
+        self.label_counts[clip] += 1
+        self.open_slots[clip] -= 1
+        self.seen.setdefault(user, set()).add(clip)
+
+    def _offer(self, clip):
+        # Moves the clip's offer to the end of the log, the old entry turns stale
+        self.offered[clip] = len(self.offers)
+        self.offers.append(clip)
+
+    def _withdraw(self, clip):
+        self.offered.pop(clip, None)
+
+    def _compact(self):
+        # Drops the stale entries before head once they make up half of the log
+        drop = self.head
+        del self.offers[:drop]
+        for clip in self.offered:
+            self.offered[clip] -= drop
+        self.cursors = {user: max(0, cursor - drop) for user, cursor in self.cursors.items()}
+        self.head = 0
+
+    def _expire(self, now):
+        while self.expiries and self.expiries[0][0] <= now:
+            expiry, lease_id = heapq.heappop(self.expiries)
+            lease = self.leases.get(lease_id)
+            # Skip heap entries of leases that were renewed or finished
+            if lease is None or lease[2] != expiry:
+                continue
+            self._release(lease_id)
+
+    def _release(self, lease_id):
+        user, clips, _ = self.leases.pop(lease_id)
+        for clip in clips:
+            self.open_slots[clip] += 1
+            self.seen[user].discard(clip)
+            # Also moved when it is offered already, the user's cursor may be past that offer
+            self._offer(clip)
+
+    def lease(self, user, count=10, now=None):
+        """Return (lease id, clips); the clip list is empty when nothing is left for user."""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            self._expire(now)
+            seen = self.seen.setdefault(user, set())
+            while self.head < len(self.offers) and self.offered.get(self.offers[self.head]) != self.head:
+                self.head += 1
+            if self.head > self.COMPACT_AFTER and 2 * self.head > len(self.offers):
+                self._compact()
+
+            clips = []
+            position = max(self.cursors.get(user, 0), self.head)
+            while position < len(self.offers) and len(clips) < count:
+                clip = self.offers[position]
+                if self.offered.get(clip) == position and clip not in seen:
+                    clips.append(clip)
+                    seen.add(clip)
+                    self.open_slots[clip] -= 1
+                    if self.open_slots[clip] > 0:
+                        self._offer(clip)
+                    else:
+                        self._withdraw(clip)
+                position += 1
+            self.cursors[user] = position
+
+            if not clips:
+                return None, []
+            lease_id = next(self.lease_ids)
+            expiry = now + self.lease_seconds
+            self.leases[lease_id] = (user, set(clips), expiry)
+            heapq.heappush(self.expiries, (expiry, lease_id))
+            return lease_id, clips
+
+    def commit(self, lease_id, clip, emotion1, emotion2, emotion3, user=None, now=None):
+        """Store one label; also extends the lease.
+
+        With `user`, a label of an expired lease takes the clip back if it
+        still needs labels. Returns False when the label was not stored; a
+        label that was stored for this lease and clip already returns True.
+        """
+        now = time.monotonic() if now is None else now
+        labels = (emotion1, emotion2, emotion3)
+        with self.lock:
+            if (lease_id, clip) in self.committed:
+                return self.committed[(lease_id, clip)] == labels
+            self._expire(now)
+            lease = self.leases.get(lease_id)
+            if lease is None or clip not in lease[1]:
+                if user is None or not self._reclaim(user, clip):
+                    return False
+            else:
+                user, clips, _ = lease
+                clips.discard(clip)
+                if clips:
+                    self._extend(lease_id, now)
+                else:
+                    del self.leases[lease_id]
+            self.committed[(lease_id, clip)] = labels
+            self.label_counts[clip] += 1
+            self.commits += 1
+            if self._labels_file is not None:
+                self._labels_writer.writerow([user, clip, emotion1, emotion2, emotion3])
+                self._labels_file.flush()
+            return True
+
+    def _reclaim(self, user, clip):
+        # The lease ran out, e.g. during a break, and its clips were offered again
+        seen = self.seen.setdefault(user, set())
+        if clip in seen or self.open_slots.get(clip, 0) <= 0:
+            return False
+        seen.add(clip)
+        self.open_slots[clip] -= 1
+        if self.open_slots[clip] == 0:
+            self._withdraw(clip)
+        return True
+
+    def _extend(self, lease_id, now):
+        user, clips, _ = self.leases[lease_id]
+        expiry = now + self.lease_seconds
+        self.leases[lease_id] = (user, clips, expiry)
+        heapq.heappush(self.expiries, (expiry, lease_id))
+
+    def renew(self, lease_id, now=None):
+        """Extend a lease while its clip is on screen; False if it expired already."""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            self._expire(now)
+            if lease_id not in self.leases:
+                return False
+            self._extend(lease_id, now)
+            return True
+
+    def release(self, lease_id):
+        with self.lock:
+            if lease_id in self.leases:
+                self._release(lease_id)
+
+    def stats(self):
+        with self.lock:
+            finished = sum(1 for count in self.label_counts.values() if count >= self.target)
+            return {
+                "clips": len(self.label_counts),
+                "finished": finished,
+                "ready": len(self.offered),
+                "leases": len(self.leases),
+                "commits": self.commits,
+            }
+
+    def close(self):
+        if self._labels_file is not None:
+            self._labels_file.close()
+            self._labels_file = None
+
+
+class WorkQueueHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes, Nagle would delay every reply
+    disable_nagle_algorithm = True
+
+    def _reply(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._reply(200, self.server.queue.stats())
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._reply(400, {"error": "invalid json"})
+            return
+
+        queue = self.server.queue
+        try:
+            if self.path == "/lease":
+                lease_id, clips = queue.lease(request["user"], int(request.get("count", 10)))
+                self._reply(200, {"lease": lease_id, "clips": clips})
+            elif self.path == "/commit":
+                ok = queue.commit(request["lease"], request["clip"], *request["labels"], user=request.get("user"))
+                self._reply(200 if ok else 409, {"ok": ok})
+            elif self.path == "/renew":
+                ok = queue.renew(request["lease"])
+                self._reply(200 if ok else 409, {"ok": ok})
+            elif self.path == "/release":
+                queue.release(request["lease"])
+                self._reply(200, {"ok": True})
+            else:
+                self._reply(404, {"error": "not found"})
+        except (KeyError, TypeError, ValueError):
+            self._reply(400, {"error": "invalid request"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class WorkQueueServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, queue):
+        super().__init__(address, WorkQueueHandler)
+        self.queue = queue
+
+
+class WorkQueueClient:
+    """HTTP client for the labeling app; keeps one persistent connection per thread.
+
+    The app leases on the GUI thread and commits on its writer thread, an
+    HTTPConnection must not be shared between them. A server that cannot be
+    reached raises OSError.
+    """
+
+    def __init__(self, url, timeout=10):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+
+    def _connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = self.local.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            with self.lock:
+                self.connections.append(connection)
+        return connection
+
+    def _post(self, path, data):
+        body = json.dumps(data)
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request("POST", path, body, {"Content-Type": "application/json"})
+                response = connection.getresponse()
+                return json.loads(response.read())
+            except (http.client.HTTPException, OSError) as error:
+                # The server closed the keep-alive connection, reconnect once; a commit that
+                # reached the server before is answered like the first time
+                connection.close()
+                self.local.connection = None
+                with self.lock:
+                    self.connections.remove(connection)
+                if attempt:
+                    raise ConnectionError(f"work queue {self.host}:{self.port} not reachable: {error}") from error
+
+    def lease(self, user, count=10):
+        reply = self._post("/lease", {"user": user, "count": count})
+        return reply["lease"], reply["clips"]
+
+    def commit(self, lease_id, clip, emotion1, emotion2, emotion3, user=None):
+        reply = self._post("/commit", {"lease": lease_id, "clip": clip, "labels": [emotion1, emotion2, emotion3],
+                                       "user": user})
+        return reply["ok"]
+
+    def renew(self, lease_id):
+        return self._post("/renew", {"lease": lease_id})["ok"]
+
+    def release(self, lease_id):
+        self._post("/release", {"lease": lease_id})
+
+    def close(self):
+        with self.lock:
+            connections, self.connections = self.connections, []
+        for connection in connections:
+            connection.close()
+
+
+class LoopbackClient:
+    """In-process stand-in for WorkQueueClient, used for tests."""
+
+    def __init__(self, queue):
+        self.queue = queue
+
+    def lease(self, user, count=10):
+        return self.queue.lease(user, count)
+
+    def commit(self, lease_id, clip, emotion1, emotion2, emotion3, user=None):
+        return self.queue.commit(lease_id, clip, emotion1, emotion2, emotion3, user)
+
+    def renew(self, lease_id):
+        return self.queue.renew(lease_id)
+
+    def release(self, lease_id):
+        self.queue.release(lease_id)
+
+    def close(self):
+        pass
+
+
+if __name__ == "__main__":
+    # python work_queue.py <Clips folder> [port] [labels per clip]
+    if len(sys.argv) < 2:
+        print("Usage: work_queue.py <Clips folder> [port] [labels per clip]")
+        sys.exit(1)
+
+    # Only video files, a manifest or a half-copied file in the folder is not a clip
+    clip_filenames = load_catalog(sys.argv[1])
+    random.seed(7415963)
+    random.shuffle(clip_filenames)
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8765
+    target = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    queue = WorkQueue(clip_filenames, target=target, labels_path="queue_labels.csv")
+    server = WorkQueueServer(("0.0.0.0", port), queue)
+    print(f"Work queue with {len(clip_filenames)} clips on port {port}.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        queue.close()
@@ -0,0 +1,150 @@
+import time
+import atexit
+import threading
+from collections import OrderedDict, deque
+
+
+class BackgroundWriter:
+    """Runs file and database writes on one worker thread, in submission order.
+
+    Click handlers hand their writes to submit() and return at once. Tasks
+    submitted with the same key while an earlier one is still waiting replace
+    it in place (coalescing). The queue holds at most `maxsize` tasks; when it
+    is full submit() waits, so a hanging drive slows the app down instead of
+    piling up memory. flush() waits until everything is written, close() also
+    stops the thread and runs at interpreter exit.
+
+    A failing task is tried `retries` more times, `retry_delay` seconds apart.
+    If it still fails, the first such exception is raised by the next flush()
+    or close(), so the app can tell the user instead of losing data silently.
+    """
+
+    def __init__(self, name="writer", maxsize=256, retries=2, retry_delay=0.2, history=10000):
+        self.maxsize = maxsize
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.tasks = OrderedDict()  # key -> (function, args)
+        self.condition = threading.Condition()
+        self.busy = False
+        self.closed = False
+        self.sequence = 0
+        self.max_depth = 0
+        self.coalesced = 0
+        self.writes = 0
+        self.write_total = 0.0
+        self.write_max = 0.0
+        self.write_times = deque(maxlen=history)  # the most recent durations, for the percentile
+        self.errors = 0
+        self.error = None  # first exception of a task that failed every try
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def submit(self, function, *args, key=None):
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("BackgroundWriter is closed")
+            if key is not None and key in self.tasks:
+                self.tasks[key] = (function, args)
+                self.coalesced += 1
+                return
+            while len(self.tasks) >= self.maxsize:
+                self.condition.wait()
+            if key is None:
+                self.sequence += 1
+                key = ('task', self.sequence)
+            self.tasks[key] = (function, args)
+            self.max_depth = max(self.max_depth, len(self.tasks))
+            self.condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.tasks and not self.closed:
+                    self.condition.wait()
+                if not self.tasks:
+                    return
+                _, (function, args) = self.tasks.popitem(last=False)
+                self.busy = True
+                self.condition.notify_all()
+            started = time.perf_counter()
+            failure = None
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    time.sleep(self.retry_delay)
+                try:
+                    function(*args)
+                    break
+                except Exception as error:
+                    failure = failure or error
+                    print(f"Speichern fehlgeschlagen (Versuch {attempt + 1}): {error!r}")
+            else:
+                with self.condition:
+                    self.errors += 1
+                    if self.error is None:
+                        self.error = failure
+            elapsed = time.perf_counter() - started
+            with self.condition:
+                self.writes += 1
+                self.write_total += elapsed
+                self.write_max = max(self.write_max, elapsed)
+                self.write_times.append(elapsed)
+                self.busy = False
+                self.condition.notify_all()
+
+    @property
+    def depth(self):
+        return len(self.tasks)
+
+    def _raise_error(self):
+        # Reported once; later failures only count in errors
+        with self.condition:
+            error, self.error = self.error, None
+        if error is not None:
+            raise error
+
+    def flush(self):
+        """Block until every submitted task has run; raises the first task that failed for good."""
+        with self.condition:
+            while self.tasks or self.busy:
+                self.condition.wait()
+        self._raise_error()
+
+    def close(self):
+        with self.condition:
+            if not self.closed:
+                self.closed = True
+                self.condition.notify_all()
+        self.thread.join()
+        self._raise_error()
+
+    def stats(self):
+        with self.condition:
+            times = sorted(self.write_times)
+        return {
+            "writes": self.writes,
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "mean_ms": self.write_total / self.writes * 1000 if self.writes else 0.0,
+            "p95_ms": times[int(len(times) * 0.95)] * 1000 if times else 0.0,
+            "max_ms": self.write_max * 1000,
+        }
+
+    def summary(self):
+        stats = self.stats()
+        return (f"{stats['writes']} Schreibvorgänge, {stats['coalesced']} zusammengefasst, "
+                f"Warteschlange max. {stats['max_depth']}, "
+                f"Dauer Ø {stats['mean_ms']:.2f} ms / 95% {stats['p95_ms']:.2f} ms / max. {stats['max_ms']:.2f} ms")
+
+
+_shared = None
+
+
+def shared_writer():
+    """The writer thread shared by everything in one app."""
+    global _shared
+    if _shared is None:
+        _shared = BackgroundWriter()
+    return _shared
@@ -0,0 +1,258 @@
+import os
+import sys
+import json
+import sqlite3
+import argparse
+import subprocess
+
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.avi', '.flv', '.wmv', '.mov')
+INDEX_NAME = 'clip_index.db'
+
+# Emotion codes of RAVDESS file names (third field), named like the answer buttons
+RAVDESS_EMOTIONS = {
+    "01": "Neutral", "02": "Ruhe", "03": "Freude", "04": "Trauer",
+    "05": "Wut", "06": "Angst", "07": "Ekel", "08": "Überraschung",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clips (
+    folder TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    duration REAL,
+    fps REAL,
+    width INTEGER,
+    height INTEGER,
+    codec TEXT,
+    has_audio INTEGER,
+    emotion TEXT,
+    PRIMARY KEY (folder, path)
+);
+CREATE TABLE IF NOT EXISTS directories (
+    folder TEXT NOT NULL,
+    directory TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    PRIMARY KEY (folder, directory)
+);
+"""
+
+
+def ravdess_emotion(filename):
+    parts = os.path.splitext(os.path.basename(filename))[0].split('-')
+    if len(parts) != 7:
+        return None
+    return RAVDESS_EMOTIONS.get(parts[2])
+
+
+def probe(path, ffprobe="ffprobe"):
+    """duration, fps, width, height, codec and audio presence from ffprobe; None values if it fails."""
+    try:
+        result = subprocess.run([ffprobe, "-v", "error", "-print_format", "json", "-show_streams",
+                                 "-show_format", path], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        info = json.loads(result.stdout or b"{}")
+    except (OSError, ValueError):
+        info = {}
+
+    streams = info.get("streams", [])
+    video = next((stream for stream in streams if stream.get("codec_type") == "video"), {})
+    fps = None
+    if "/" in video.get("avg_frame_rate", ""):
+        numerator, denominator = video["avg_frame_rate"].split("/")
+        fps = float(numerator) / float(denominator) if float(denominator) else None
+    duration = info.get("format", {}).get("duration")
+    return {
+        "duration": float(duration) if duration else None,
+        "fps": fps,
+        "width": video.get("width"),
+        "height": video.get("height"),
+        "codec": video.get("codec_name"),
+        "has_audio": int(any(stream.get("codec_type") == "audio" for stream in streams)) if streams else None,
+    }
+
+
+class ClipIndex:
+    """SQLite index of the clips in the app folders (Clips, Trainingsset, Testset).
+
+    Built by running this module. The apps revalidate it when they load
+    the clip list: the mtime of every indexed directory is compared, and
+    only directories that changed are listed again, so adding or removing
+    a clip costs one directory read. The apps do not run ffprobe; clips they
+    add get their metadata the next time the module is run, which also
+    picks up a clip replaced in place (that does not change its directory).
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path, timeout=30)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def update(self, script_folder, folder, workers=8, ffprobe="ffprobe"):
+        """Revalidate all of folder by size and mtime; new or changed clips and clips without metadata are probed."""
+        return self._sync(script_folder, folder, [''], True, workers, ffprobe)
+
+    def revalidate(self, script_folder, folder, workers=8, ffprobe=None):
+        """List only the directories whose mtime changed; None if folder was never indexed.
+
+        Without `ffprobe` changed clips are stored without metadata.
+        """
+        known_directories = dict(self.connection.execute(
+            "SELECT directory, mtime_ns FROM directories WHERE folder = ?", (folder,)))
+        if not known_directories:
+            indexed = self.connection.execute("SELECT 1 FROM clips WHERE folder = ? LIMIT 1", (folder,)).fetchone()
+            # An index from before directory mtimes were kept is checked in full once
+            return self.update(script_folder, folder, workers, ffprobe) if indexed else None
+
+        folder_path = os.path.join(script_folder, folder)
+        changed = []
+        for directory, mtime_ns in known_directories.items():
+            try:
+                if os.stat(os.path.join(folder_path, directory)).st_mtime_ns == mtime_ns:
+                    continue
+            except OSError:
+                pass
+            changed.append(directory)
+        if not changed:
+            return {"clips": None, "probed": 0, "changed": 0, "removed": 0}
+        return self._sync(script_folder, folder, changed, False, workers, ffprobe)
+
+    def _sync(self, script_folder, folder, directories, full, workers, ffprobe):
+        # Lists `directories`, and below them new directories or, when full, all of them
+        known = {}
+        unprobed = set()
+        for path, size, mtime_ns, duration in self.connection.execute(
+                "SELECT path, size, mtime_ns, duration FROM clips WHERE folder = ?", (folder,)):
+            known[path] = (size, mtime_ns)
+            if duration is None:
+                unprobed.add(path)
+        known_directories = {directory for directory, in self.connection.execute(
+            "SELECT directory FROM directories WHERE folder = ?", (folder,))}
+
+        folder_path = os.path.join(script_folder, folder)
+        found = {}
+        found_directories = {}
+        listed = set()
+        stack = list(directories)
+        while stack:
+            directory = stack.pop()
+            listed.add(directory)
+            try:
+                directory_mtime = os.stat(os.path.join(folder_path, directory)).st_mtime_ns
+                with os.scandir(os.path.join(folder_path, directory)) as iterator:
+                    entries = list(iterator)
+            except OSError:
+                continue
+            found_directories[directory] = directory_mtime
+            for entry in entries:
+                path = os.path.join(directory, entry.name)
+                if entry.is_dir():
+                    found_directories.setdefault(path, None)
+                    if full or path not in known_directories:
+                        stack.append(path)
+                elif entry.name.lower().endswith(VIDEO_EXTENSIONS):
+                    found[path] = entry.stat()
+
+        # A directory is gone when it could not be listed or its parent was listed without it;
+        # everything below it goes along. Directories below an unlisted one are left alone.
+        vanished = {directory for directory in known_directories if directory not in found_directories
+                    and (directory in listed or os.path.dirname(directory) in listed)}
+        gone = {directory for directory in known_directories if _inside(directory, vanished)}
+        changed = [path for path, stat in found.items() if known.get(path) != (stat.st_size, stat.st_mtime_ns)
+                   or (full and ffprobe and path in unprobed)]
+        removed = [path for path in known if path not in found
+                   and (os.path.dirname(path) in listed or _inside(os.path.dirname(path), vanished))]
+
+        if ffprobe is None:
+            probes = [dict.fromkeys(("duration", "fps", "width", "height", "codec", "has_audio"))] * len(changed)
+        else:
+            from concurrent.futures import ThreadPoolExecutor  # not at the top, the apps import this module at startup
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                probes = list(executor.map(lambda path: probe(os.path.join(folder_path, path), ffprobe), changed))
+        rows = [(folder, path, found[path].st_size, found[path].st_mtime_ns, info["duration"], info["fps"],
+                 info["width"], info["height"], info["codec"], info["has_audio"], ravdess_emotion(path))
+                for path, info in zip(changed, probes)]
+
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO clips VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.connection.executemany("DELETE FROM clips WHERE folder = ? AND path = ?",
+                                        ((folder, path) for path in removed))
+            # Subdirectories that were not listed keep their stored mtime
+            self.connection.executemany("INSERT OR REPLACE INTO directories VALUES (?, ?, ?)",
+                                        ((folder, directory, mtime_ns) for directory, mtime_ns
+                                         in found_directories.items() if mtime_ns is not None))
+            self.connection.executemany("DELETE FROM directories WHERE folder = ? AND directory = ?",
+                                        ((folder, directory) for directory in gone))
+        return {"clips": len(found) if full else None, "probed": len(changed) if ffprobe else 0,
+                "changed": len(changed), "removed": len(removed)}
+
+    def paths(self, folder, extensions=VIDEO_EXTENSIONS):
+        rows = self.connection.execute("SELECT path FROM clips WHERE folder = ? ORDER BY path", (folder,))
+        return [path for path, in rows if path.lower().endswith(extensions)]
+
+    def metadata(self, folder, path):
+        cursor = self.connection.execute("SELECT * FROM clips WHERE folder = ? AND path = ?", (folder, path))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip([column[0] for column in cursor.description], row))
+
+
+def _inside(path, directories):
+    # Directory path or one of its parents is in directories ('' is the clip folder itself)
+    while path:
+        if path in directories:
+            return True
+        path = os.path.dirname(path)
+    return '' in directories
+
+
+def load_clip_names(script_folder, folder, extensions=VIDEO_EXTENSIONS):
+    """Sorted paths of the indexed clips relative to folder; None if there is no usable index."""
+    db_path = os.path.join(script_folder, INDEX_NAME)
+    if not os.path.exists(db_path):
+        return None
+    index = ClipIndex(db_path)
+    try:
+        if index.revalidate(script_folder, folder) is None:
+            return None
+        names = index.paths(folder, extensions)
+    except sqlite3.Error as error:
+        # e.g. a read-only share; the apps then search the folder themselves
+        print(f"Der Clip-Index {db_path} konnte nicht aktualisiert werden: {error}")
+        return None
+    finally:
+        index.close()
+    return names or None
+
+
+def load_clip_paths(script_folder, folder, extensions=VIDEO_EXTENSIONS):
+    """Like load_clip_names, joined onto the folder path the same way the apps build their paths."""
+    names = load_clip_names(script_folder, folder, extensions)
+    if names is None:
+        return None
+    folder_path = os.path.join(script_folder, folder)
+    return [os.path.join(folder_path, name) for name in names]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh the clip index used by the apps at startup.")
+    parser.add_argument("folders", nargs="+", help="clip folders next to the app, e.g. Trainingsset Testset")
+    parser.add_argument("--workers", type=int, default=8, help="number of parallel ffprobe processes")
+    parser.add_argument("--ffprobe", default="ffprobe", help="path of the ffprobe executable")
+    args = parser.parse_args()
+
+    for folder in args.folders:
+        script_folder = os.path.dirname(os.path.abspath(folder))
+        index = ClipIndex(os.path.join(script_folder, INDEX_NAME))
+        counts = index.update(script_folder, os.path.basename(os.path.abspath(folder)), args.workers, args.ffprobe)
+        index.close()
+        print(f"{folder}: {counts['clips']} Clips, {counts['probed']} neu eingelesen, {counts['removed']} entfernt.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
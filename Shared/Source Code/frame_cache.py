@@ -0,0 +1,179 @@
+import mmap
+import tempfile
+import threading
+from collections import OrderedDict
+from PIL import Image
+from tk_player import END, letterbox
+
+
+class CachedClip:
+    """All frames of one clip as packed RGB at display size."""
+
+    def __init__(self, pts, pixels, storage=None):
+        self.pts = pts
+        self.pixels = pixels  # bytes or memoryview per frame
+        self.storage = storage  # (file, mmap) when memory-mapped
+        self.nbytes = sum(len(data) for data in pixels)
+
+    def close(self):
+        if self.storage is None:
+            return
+        file, mapping = self.storage
+        for data in self.pixels:
+            data.release()
+        try:
+            mapping.close()
+        except BufferError:
+            pass  # an image still wraps a frame; the mapping goes when it does
+        file.close()
+
+
+class CacheReader:
+    """Plays a CachedClip with the interface of DecoderThread, without decoding."""
+
+    def __init__(self, clip, size):
+        self.clip = clip
+        self.size = size
+        self.index = 0
+        self.error = None
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def empty(self):
+        return self.index >= len(self.clip.pts)
+
+    def get_nowait(self):
+        if self.index >= len(self.clip.pts):
+            return END
+        pts, data = self.clip.pts[self.index], self.clip.pixels[self.index]
+        self.index += 1
+        return pts, Image.frombuffer("RGB", self.size, data, "raw", "RGB", 0, 1)
+
+
+class FrameCache:
+    """Decoded, display-sized frames of the clips around the current trial.
+
+    CanvasPlayer records every clip it plays and preload() decodes upcoming
+    clips while the participant answers, so replays, back steps and the next
+    clip play without decoding. Clips are evicted least recently used once
+    `budget` bytes are exceeded; the previous, current and upcoming clips are
+    kept. With `memmap_folder` the frames live in memory-mapped files there,
+    so the OS can page them out instead of the app growing.
+    """
+
+    def __init__(self, budget=1024 * 1024 * 1024, memmap_folder=None):
+        self.budget = budget
+        self.memmap_folder = memmap_folder
+        self.clips = OrderedDict()  # key -> CachedClip, least recently used first
+        self.nbytes = 0
+        self.wanted = set()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._prefetch_stopped = None
+
+    def reader(self, key, size):
+        """A CacheReader for key, or None if it is not cached."""
+        with self.lock:
+            clip = self.clips.get(key)
+            if clip is None:
+                self.misses += 1
+                return None
+            self.clips.move_to_end(key)
+            self.hits += 1
+        return CacheReader(clip, size)
+
+    def __contains__(self, key):
+        return key in self.clips
+
+    def put(self, key, pts, pixels):
+        if self.memmap_folder is not None:
+            clip = self._mapped(pts, pixels)
+        else:
+            clip = CachedClip(pts, pixels)
+        with self.lock:
+            if key in self.clips:
+                self.nbytes -= self.clips.pop(key).nbytes
+            self.clips[key] = clip
+            self.nbytes += clip.nbytes
+            evicted = self._evict()
+        for clip in evicted:
+            clip.close()
+
+    def _evict(self):
+        evicted = []
+        for key in list(self.clips):
+            if self.nbytes <= self.budget:
+                break
+            if key not in self.wanted:
+                clip = self.clips.pop(key)
+                self.nbytes -= clip.nbytes
+                evicted.append(clip)
+        # Wanted clips alone exceed the budget: drop the newest
+        while self.nbytes > self.budget and self.clips:
+            _, clip = self.clips.popitem()
+            self.nbytes -= clip.nbytes
+            evicted.append(clip)
+        return evicted
+
+    def _mapped(self, pts, pixels):
+        file = tempfile.TemporaryFile(dir=self.memmap_folder)
+        for data in pixels:
+            file.write(data)
+        file.flush()
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapping)
+        frames, offset = [], 0
+        for data in pixels:
+            frames.append(view[offset:offset + len(data)])
+            offset += len(data)
+        view.release()
+        return CachedClip(pts, frames, (file, mapping))
+
+    def preload(self, clips, size):
+        """Decode (key, frames) clips that are not cached yet on a background thread."""
+        self.stop_preload()
+        stopped = self._prefetch_stopped = threading.Event()
+        missing = [(key, frames) for key, frames in clips if key not in self.clips]
+        if missing:
+            threading.Thread(target=self._preload, args=(missing, size, stopped), name="preload",
+                             daemon=True).start()
+
+    def stop_preload(self):
+        if self._prefetch_stopped is not None:
+            self._prefetch_stopped.set()
+            self._prefetch_stopped = None
+
+    def _preload(self, clips, size, stopped):
+        for key, frames in clips:
+            pts, pixels, nbytes = [], [], 0
+            iterator = frames()
+            try:
+                for frame_pts, frame in iterator:
+                    if stopped.is_set():
+                        return
+                    data = letterbox(frame, size).tobytes("raw", "RGB")
+                    nbytes += len(data)
+                    if nbytes > self.budget:
+                        break
+                    pts.append(frame_pts)
+                    pixels.append(data)
+                else:
+                    self.put(key, pts, pixels)
+            except Exception as error:
+                print(f"Vorladen von {key} fehlgeschlagen: {error!r}")
+            finally:
+                iterator.close()
+
+    def close(self):
+        self.stop_preload()
+        with self.lock:
+            clips = list(self.clips.values())
+            self.clips.clear()
+            self.nbytes = 0
+        for clip in clips:
+            clip.close()
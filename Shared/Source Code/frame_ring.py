@@ -0,0 +1,194 @@
+import os
+import queue
+import atexit
+import multiprocessing
+from multiprocessing import shared_memory
+from PIL import Image
+from tk_player import END, letterbox
+
+CONFIG_NAME = 'decoder_process.txt'
+
+
+def open_frame_ring(script_folder, size):
+    # Clips are decoded in a separate process when decoder_process.txt exists next to the program
+    if os.path.exists(os.path.join(script_folder, CONFIG_NAME)):
+        return FrameRing(size)
+    return None
+
+
+def serve(name, size, slots, control, filled, free):
+    """Decoder process: plays clips into the ring as told through `control`."""
+    memory = shared_memory.SharedMemory(name=name)
+    try:
+        command = control.recv()
+        while command[0] != "quit":
+            if command[0] == "play":
+                command = decode(memory, size, slots, control, filled, free, *command[1:])
+            else:
+                command = None
+            if command is None:
+                command = control.recv()
+    finally:
+        memory.close()
+
+
+def decode(memory, size, slots, control, filled, free, generation, frames, start):
+    # Returns the command that interrupted the clip, None when it played to the end
+    frame_bytes = size[0] * size[1] * 4
+    slot = 0
+    try:
+        frames = frames()
+        try:
+            for pts, frame in frames:
+                if control.poll():
+                    return control.recv()
+                if pts < start:
+                    continue
+                pixels = letterbox(frame, size).convert("RGBX").tobytes()
+                while not free.acquire(timeout=0.05):
+                    if control.poll():
+                        return control.recv()
+                memory.buf[slot * frame_bytes:(slot + 1) * frame_bytes] = pixels
+                filled.put((generation, slot, pts))
+                slot = (slot + 1) % slots
+        finally:
+            frames.close()
+    except Exception as error:
+        filled.put((generation, None, repr(error)))
+        return None
+    filled.put((generation, None, None))
+    return None
+
+
+class FrameRing:
+    """Decodes clips in a separate process into a ring of shared-memory frames.
+
+    Decoding then runs on another core instead of competing with the Tk event
+    loop for the GIL. The process writes letterboxed RGBX frames into one of
+    `slots` shared-memory slots and reports (clip, slot, pts) through a queue;
+    the player wraps the slot without copying and hands it back once the
+    frame was shown or dropped. The pipe `control` carries play, stop and
+    quit, a play can start at a pts for seeking.
+    """
+
+    def __init__(self, size, slots=8):
+        context = multiprocessing.get_context("spawn")
+        self.size = size
+        self.slots = slots
+        self.frame_bytes = size[0] * size[1] * 4
+        self.memory = shared_memory.SharedMemory(create=True, size=slots * self.frame_bytes)
+        self.control, child_control = context.Pipe()
+        self.filled = context.Queue()
+        self.free = context.Semaphore(slots)
+        self.process = context.Process(target=serve, name="decoder", daemon=True,
+                                       args=(self.memory.name, size, slots, child_control, self.filled, self.free))
+        self.process.start()
+        self.generation = 0
+        self.held = None  # slot of the frame the player has
+        self.peeked = None  # (generation, slot, pts) taken from `filled` by has_frame()
+        atexit.register(self.close)
+
+    def decoder(self, frames, size, maxsize=None):
+        """Decoder for CanvasPlayer; the ring's slots take the place of the queue size."""
+        if size != self.size:
+            raise ValueError(f"FrameRing is made for {self.size}, not {size}")
+        return RingDecoder(self, frames)
+
+    def play(self, frames, start=0.0):
+        self.release()
+        self._drop_peeked()
+        self.generation += 1
+        self.control.send(("play", self.generation, frames, start))
+        return self.generation
+
+    def stop(self, generation):
+        self.release()
+        if generation == self.generation:
+            self.control.send(("stop",))
+
+    def release(self):
+        if self.held is not None:
+            self.held = None
+            self.free.release()
+
+    def _drop_peeked(self):
+        if self.peeked is not None and self.peeked[1] is not None:
+            self.free.release()
+        self.peeked = None
+
+    def _take(self, generation):
+        # Next entry of this clip; raises queue.Empty
+        if self.peeked is not None:
+            if self.peeked[0] == generation:
+                entry, self.peeked = self.peeked, None
+                return entry
+            self._drop_peeked()
+        while True:
+            entry = self.filled.get_nowait()
+            if entry[0] == generation:
+                return entry
+            # Left over from a clip that was stopped
+            if entry[1] is not None:
+                self.free.release()
+
+    def has_frame(self, generation):
+        """Whether a frame or the end of this clip is waiting; stale frames are handed back on the way."""
+        if self.peeked is not None and self.peeked[0] != generation:
+            self._drop_peeked()
+        if self.peeked is None:
+            try:
+                self.peeked = self._take(generation)
+            except queue.Empty:
+                return False
+        return True
+
+    def next_frame(self, generation):
+        """(pts, image) of the clip, END after its last frame; raises queue.Empty."""
+        self.release()
+        _, slot, pts = self._take(generation)
+        if slot is None:
+            return END, pts
+        self.held = slot
+        view = self.memory.buf[slot * self.frame_bytes:(slot + 1) * self.frame_bytes]
+        return (pts, Image.frombuffer("RGBX", self.size, view, "raw", "RGBX", 0, 1)), None
+
+    def close(self):
+        if self.process is None:
+            return
+        self.control.send(("quit",))
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process = None
+        try:
+            self.memory.close()
+        except BufferError:
+            pass  # an image still wraps a slot; the block goes away with the process
+        self.memory.unlink()
+
+
+class RingDecoder:
+    """One clip of a FrameRing, with the interface of DecoderThread."""
+
+    def __init__(self, ring, frames):
+        self.ring = ring
+        self.frames = frames
+        self.generation = None
+        self.error = None
+
+    def start(self, start=0.0):
+        self.generation = self.ring.play(self.frames, start)
+
+    def get_nowait(self):
+        item, error = self.ring.next_frame(self.generation)
+        if error is not None:
+            # Only the text of an exception crosses the process boundary safely
+            self.error = RuntimeError(error)
+        return item
+
+    def empty(self):
+        # filled.empty() would also count frames of a stopped clip
+        return not self.ring.has_frame(self.generation)
+
+    def stop(self):
+        self.ring.stop(self.generation)
@@ -0,0 +1,417 @@
+import os
+import sys
+import json
+import time
+import runpy
+import random
+import shutil
+import argparse
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from PyQt5.QtMultimedia import QMediaPlayer
+from startup_benchmark import ENTRY_POINTS, add_baseline_arguments, load_baseline, save_results, compare
+
+REPOSITORY = Path(__file__).resolve().parents[2]
+
+# The Qt programs; the macOS programs play through Tk and have no QMediaPlayer to replace
+QT_ENTRY_POINTS = [entry_point for entry_point in ENTRY_POINTS if "/MacOS/" not in entry_point]
+
+
+def kind_of(entry_point):
+    if entry_point.startswith("Labeling Software/"):
+        return "labeling"
+    return "train" if "/Train Software/" in entry_point else "test"
+
+
+CLIP_FOLDERS = {"labeling": "Clips", "train": "Trainingsset", "test": "Testset"}
+
+
+def make_clips(folder, count, size):
+    """`count` clip files with RAVDESS names; the stub player never decodes them, only their size counts."""
+    os.makedirs(folder, exist_ok=True)
+    data = (bytes(range(256)) * (size // 256 + 1))[:size]
+    for index in range(count):
+        # Emotion in the third field, the actor field keeps the names unique
+        name = f"01-01-{index % 8 + 1:02d}-01-01-01-{index // 8 + 1:02d}.mp4"
+        with open(os.path.join(folder, name), 'wb') as f:
+            f.write(data)
+
+
+def read_counters():
+    """Bytes read and written by this process so far and its resident memory; None where /proc is missing."""
+    counters = {"read": None, "written": None, "rss": None}
+    try:
+        with open("/proc/self/io") as f:
+            io = dict(line.split(": ") for line in f.read().splitlines())
+        counters["read"], counters["written"] = int(io["rchar"]), int(io["wchar"])
+    except (OSError, KeyError, ValueError):
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            counters["rss"] = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        pass
+    return counters
+
+
+class StubMediaPlayer(QObject):
+    """Stands in for QMediaPlayer: goes through the states of a real backend without decoding.
+
+    The clip's bytes are read like a backend would, from the QBuffer of a
+    ReadAheadCache or from the file; a missing file ends in InvalidMedia.
+    A clip plays for `clip_ms` and then reaches EndOfMedia.
+    """
+
+    stateChanged = pyqtSignal(int)
+    mediaStatusChanged = pyqtSignal(int)
+    clip_ms = 3000
+
+    # PlayerPool looks these up on the class it creates its players from
+    StoppedState, PlayingState, PausedState = QMediaPlayer.StoppedState, QMediaPlayer.PlayingState, QMediaPlayer.PausedState
+    BufferingMedia, BufferedMedia = QMediaPlayer.BufferingMedia, QMediaPlayer.BufferedMedia
+    VideoSurface, LowLatency = QMediaPlayer.VideoSurface, QMediaPlayer.LowLatency
+
+    def __init__(self, parent=None, flags=0):
+        super().__init__(parent)
+        self._state = QMediaPlayer.StoppedState
+        self._status = QMediaPlayer.NoMedia
+        self._position = 0
+        self._started = None
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._end)
+
+    def setMedia(self, content, stream=None):
+        self.stop()
+        self._set_status(QMediaPlayer.LoadingMedia)
+        try:
+            if stream is not None:
+                stream.readAll()
+            else:
+                with open(content.canonicalUrl().toLocalFile(), 'rb') as f:
+                    f.read()
+        except OSError:
+            self._set_status(QMediaPlayer.InvalidMedia)
+            return
+        self._set_status(QMediaPlayer.LoadedMedia)
+
+    def setVideoOutput(self, output):
+        pass
+
+    def setMuted(self, muted):
+        pass
+
+    def play(self):
+        if self._status in (QMediaPlayer.NoMedia, QMediaPlayer.LoadingMedia, QMediaPlayer.InvalidMedia):
+            return
+        if self._status == QMediaPlayer.EndOfMedia:
+            self._position = 0
+        self._started = time.perf_counter() - self._position / 1000
+        self.timer.start(max(0, self.clip_ms - self._position))
+        self._set_status(QMediaPlayer.BufferedMedia)
+        self._set_state(QMediaPlayer.PlayingState)
+
+    def pause(self):
+        if self._status in (QMediaPlayer.NoMedia, QMediaPlayer.LoadingMedia, QMediaPlayer.InvalidMedia):
+            return
+        self._position = self.position()
+        self._started = None
+        self.timer.stop()
+        self._set_status(QMediaPlayer.BufferedMedia)
+        self._set_state(QMediaPlayer.PausedState)
+
+    def stop(self):
+        self._position = 0
+        self._started = None
+        self.timer.stop()
+        self._set_state(QMediaPlayer.StoppedState)
+
+    def setPosition(self, position):
+        self._position = min(position, self.clip_ms)
+        if self._started is not None:
+            self.play()
+
+    def position(self):
+        if self._started is None:
+            return self._position
+        return min(self.clip_ms, int((time.perf_counter() - self._started) * 1000))
+
+    def duration(self):
+        return self.clip_ms if self._status not in (QMediaPlayer.NoMedia, QMediaPlayer.InvalidMedia) else 0
+
+    def state(self):
+        return self._state
+
+    def mediaStatus(self):
+        return self._status
+
+    def _end(self):
+        self._position = self.clip_ms
+        self._started = None
+        self._set_status(QMediaPlayer.EndOfMedia)
+        self._set_state(QMediaPlayer.StoppedState)
+
+    def _set_state(self, state):
+        if state != self._state:
+            self._state = state
+            self.stateChanged.emit(state)
+
+    def _set_status(self, status):
+        if status != self._status:
+            self._status = status
+            self.mediaStatusChanged.emit(status)
+
+
+class Participant(QObject):
+    """Clicks through an app window like a participant, `think_ms` after the buttons opened.
+
+    Answers pick a random emotion; with `repeat_rate` the labeling app
+    replays the clip instead and with `back_rate` the train and test apps go
+    back one trial (the labeling window has no back button). Every action
+    records how long its click handlers ran, how long the buttons took to
+    open again, and the process counters before it.
+    """
+
+    def __init__(self, window, kind, trials, think_ms=0, repeat_rate=0.0, back_rate=0.0, seed=None):
+        super().__init__(window)
+        self.window = window
+        self.kind = kind
+        self.trials = trials
+        self.think_ms = think_ms
+        self.repeat_rate = repeat_rate
+        self.back_rate = back_rate
+        self.rng = random.Random(seed)
+        self.labeled = 0
+        self.actions = []  # {"action", "handler", "ready", "read", "written", "rss"}
+        self.acted_at = None
+        self.finished = None
+
+    @property
+    def answered(self):
+        return self.labeled if self.kind == "labeling" else len(self.window.engine.responses)
+
+    def start(self):
+        self.acted_at = time.perf_counter()
+        QTimer.singleShot(0, self._wait)
+
+    def _ready(self):
+        if self.kind == "train" and self.window.verstanden_button.isEnabled():
+            return True
+        panel = self.window.response_panel1 if self.kind == "labeling" else self.window.response_panel
+        return panel.isEnabled()
+
+    def _wait(self):
+        if self.answered >= self.trials or not self.window.export_button.isHidden():
+            self.finished = time.perf_counter()
+            self.window.close()
+            return
+        if not self._ready():
+            QTimer.singleShot(1, self._wait)
+            return
+        if self.actions:
+            self.actions[-1]["ready"] = time.perf_counter() - self.acted_at
+        QTimer.singleShot(self.think_ms, self._act)
+
+    def _act(self):
+        name, buttons = self._choose()
+        action = dict(read_counters(), action=name, ready=None)
+        started = time.perf_counter()
+        for button in buttons:
+            button.click()
+        self.acted_at = time.perf_counter()
+        action["handler"] = self.acted_at - started
+        self.actions.append(action)
+        if name == "answer" and self.kind == "labeling":
+            self.labeled += 1
+        QTimer.singleShot(0, self._wait)
+
+    def _choose(self):
+        window, roll = self.window, self.rng.random()
+        if self.kind == "train" and window.verstanden_button.isEnabled():
+            return "next", [window.verstanden_button]
+        if self.kind == "labeling":
+            if roll < self.repeat_rate:
+                return "repeat", [window.repeat_button]
+            buttons = [self.rng.choice(window.response_panel1.buttons)]
+            for panel in (window.response_panel2, window.response_panel3):
+                if self.rng.random() < 0.5:
+                    buttons.append(self.rng.choice(panel.buttons))
+            return "answer", buttons + [window.next_button]
+        if roll < self.back_rate and self.answered > 0:
+            return "back", [window.back_button]
+        return "answer", [self.rng.choice(window.response_panel.buttons)]
+
+
+def summarize(participant, started, counters):
+    actions = participant.actions
+    seconds = participant.finished - started
+    handlers = sorted(action["handler"] for action in actions)
+    readies = [action["ready"] for action in actions if action["ready"] is not None]
+    summary = {
+        "trials": participant.answered,
+        "actions": len(actions),
+        "seconds": seconds,
+        "throughput": participant.answered / seconds if seconds > 0 else None,
+        "handler_median": statistics.median(handlers) if handlers else None,
+        "handler_p95": handlers[int(0.95 * (len(handlers) - 1))] if handlers else None,
+        "handler_max": handlers[-1] if handlers else None,
+        "ready_median": statistics.median(readies) if readies else None,
+        "rss_start": actions[0]["rss"] if actions else counters["rss"],
+        "rss_end": counters["rss"],
+        "rss_peak": max([action["rss"] for action in actions if action["rss"] is not None] + [counters["rss"] or 0]),
+    }
+    for key in ("read", "written"):
+        if counters[key] is None or not actions:
+            summary[key + "_per_trial"] = None
+        else:
+            summary[key + "_per_trial"] = (counters[key] - actions[0][key]) / max(1, participant.answered)
+    swaps = participant.window.player_pool.swap_latencies
+    summary["swap_median"] = statistics.median(swaps) if swaps else None
+    return summary
+
+
+def run_participant(entry_point, folder, args):
+    """Child process: runs one app in `folder` with the stub backend and prints its results."""
+    import player_pool
+    from PyQt5.QtWidgets import QApplication
+    from background_writer import shared_writer
+
+    path = str(REPOSITORY / entry_point)
+    # The programs find their folders next to sys.argv[0] and import their own modules from their folder
+    sys.argv = [os.path.join(folder, os.path.basename(path))]
+    sys.path.insert(0, os.path.dirname(path))
+    StubMediaPlayer.clip_ms = args.clip_ms
+    player_pool.QMediaPlayer = StubMediaPlayer
+    program = runpy.run_path(path, run_name="participant_simulator")
+
+    app = QApplication(sys.argv)
+    kind = kind_of(entry_point)
+    if kind == "labeling":
+        window = program["EmotionalRecognitionApp"](program["open_label_store"](), program["open_work_queue"]())
+        dialog = program["NewUserDialog"](window)
+        dialog.create_user_folder("simulant")
+    else:
+        # With --keep an earlier run may have left a session unfinished; every run starts a new one
+        program["EmotionalRecognitionApp"].ask_resume = lambda self, log: False
+        window = program["EmotionalRecognitionApp"]()
+    window.show()
+
+    participant = Participant(window, kind, args.trials, args.think_ms, args.repeat_rate, args.back_rate, args.seed)
+    started = time.perf_counter()
+    if kind == "labeling":
+        window.start_program("simulant")
+    else:
+        window.start_button.click()
+    participant.start()
+    app.exec_()
+
+    # Labels and session logs still on the writer thread count for this run
+    shared_writer().flush()
+    result = {"summary": summarize(participant, started, read_counters()), "actions": participant.actions}
+    print("RESULT " + json.dumps(result), flush=True)
+
+
+def simulate(entry_point, folder, args, env):
+    kind = kind_of(entry_point)
+    make_clips(os.path.join(folder, CLIP_FOLDERS[kind]), args.clips or args.trials, args.clip_kb * 1024)
+    if kind == "labeling" and args.label_store:
+        open(os.path.join(folder, 'labels.db'), 'w').close()
+    options = ["--trials", str(args.trials), "--clip-ms", str(args.clip_ms), "--think-ms", str(args.think_ms),
+               "--repeat-rate", str(args.repeat_rate), "--back-rate", str(args.back_rate), "--seed", str(args.seed)]
+    # The labeling program creates its user folders relative to the working directory
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", entry_point, "--folder", folder]
+                            + options, cwd=folder, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            timeout=args.timeout)
+    for line in result.stdout.decode("utf-8", "replace").splitlines():
+        if line.startswith("RESULT "):
+            return json.loads(line[len("RESULT "):])
+    lines = result.stderr.decode("utf-8", "replace").strip().splitlines()
+    raise RuntimeError(lines[-1] if lines else f"exit code {result.returncode}")
+
+
+def milliseconds(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.1f}"
+
+
+def kilobytes(count):
+    return "-" if count is None else f"{count / 1024:.1f}K"
+
+
+def megabytes(count):
+    return "-" if count is None else f"{count / 1024 / 1024:.1f}M"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated participants click through the Qt programs without "
+                                                 "a display and measure every trial.")
+    parser.add_argument("--apps", nargs="*", help="program file names without .py, e.g. APP VideoEmoTestapp (default: all)")
+    parser.add_argument("--trials", type=int, default=720, help="answers per program")
+    parser.add_argument("--clips", type=int, help="generated clips per program (default: --trials)")
+    parser.add_argument("--clip-kb", type=int, default=16, help="size of a generated clip")
+    parser.add_argument("--clip-ms", type=int, default=3000, help="how long a clip plays in the stub player")
+    parser.add_argument("--think-ms", type=int, default=0, help="pause between the buttons opening and the click")
+    parser.add_argument("--repeat-rate", type=float, default=0.05, help="share of clicks on Wiederholen (labeling)")
+    parser.add_argument("--back-rate", type=float, default=0.02, help="share of clicks on Zurück (train and test)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--label-store", action="store_true", help="label into a labels.db instead of the journal")
+    parser.add_argument("--timeout", type=float, default=3600, help="seconds per program")
+    parser.add_argument("--keep", help="create the program folders here and keep them")
+    add_baseline_arguments(parser)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--folder", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_participant(args.child, args.folder, args)
+        return 0
+
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    baseline = load_baseline(args.baseline)
+    entry_points = [entry_point for entry_point in QT_ENTRY_POINTS
+                    if not args.apps or Path(entry_point).stem in args.apps]
+    root = args.keep or tempfile.mkdtemp(prefix="participants-")
+
+    results = {}
+    regressions = 0
+    print(f"{'Programm':<20} {'Trials':>6} {'pro s':>7} {'Klick ms':>9} {'p95':>7} {'max':>7} "
+          f"{'Lesen':>8} {'Schreiben':>9} {'Speicher':>9} {'Zuwachs':>8}")
+    try:
+        for entry_point in entry_points:
+            name = Path(entry_point).stem
+            folder = os.path.join(root, name)
+            os.makedirs(folder, exist_ok=True)
+            try:
+                result = simulate(entry_point, folder, args, env)
+            except (RuntimeError, subprocess.TimeoutExpired) as error:
+                print(f"{name:<20} Fehler: {error}")
+                continue
+            results[entry_point] = result
+            summary = result["summary"]
+            growth = None
+            if summary["rss_start"] is not None and summary["rss_end"] is not None:
+                growth = summary["rss_end"] - summary["rss_start"]
+            throughput = "-" if summary["throughput"] is None else f"{summary['throughput']:.1f}"
+            line = (f"{name:<20} {summary['trials']:6d} {throughput:>7} {milliseconds(summary['handler_median']):>9} "
+                    f"{milliseconds(summary['handler_p95']):>7} {milliseconds(summary['handler_max']):>7} "
+                    f"{kilobytes(summary['read_per_trial']):>8} {kilobytes(summary['written_per_trial']):>9} "
+                    f"{megabytes(summary['rss_end']):>9} {megabytes(growth):>8}")
+            earlier = baseline.get(entry_point)
+            if earlier is not None:
+                text, regressed = compare(summary["handler_p95"], earlier["summary"]["handler_p95"], args.tolerance)
+                line += text
+                regressions += regressed
+            print(line)
+    finally:
+        if args.keep is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+    print("Lesen und Schreiben je Antwort, Speicher am Ende; Klick ms ist die Laufzeit der Klick-Handler.")
+    save_results(args.save, results)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
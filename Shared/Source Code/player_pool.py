@@ -0,0 +1,175 @@
+import os
+import time
+from functools import partial
+from PyQt5.QtCore import QObject, QUrl, QBuffer, QIODevice, pyqtSignal
+from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent
+
+
+class PlayerPool(QObject):
+    """A set of QMediaPlayers that load the next clips while the current one plays.
+
+    play() switches the video output to a player that already holds the clip,
+    so the next trial starts without waiting for the backend to open the
+    file. Only signals of the current player are forwarded, preloading never
+    reaches the app's stateChanged handler. With `keep_previous` one more
+    player holds the clip played before, so a back step and a replay only
+    seek instead of opening and decoding the file again.
+
+    With a ReadAheadCache the clips are fed to the players from memory
+    through a QBuffer, and the cache reads the next clips while one plays.
+    """
+
+    stateChanged = pyqtSignal(int)
+    mediaStatusChanged = pyqtSignal(int)
+
+    def __init__(self, parent, video_output=None, depth=2, memory_cap=256 * 1024 * 1024,
+                 flags=QMediaPlayer.VideoSurface, muted=False, keep_previous=True, read_ahead=None):
+        super().__init__(parent)
+        self.video_output = video_output
+        self.depth = depth
+        self.memory_cap = memory_cap  # bytes of preloaded clips, measured by file size
+
+        self.keep_previous = keep_previous
+        self.read_ahead = read_ahead
+        self.buffers = {}  # player -> QBuffer with its clip's bytes
+        self.previous = None
+        self.players = []
+        for _ in range(depth + 2 if keep_previous else depth + 1):
+            player = QMediaPlayer(parent, flags)
+            player.setMuted(muted)
+            player.stateChanged.connect(partial(self._on_state_changed, player))
+            player.mediaStatusChanged.connect(partial(self._on_media_status_changed, player))
+            self.players.append(player)
+
+        self.current = self.players[0]
+        if video_output is not None:
+            self.current.setVideoOutput(video_output)
+
+        self.loaded = {}  # path -> player that holds the clip
+        self.sizes = {}  # path -> file size
+        self.swap_latencies = []  # seconds from play() until the player runs
+        self._swap_started = None
+
+    def _path_of(self, player):
+        for path, holder in self.loaded.items():
+            if holder is player:
+                return path
+        return None
+
+    def _load(self, player, path):
+        old_path = self._path_of(player)
+        if old_path is not None:
+            del self.loaded[old_path]
+        if self.read_ahead is None:
+            player.setMedia(QMediaContent(QUrl.fromLocalFile(path)))
+        else:
+            buffer = QBuffer(player)
+            buffer.setData(self.read_ahead.read(path))
+            buffer.open(QIODevice.ReadOnly)
+            # The URL only tells the backend the container format
+            player.setMedia(QMediaContent(QUrl.fromLocalFile(path)), buffer)
+            old_buffer = self.buffers.pop(player, None)
+            if old_buffer is not None:
+                old_buffer.close()
+                old_buffer.deleteLater()
+            self.buffers[player] = buffer
+        self.loaded[path] = player
+
+    def _idle_player(self, keep):
+        # Prefer empty players, then players holding clips that are no longer wanted
+        if self.keep_previous:
+            keep = list(keep) + [self.previous]
+        candidates = [player for player in self.players if player is not self.current]
+        for player in candidates:
+            if self._path_of(player) is None:
+                return player
+        for player in candidates:
+            if self._path_of(player) not in keep:
+                return player
+        return None
+
+    @property
+    def lookahead(self):
+        """How many upcoming clips play() can make use of."""
+        return max(self.depth, self.read_ahead.depth) if self.read_ahead is not None else self.depth
+
+    def play(self, path, upcoming=()):
+        """Play path on the video output and preload the first `depth` clips of upcoming."""
+        path = os.path.abspath(path)
+        lookahead = upcoming
+        upcoming = [os.path.abspath(p) for p in upcoming][:self.depth]
+
+        self._swap_started = time.perf_counter()
+        player = self.loaded.get(path)
+        if player is None:
+            player = self._idle_player(upcoming) or self.current
+            self._load(player, path)
+            if self.read_ahead is not None:
+                self.read_ahead.record_trial(path, self.read_ahead.last_read)
+        elif self.read_ahead is not None:
+            self.read_ahead.record_trial(path)
+        if self.read_ahead is not None:
+            self.read_ahead.prefetch(lookahead)
+
+        if player is not self.current:
+            self.previous = self._path_of(self.current)
+            self.current.stop()
+            if self.video_output is not None:
+                player.setVideoOutput(self.video_output)
+            self.current = player
+        player.setPosition(0)
+        player.play()
+        self._check_swap_done()
+
+        self.preload(upcoming)
+        return player
+
+    def preload(self, paths):
+        preloaded = sum(self._size(p) for p, player in self.loaded.items() if player is not self.current)
+        for path in paths:
+            if path in self.loaded:
+                continue
+            if self.read_ahead is not None and not self.read_ahead.cached(path):
+                # Not read yet; loading it now would wait for the drive
+                continue
+            size = self._size(path)
+            if preloaded + size > self.memory_cap:
+                break
+            player = self._idle_player(paths)
+            if player is None:
+                break
+            self._load(player, path)
+            # Pausing makes the backend open the file and decode up to the first frame
+            player.pause()
+            preloaded += size
+
+    def _size(self, path):
+        if path not in self.sizes:
+            try:
+                self.sizes[path] = os.path.getsize(path)
+            except OSError:
+                self.sizes[path] = 0
+        return self.sizes[path]
+
+    def _check_swap_done(self):
+        if self._swap_started is None:
+            return
+        status = self.current.mediaStatus()
+        if self.current.state() == QMediaPlayer.PlayingState and status in (QMediaPlayer.BufferedMedia,
+                                                                            QMediaPlayer.BufferingMedia):
+            self.swap_latencies.append(time.perf_counter() - self._swap_started)
+            self._swap_started = None
+
+    @property
+    def last_swap_latency(self):
+        return self.swap_latencies[-1] if self.swap_latencies else None
+
+    def _on_state_changed(self, player, state):
+        if player is self.current:
+            self._check_swap_done()
+            self.stateChanged.emit(state)
+
+    def _on_media_status_changed(self, player, status):
+        if player is self.current:
+            self._check_swap_done()
+            self.mediaStatusChanged.emit(status)
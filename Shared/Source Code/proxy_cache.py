@@ -0,0 +1,213 @@
+import os
+import csv
+import sys
+import hashlib
+import argparse
+import tempfile
+import subprocess
+
+# Display sizes of the apps; video-only apps never play sound, their proxies drop the audio track
+PROXY_TIERS = {
+    "labeling": {"width": 640, "height": 480, "audio": False},   # APP.py
+    "video": {"width": 1280, "height": 720, "audio": False},     # Video*app.py
+    "both": {"width": 1280, "height": 720, "audio": True},       # Both*app.py
+    "tk": {"width": 1275, "height": 715, "audio": False},        # macOS Tk apps
+}
+GOP = 12  # short GOP, seeking and replays never decode far from a key frame
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.avi', '.flv', '.wmv', '.mov')
+
+
+def ffmpeg_arguments(source_path, proxy_path, tier):
+    settings = PROXY_TIERS[tier]
+    arguments = [
+        "-nostdin", "-y", "-loglevel", "error", "-i", source_path,
+        "-vf", f"scale={settings['width']}:{settings['height']}:force_original_aspect_ratio=decrease,"
+               "scale=trunc(iw/2)*2:trunc(ih/2)*2",
+        "-c:v", "libx264", "-preset", "veryfast", "-tune", "fastdecode", "-crf", "20",
+        "-pix_fmt", "yuv420p", "-g", str(GOP), "-keyint_min", str(GOP), "-sc_threshold", "0",
+        "-threads", "1", "-movflags", "+faststart",
+    ]
+    if settings["audio"]:
+        arguments += ["-c:a", "aac", "-b:a", "128k"]
+    else:
+        arguments += ["-an"]
+    return arguments + [proxy_path]
+
+
+def settings_key(tier):
+    return hashlib.blake2b(" ".join(ffmpeg_arguments("", "", tier)).encode('utf-8'), digest_size=4).hexdigest()
+
+
+def source_hash(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(1024 * 1024)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def proxy_folder(script_folder, tier):
+    return os.path.join(script_folder, 'Proxies', tier)
+
+
+class ProxyIndex:
+    """Maps clips to their transcoded proxies.
+
+    Apps keep the original paths in video_list (answers and labels refer to
+    them) and only call resolve() when handing a clip to the player. Without
+    a Proxies folder every path resolves to itself. Clips are keyed by their
+    path relative to the folder that holds Proxies, so equal names in
+    different folders get their own proxies; a clip whose size or mtime
+    changed since its proxy was made plays from the source.
+    """
+
+    def __init__(self, proxy_dir):
+        self.proxy_dir = proxy_dir
+        self.root = os.path.dirname(os.path.dirname(os.path.abspath(proxy_dir)))
+        self.outdated = set()
+        self.entries = {}  # relative path -> (size, mtime_ns, source hash, proxy file)
+        index_path = os.path.join(proxy_dir, 'index.csv')
+        if os.path.exists(index_path):
+            with open(index_path, 'r', newline='') as f:
+                for row in csv.reader(f):
+                    if len(row) == 5:
+                        self.entries[row[0]] = (int(row[1]), int(row[2]), row[3], row[4])
+
+    def key(self, path):
+        return os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, '/')
+
+    def resolve(self, path):
+        if not self.entries:
+            return path
+        key = self.key(path)
+        entry = self.entries.get(key)
+        if entry is None:
+            return path
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return path
+        if (stat.st_size, stat.st_mtime_ns) != entry[:2]:
+            if key not in self.outdated:
+                self.outdated.add(key)
+                print(f"{key} wurde geändert, das Original wird abgespielt; bitte proxy_cache.py erneut ausführen.")
+            return path
+        proxy_path = os.path.join(self.proxy_dir, entry[3])
+        return proxy_path if os.path.exists(proxy_path) else path
+
+    def save(self):
+        temp_path = os.path.join(self.proxy_dir, 'index.csv.tmp')
+        with open(temp_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            for name, entry in sorted(self.entries.items()):
+                writer.writerow([name, *entry])
+        os.replace(temp_path, os.path.join(self.proxy_dir, 'index.csv'))
+
+
+def build_proxies(source_folder, proxy_dir, tier, workers=None, ffmpeg="ffmpeg"):
+    """Transcode every clip below source_folder that has no up-to-date proxy.
+
+    Proxies are named <source hash>-<settings hash>.mp4, so identical clips
+    share one proxy and changing the tier settings produces new files.
+    Returns (transcoded, reused, failed).
+    """
+    os.makedirs(proxy_dir, exist_ok=True)
+    index = ProxyIndex(proxy_dir)
+    key = settings_key(tier)
+
+    sources = []
+    for root, _, files in os.walk(source_folder):
+        for file in files:
+            if file.lower().endswith(VIDEO_EXTENSIONS):
+                sources.append(os.path.join(root, file))
+
+    def identify(source_path):
+        name = index.key(source_path)
+        try:
+            stat = os.stat(source_path)
+            entry = index.entries.get(name)
+            if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+                file_hash = entry[2]
+            else:
+                file_hash = source_hash(source_path)
+        except OSError as error:
+            return name, None, None, str(error)
+        return name, source_path, (stat.st_size, stat.st_mtime_ns, file_hash, f"{file_hash}-{key}.mp4"), None
+
+    def transcode(job):
+        proxy_file, source_path = job
+        proxy_path = os.path.join(proxy_dir, proxy_file)
+        if os.path.exists(proxy_path):
+            return 'reused', None
+        # A temp name of its own, so a crashed or parallel run never writes into the same file
+        handle, temp_path = tempfile.mkstemp(suffix='.part.mp4', dir=proxy_dir)
+        os.close(handle)
+        try:
+            subprocess.run([ffmpeg, *ffmpeg_arguments(source_path, temp_path, tier)], check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            os.replace(temp_path, proxy_path)
+        except subprocess.CalledProcessError as error:
+            return 'failed', error.stderr.decode('utf-8', 'replace').strip()
+        except OSError as error:
+            return 'failed', str(error)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return 'transcoded', None
+
+    counts = {'transcoded': 0, 'reused': 0, 'failed': 0}
+    from concurrent.futures import ThreadPoolExecutor  # not at the top, the apps import this module at startup
+    # Every task runs its own single-threaded ffmpeg process, the threads only wait on them
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        identified = []
+        for name, source_path, entry, error in executor.map(identify, sources):
+            if entry is None:
+                counts['failed'] += 1
+                print(f"Die Datei {name} konnte nicht gelesen werden: {error}")
+            else:
+                identified.append((name, source_path, entry))
+
+        # Identical clips share one proxy, which is made once
+        jobs = {}
+        for name, source_path, entry in identified:
+            jobs.setdefault(entry[3], source_path)
+        outcomes = dict(zip(jobs, executor.map(transcode, jobs.items())))
+
+    for name, source_path, entry in identified:
+        outcome, error = outcomes[entry[3]]
+        if outcome == 'failed':
+            counts['failed'] += 1
+            print(f"Die Datei {name} konnte nicht umgewandelt werden: {error}")
+            continue
+        index.entries[name] = entry
+        # Duplicates of the transcoded clip reuse its proxy
+        counts[outcome if jobs[entry[3]] == source_path else 'reused'] += 1
+    # Entries of clips that are gone, and of indexes from before relative keys
+    for name in set(index.entries).difference(index.key(path) for path in sources):
+        if name.startswith(index.key(source_folder) + '/') or '/' not in name:
+            del index.entries[name]
+    index.save()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcode clips into display-sized, fast-decoding proxies.")
+    parser.add_argument("source", help="clip folder, e.g. Clips, Trainingsset or Testset, relative to the "
+                                       "current folder or as full path")
+    parser.add_argument("tier", choices=sorted(PROXY_TIERS), help="display size of the app that plays the clips")
+    parser.add_argument("--workers", type=int, default=None, help="number of parallel ffmpeg processes")
+    parser.add_argument("--ffmpeg", default="ffmpeg", help="path of the ffmpeg executable")
+    args = parser.parse_args()
+
+    # Proxies go next to the clip folder, where the apps look for them
+    script_folder = os.path.dirname(os.path.abspath(args.source))
+    counts = build_proxies(args.source, proxy_folder(script_folder, args.tier), args.tier, args.workers, args.ffmpeg)
+    print(f"{counts['transcoded']} umgewandelt, {counts['reused']} unverändert, {counts['failed']} fehlgeschlagen.")
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
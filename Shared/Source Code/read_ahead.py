@@ -0,0 +1,190 @@
+import os
+import time
+import atexit
+import shutil
+import tempfile
+import threading
+from functools import partial
+from collections import OrderedDict
+
+
+class ReadAheadCache:
+    """Reads the next clips from slow storage (network share, USB stick) ahead of time.
+
+    prefetch() is given the upcoming clips in playing order; a background
+    thread reads the first `depth` of them into an LRU cache of at most
+    `budget` bytes. The Qt players take the bytes with read(); the Tk players,
+    whose decoders only open file names, get a copy on the local disk from
+    local_path() when `spool_folder` is set. Every trial records whether its
+    clip was cached and how long the player had to wait for it (Qt only, the
+    Tk decoders open the file on their own thread).
+    """
+
+    def __init__(self, budget=256 * 1024 * 1024, depth=4, spool_folder=None):
+        self.budget = budget
+        self.depth = depth
+        self.spool_folder = spool_folder
+        if spool_folder is not None:
+            os.makedirs(spool_folder, exist_ok=True)
+            atexit.register(self.close)
+        self.clips = OrderedDict()  # path -> bytes, or the spooled copy's path; least recently used first
+        self.sizes = {}
+        self.spooled = 0
+        self.nbytes = 0
+        self.queue = []
+        self.upcoming = set()
+        self.current = None
+        self.loading = None
+        self.condition = threading.Condition()
+        self.thread = None
+        self.last_read = None
+        self.trials = []  # {"clip", "hit", "stall"} per played clip
+
+    def prefetch(self, paths):
+        paths = [os.path.abspath(path) for path in paths][:self.depth]
+        with self.condition:
+            self.upcoming = set(paths)
+            self.queue = [path for path in paths if path not in self.clips]
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="read-ahead", daemon=True)
+                self.thread.start()
+            self.condition.notify_all()
+
+    def cached(self, path):
+        return os.path.abspath(path) in self.clips
+
+    def read(self, path):
+        """The bytes of path, from the cache or, with a stall, from the file."""
+        path = os.path.abspath(path)
+        started = time.perf_counter()
+        with self.condition:
+            self.current = path
+            hit = path in self.clips
+            # A clip the thread is reading right now is waited for rather than read twice
+            while self.loading == path:
+                self.condition.wait()
+            data = self.clips.get(path)
+            if data is not None:
+                self.clips.move_to_end(path)
+        if data is None or self.spool_folder is not None:
+            with open(data or path, 'rb') as f:
+                data = f.read()
+        self.last_read = {"clip": path, "hit": hit, "stall": time.perf_counter() - started}
+        return data
+
+    def local_path(self, path, trial=True):
+        """The spooled copy of path if it was read ahead already, else path itself."""
+        with self.condition:
+            if trial:
+                self.current = os.path.abspath(path)
+            local = self.clips.get(os.path.abspath(path))
+            if local is not None:
+                self.clips.move_to_end(os.path.abspath(path))
+        if trial:
+            self.record_trial(path, {"clip": path, "hit": local is not None, "stall": None})
+        return local if local is not None else path
+
+    def wait(self, path):
+        """Block until path was read ahead or is no longer queued; whether it is cached."""
+        path = os.path.abspath(path)
+        with self.condition:
+            while self.loading == path or path in self.queue:
+                self.condition.wait()
+            return path in self.clips
+
+    def deferred(self, frames, path):
+        """Callable giving frames(local path) of path, for a decoder on another thread.
+
+        The path is only resolved when the decoder calls it, after the
+        read-ahead of path finished, so a preload reads the local copy
+        instead of opening the clip on the share while it is being copied.
+        """
+        return partial(self._deferred, frames, path)
+
+    def _deferred(self, frames, path):
+        self.wait(path)
+        return frames(self.local_path(path, trial=False))
+
+    def record_trial(self, path, read=None):
+        """Count a played clip; `read` is the read() it needed, None if a player already held it."""
+        trial = dict(read) if read is not None else {"clip": path, "hit": True, "stall": 0.0}
+        self.trials.append(trial)
+        if trial["stall"] is not None and trial["stall"] > 0.1:
+            print(f"{os.path.basename(path)}: {trial['stall'] * 1000:.0f} ms auf das Laufwerk gewartet")
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.queue:
+                    self.condition.wait()
+                path = self.loading = self.queue.pop(0)
+            try:
+                data = self._load(path)
+            except OSError as error:
+                print(f"Vorauslesen von {path} fehlgeschlagen: {error!r}")
+                data = None
+            with self.condition:
+                self.loading = None
+                if data is not None:
+                    self._add(path, data)
+                self.condition.notify_all()
+
+    def _load(self, path):
+        if self.spool_folder is None:
+            with open(path, 'rb') as f:
+                return f.read()
+        self.spooled += 1
+        local = os.path.join(self.spool_folder, f"{self.spooled}-{os.path.basename(path)}")
+        shutil.copyfile(path, local)
+        return local
+
+    def _add(self, path, data):
+        size = len(data) if isinstance(data, bytes) else os.path.getsize(data)
+        if size > self.budget:
+            self._discard(data)
+            return
+        self.clips[path] = data
+        self.sizes[path] = size
+        self.nbytes += size
+        while self.nbytes > self.budget:
+            # Played clips go first, the playing and upcoming ones only if they alone exceed the budget
+            old_path = next((p for p in self.clips if p not in self.upcoming and p != self.current),
+                            next(iter(self.clips)))
+            self.nbytes -= self.sizes.pop(old_path)
+            self._discard(self.clips.pop(old_path))
+
+    def _discard(self, data):
+        if not isinstance(data, bytes):
+            try:
+                os.remove(data)
+            except OSError:
+                pass
+
+    def hit_rate(self):
+        return sum(trial["hit"] for trial in self.trials) / len(self.trials) if self.trials else None
+
+    def summary(self):
+        if not self.trials:
+            return "Keine Clips abgespielt."
+        text = f"{len(self.trials)} Clips, {self.hit_rate():.0%} vorausgelesen"
+        stalls = sorted(trial["stall"] for trial in self.trials if trial["stall"] is not None)
+        if stalls:
+            text += f", Wartezeit Ø {sum(stalls) / len(stalls) * 1000:.0f} ms / max. {stalls[-1] * 1000:.0f} ms"
+        return text
+
+    def close(self):
+        with self.condition:
+            self.queue = []
+            for data in self.clips.values():
+                self._discard(data)
+            self.clips.clear()
+            self.sizes.clear()
+            self.nbytes = 0
+            self.condition.notify_all()
+        if self.spool_folder is not None:
+            shutil.rmtree(self.spool_folder, ignore_errors=True)
+
+
+def spool_folder():
+    """A folder on the local disk for the Tk apps' read-ahead copies."""
+    return os.path.join(tempfile.gettempdir(), f"read-ahead-{os.getpid()}")
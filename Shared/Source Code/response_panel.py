@@ -0,0 +1,121 @@
+import sys
+import time
+from PyQt5.QtWidgets import QApplication, QWidget, QPushButton, QButtonGroup, QGridLayout
+from PyQt5.QtCore import pyqtSignal
+
+# Answer buttons of the train and test apps, with their colors
+BASIC_EMOTIONS = [
+    ("Angst", "#FF5733"),
+    ("Freude", "#FFFF66"),
+    ("Trauer", "#4DA6FF"),
+    ("Wut", "#B22222"),
+    ("Ekel", "#3CB371"),
+    ("Neutral", "#C0C0C0"),
+]
+SELECTED_COLOR = "#A9A9A9"
+
+
+def panel_style_sheet(colors, selected_color):
+    rules = ["QPushButton { color: black; }"]
+    for index, color in enumerate(colors):
+        if color is not None:
+            rules.append(f'QPushButton[option="{index}"] {{ background-color: {color}; }}')
+    if selected_color is not None:
+        rules.append(f"QPushButton:checked {{ background-color: {selected_color}; }}")
+    return "\n".join(rules)
+
+
+class ResponsePanel(QWidget):
+    """Grid of answer buttons in one exclusive QButtonGroup.
+
+    The colors are one style sheet set on the panel when it is built, with a
+    rule per option and one for the :checked state. Selecting or resetting
+    only toggles the checked state of at most two buttons; no style sheet is
+    parsed again and no button is re-polished. With selectable=False the
+    buttons act as plain answer buttons and only emit `selected`.
+    """
+
+    selected = pyqtSignal(str)
+
+    def __init__(self, options, parent=None, columns=1, selectable=False, selected_color=SELECTED_COLOR):
+        super().__init__(parent)
+        names = [option[0] if isinstance(option, tuple) else option for option in options]
+        colors = [option[1] if isinstance(option, tuple) else None for option in options]
+        self.options = names
+        self.selectable = selectable
+
+        self.setStyleSheet(panel_style_sheet(colors, selected_color if selectable else None))
+        layout = QGridLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.group = QButtonGroup(self)
+        self.group.setExclusive(True)
+        self.buttons = []
+        for index, name in enumerate(names):
+            button = QPushButton(name, self)
+            button.setProperty("option", str(index))
+            button.setCheckable(selectable)
+            self.group.addButton(button, index)
+            row, col = divmod(index, columns)
+            layout.addWidget(button, row, col)
+            self.buttons.append(button)
+        self.group.buttonClicked.connect(self._on_clicked)
+
+    def _on_clicked(self, button):
+        self.selected.emit(self.options[self.group.id(button)])
+
+    def selection(self):
+        button = self.group.checkedButton()
+        return None if button is None else self.options[self.group.id(button)]
+
+    def select(self, option):
+        self.buttons[self.options.index(option)].setChecked(True)
+
+    def reset(self):
+        button = self.group.checkedButton()
+        if button is not None:
+            # An exclusive group does not allow unchecking its checked button
+            self.group.setExclusive(False)
+            button.setChecked(False)
+            self.group.setExclusive(True)
+
+
+def main():
+    """Micro-benchmark: selecting and resetting the panel versus the old per-button style sheets."""
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    app = QApplication(sys.argv[:1])
+    window = QWidget()
+    panels = [ResponsePanel(BASIC_EMOTIONS, window, columns=3, selectable=True) for _ in range(3)]
+    old_buttons = [QPushButton(name, window) for _ in range(3) for name, _ in BASIC_EMOTIONS]
+    window.show()
+    app.processEvents()
+
+    started = time.perf_counter()
+    for i in range(rounds):
+        for panel in panels:
+            panel.buttons[i % len(panel.buttons)].click()
+        for panel in panels:
+            panel.reset()
+        app.processEvents()
+    panel_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for i in range(rounds):
+        for group in range(3):
+            button = old_buttons[group * len(BASIC_EMOTIONS) + i % len(BASIC_EMOTIONS)]
+            button.palette().button().color().name()  # the old handlers read the color back on every click
+            button.setStyleSheet(f"background-color: #A9A9A9; color: black")
+        for button in old_buttons:
+            button.setStyleSheet(None)
+            button.setStyleSheet(f"background-color: {button.palette().button().color().name()}; color: black")
+        app.processEvents()
+    style_sheet_time = time.perf_counter() - started
+
+    print(f"{rounds} Durchgänge mit 3 Auswahlen und Zurücksetzen:")
+    print(f"  ResponsePanel:            {panel_time / rounds * 1e6:8.1f} µs pro Durchgang")
+    print(f"  setStyleSheet je Button:  {style_sheet_time / rounds * 1e6:8.1f} µs pro Durchgang")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import time
+from pathlib import Path
+
+REPOSITORY = Path(__file__).resolve().parents[2]
+
+ENTRY_POINTS = [
+    "Labeling Software/Source Code/APP.py",
+    "Train and Test Software/Windows/Train Software/Source Code/AudioEmoTrainapp.py",
+    "Train and Test Software/Windows/Train Software/Source Code/VideoEmoTrainapp.py",
+    "Train and Test Software/Windows/Train Software/Source Code/BothEmoTrainapp.py",
+    "Train and Test Software/Windows/Test Software/Source Code/AudioEmoTestapp.py",
+    "Train and Test Software/Windows/Test Software/Source Code/VideoEmoTestapp.py",
+    "Train and Test Software/Windows/Test Software/Source Code/BothEmoTestapp.py",
+    "Train and Test Software/MacOS/Train Software/Source Code/EmotionTrainMacApp.py",
+    "Train and Test Software/MacOS/Test Software/Source Code/EmotionalTestApp.py",
+]
+
+# Runs in a fresh interpreter per measurement. "import" executes the module body
+# without its __main__ block; "window" runs the program until the event loop
+# would start, lets it draw its first window and stops there. A session left
+# unfinished by an earlier run is not resumed, so no question blocks the start.
+CHILD = r'''
+import os, sys, time, json, runpy
+started = time.perf_counter()
+path, mode = sys.argv[1], sys.argv[2]
+sys.argv = [path]
+
+def report():
+    print("STARTUP " + json.dumps({"seconds": time.perf_counter() - started, "modules": len(sys.modules)}), flush=True)
+    os._exit(0)
+
+if mode == "import":
+    runpy.run_path(path, run_name="startup_benchmark")
+    report()
+
+with open(path, encoding="utf-8") as f:
+    qt = "PyQt5" in f.read()
+if qt:
+    from PyQt5.QtWidgets import QApplication, QDialog, QMessageBox
+    QMessageBox.question = staticmethod(lambda *args: QMessageBox.No)
+    def first_window(self, *args):
+        QApplication.processEvents()
+        report()
+    for cls in (QApplication, QDialog):
+        cls.exec = cls.exec_ = first_window
+else:
+    import tkinter
+    import tkinter.messagebox
+    tkinter.messagebox.askyesno = lambda *args, **kwargs: False
+    def first_window(self, *args):
+        self.update()
+        report()
+    tkinter.Misc.mainloop = first_window
+runpy.run_path(path, run_name="__main__")
+'''
+
+
+def measure(entry_point, mode, env):
+    path = REPOSITORY / entry_point
+    started = time.perf_counter()
+    # The programs read their clip folders relative to the working directory
+    result = subprocess.run([sys.executable, "-c", CHILD, str(path), mode], cwd=path.parent, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=120)
+    wall = time.perf_counter() - started
+    for line in result.stdout.decode("utf-8", "replace").splitlines():
+        if line.startswith("STARTUP "):
+            values = json.loads(line[len("STARTUP "):])
+            values["wall"] = wall
+            return values
+    lines = result.stderr.decode("utf-8", "replace").strip().splitlines()
+    raise RuntimeError(lines[-1] if lines else f"exit code {result.returncode}")
+
+
+def add_baseline_arguments(parser):
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="slowdown against the baseline that counts as regression")
+
+
+def load_baseline(path):
+    if not path:
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_results(path, results):
+    if path:
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+def compare(value, earlier, tolerance):
+    """Text for the result line and whether value is more than `tolerance` slower than earlier."""
+    if not value or not earlier:
+        return "", False
+    change = value / earlier - 1
+    if change > tolerance:
+        return f"  {change:+.0%}  LANGSAMER", True
+    return f"  {change:+.0%}", False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and time to first window of every program.")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per program, the median is reported")
+    parser.add_argument("--offscreen", action="store_true", help="render Qt windows offscreen (no display needed)")
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.offscreen:
+        env["QT_QPA_PLATFORM"] = "offscreen"
+    baseline = load_baseline(args.baseline)
+
+    results = {}
+    regressions = 0
+    print(f"{'Programm':<24} {'Import':>9} {'Fenster':>9} {'inkl. Python':>13} {'Module':>7}")
+    for entry_point in ENTRY_POINTS:
+        name = os.path.basename(entry_point)
+        try:
+            imports = [measure(entry_point, "import", env) for _ in range(args.repeat)]
+            windows = [measure(entry_point, "window", env) for _ in range(args.repeat)]
+        except (RuntimeError, subprocess.TimeoutExpired) as error:
+            print(f"{name:<24} Fehler: {error}")
+            continue
+        result = {
+            "import": statistics.median(run["seconds"] for run in imports),
+            "window": statistics.median(run["seconds"] for run in windows),
+            "wall": statistics.median(run["wall"] for run in windows),
+            "modules": windows[0]["modules"],
+        }
+        results[entry_point] = result
+        line = (f"{name:<24} {result['import'] * 1000:7.0f}ms {result['window'] * 1000:7.0f}ms "
+                f"{result['wall'] * 1000:11.0f}ms {result['modules']:7d}")
+        earlier = baseline.get(entry_point)
+        if earlier is not None:
+            text, regressed = compare(result["window"], earlier["window"], args.tolerance)
+            line += text
+            regressions += regressed
+        print(line)
+
+    save_results(args.save, results)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+import time
+import queue
+import threading
+from PIL import Image, ImageTk
+
+END = None  # queued by the decoder after the last frame
+
+
+def letterbox(frame, size):
+    """RGB frame as a PIL image of exactly `size`, scaled to fit and centered on black."""
+    image = Image.fromarray(frame)
+    if image.size == size:
+        return image
+    scale = min(size[0] / image.width, size[1] / image.height)
+    scaled = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                          Image.BILINEAR)
+    image = Image.new("RGB", size)
+    image.paste(scaled, ((size[0] - scaled.width) // 2, (size[1] - scaled.height) // 2))
+    return image
+
+
+def moviepy_frames(path):
+    """(pts, RGB frame) of a clip decoded with moviepy."""
+    from moviepy.editor import VideoFileClip
+    clip = VideoFileClip(path, audio=False)
+    try:
+        for pts, frame in clip.iter_frames(with_times=True, dtype="uint8"):
+            yield pts, frame
+    finally:
+        clip.close()
+
+
+def opencv_frames(path):
+    """(pts, RGB frame) of a clip decoded with OpenCV."""
+    import cv2  # imported on first use, loading OpenCV delays the first window noticeably
+    capture = cv2.VideoCapture(path)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+    index = 0
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            # The container timestamp where the backend knows it, else the nominal one
+            pts = capture.get(cv2.CAP_PROP_POS_MSEC) / 1000 or index / fps
+            yield pts, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            index += 1
+    finally:
+        capture.release()
+
+
+class DecoderThread(threading.Thread):
+    """Decodes one clip ahead of the Tk main thread.
+
+    `frames` is called on the thread and yields (pts, RGB frame); the frames
+    are letterboxed to the canvas size here, so the main thread only copies
+    pixels. The queue is bounded, the decoder waits once it is `maxsize`
+    frames ahead.
+    """
+
+    def __init__(self, frames, size, maxsize=8):
+        super().__init__(name="decoder", daemon=True)
+        self.frames = frames
+        self.size = size
+        self.queue = queue.Queue(maxsize)
+        self.stopped = threading.Event()
+        self.error = None
+
+    def run(self):
+        try:
+            frames = self.frames()
+            try:
+                for pts, frame in frames:
+                    if not self._put((pts, letterbox(frame, self.size))):
+                        return
+            finally:
+                frames.close()
+        except Exception as error:
+            self.error = error
+        self._put(END)
+
+    def _put(self, item):
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def get_nowait(self):
+        return self.queue.get_nowait()
+
+    def empty(self):
+        return self.queue.empty()
+
+    def stop(self):
+        self.stopped.set()
+
+
+class CanvasPlayer:
+    """Shows the frames of a DecoderThread in one image item of a Tk canvas.
+
+    The photo image and the canvas item are created once; a frame only
+    replaces the photo's pixels, so no items pile up on the canvas over a
+    session.
+
+    Frames are shown at their pts on a clock that starts with the first
+    frame. A frame is dropped when the next one is decoded and due as well,
+    instead of stretching the clip, so slow machines skip frames rather than
+    play in slow motion. Shown, late and dropped frames are counted per clip
+    in `trials`.
+
+    `decoder(frames, size, queue_size)` creates the decoder of a clip, a
+    DecoderThread by default or FrameRing.decoder for a separate process.
+    With a FrameCache, played clips are recorded and played from the cache
+    the next time, and preload() decodes upcoming clips once a clip ended.
+    """
+
+    def __init__(self, canvas, on_finished=None, queue_size=8, decoder=DecoderThread, cache=None):
+        self.canvas = canvas
+        self.on_finished = on_finished
+        self.queue_size = queue_size
+        self.decoder_factory = decoder
+        self.cache = cache
+        self.size = (int(canvas.cget("width")), int(canvas.cget("height")))
+        self.photo = ImageTk.PhotoImage("RGB", self.size)
+        self.item = canvas.create_image(0, 0, anchor="nw", image=self.photo)
+        self.decoder = None
+        self.pending = None
+        self.started = None
+        self.after_id = None
+        self.clip = None
+        self.interval = 0.04  # pts step between frames, updated while playing
+        self.last_pts = None
+        self.counts = None
+        self.trials = []  # {"clip", "frames", "late", "dropped"} per played clip
+        self.recording = None  # (pts, pixels) of the clip while it is decoded for the cache
+        self.previous_clip = None
+        self.upcoming = []
+
+    def play(self, frames, clip=None):
+        """Play the (pts, RGB frame) iterator returned by frames(); `clip` names it in `trials` and the cache."""
+        self.stop()
+        if clip != self.clip:
+            self.previous_clip = self.clip
+        self.clip = clip
+        self.counts = {"frames": 0, "late": 0, "dropped": 0}
+        self.last_pts = None
+        self.decoder = None
+        if self.cache is not None and clip is not None:
+            self.cache.stop_preload()
+            self._keep()
+            self.decoder = self.cache.reader(clip, self.size)
+            if self.decoder is None:
+                self.recording = ([], [])
+        if self.decoder is None:
+            self.decoder = self.decoder_factory(frames, self.size, self.queue_size)
+        self.decoder.start()
+        self._tick()
+
+    def preload(self, clips):
+        """Decode the (clip, frames) pairs into the cache as soon as nothing plays."""
+        self.upcoming = clips
+        if self.cache is None:
+            return
+        self._keep()
+        if not self.playing:
+            self.cache.preload(clips, self.size)
+
+    def _keep(self):
+        self.cache.wanted = {self.previous_clip, self.clip} | {clip for clip, _ in self.upcoming}
+
+    def stop(self):
+        if self.after_id is not None:
+            self.canvas.after_cancel(self.after_id)
+            self.after_id = None
+        if self.decoder is not None:
+            self.decoder.stop()
+            self.decoder = None
+            self._report()
+        self.pending = None
+        self.started = None
+        self.recording = None
+
+    def _report(self):
+        trial = dict(self.counts, clip=self.clip)
+        self.trials.append(trial)
+        if trial["late"] or trial["dropped"]:
+            print(f"{self.clip}: {trial['late']} Bilder verspätet, {trial['dropped']} ausgelassen "
+                  f"von {trial['frames'] + trial['dropped']}")
+
+    @property
+    def playing(self):
+        return self.decoder is not None
+
+    def _tick(self):
+        self.after_id = None
+        while True:
+            if self.pending is None:
+                try:
+                    self.pending = self.decoder.get_nowait()
+                except queue.Empty:
+                    # The decoder has not caught up yet, e.g. while the clip is opened
+                    self.after_id = self.canvas.after(5, self._tick)
+                    return
+                if self.pending is END:
+                    self._finish()
+                    return
+                if self.recording is not None:
+                    self._record(*self.pending)
+
+            pts, image = self.pending
+            if self.last_pts is not None and pts > self.last_pts:
+                self.interval = pts - self.last_pts
+            self.last_pts = pts
+            now = time.perf_counter()
+            if self.started is None:
+                self.started = now - pts
+            delay = self.started + pts - now
+            if delay > 0.001:
+                self.after_id = self.canvas.after(int(delay * 1000), self._tick)
+                return
+            self.pending = None
+            if -delay >= self.interval and not self.decoder.empty():
+                # The next frame is decoded and due already
+                self.counts["dropped"] += 1
+                continue
+            if -delay > self.interval / 2:
+                self.counts["late"] += 1
+            self.photo.paste(image)
+            self.counts["frames"] += 1
+            self.after_id = self.canvas.after(1, self._tick)
+            return
+
+    def _record(self, pts, image):
+        times, pixels = self.recording
+        times.append(pts)
+        pixels.append(image.tobytes("raw", "RGB"))
+        if len(pixels) * len(pixels[0]) > self.cache.budget:
+            self.recording = None
+
+    def _finish(self):
+        decoder, recording = self.decoder, self.recording
+        self.stop()
+        if decoder.error is not None:
+            print(f"Video konnte nicht abgespielt werden: {decoder.error!r}")
+        elif recording is not None:
+            self.cache.put(self.clip, *recording)
+        if self.cache is not None and self.upcoming:
+            self.cache.preload(self.upcoming, self.size)
+        if self.on_finished is not None:
+            self.on_finished()
@@ -0,0 +1,10 @@
+"""GUI-independent core of the train and test apps.
+
+The Qt and Tk apps only draw the window and play the clips; which clip comes
+next, the answers, the session log, export and scoring live here.
+"""
+from .stimuli import MODALITIES, StimulusSource
+from .persistence import SessionLog, export_responses, resume_question
+from .scoring import accuracy
+from .answer_key import AnswerKey
+from .engine import TrialEngine
@@ -0,0 +1,134 @@
+import os
+import csv
+import sys
+import time
+import marshal
+import argparse
+from clip_index import ravdess_emotion
+
+CACHE_VERSION = 1
+
+
+class AnswerKey:
+    """Correct emotion per clip, looked up by clip path.
+
+    Keys are paths relative to the app folder, normalized ("Trainingsset/a.mp4").
+    Clip paths are looked up the way the apps build them, relative to the
+    working directory or absolute, so "app/Trainingsset/a.mp4" with the app
+    folder "app", "./Trainingsset/a.mp4" or backslashes find the same entry.
+    With `fallback` the emotion coded in a RAVDESS file name is used for
+    clips the CSV does not list, and CSV rows that only repeat that code are
+    not stored, so even a key for millions of RAVDESS clips stays small.
+    """
+
+    def __init__(self, script_folder, answers=None, fallback=True):
+        self.root = os.path.abspath(script_folder)
+        self.answers = answers if answers is not None else {}
+        self.fallback = fallback
+
+    @classmethod
+    def load(cls, script_folder, folder, csv_name='selected_videos.csv', fallback=True):
+        """Key of the clips in `folder` from csv_name next to the app.
+
+        The parsed key is kept in a sidecar file next to the CSV and only
+        rebuilt when the CSV changed, so a large key loads in one read.
+        """
+        csv_path = os.path.join(script_folder, csv_name)
+        try:
+            stat = os.stat(csv_path)
+        except OSError:
+            return cls(script_folder, fallback=fallback)
+        signature = (CACHE_VERSION, os.name, folder, fallback, stat.st_mtime_ns, stat.st_size)
+        cache_path = csv_path + '.key'
+        answers = read_cache(cache_path, signature)
+        if answers is None:
+            answers = parse_csv(csv_path, folder, fallback)
+            write_cache(cache_path, signature, answers)
+        return cls(script_folder, answers, fallback)
+
+    def normalize(self, path):
+        try:
+            path = os.path.relpath(os.path.abspath(path), self.root)
+        except ValueError:
+            # Another drive than the app folder on Windows
+            path = os.path.normpath(path)
+        return os.path.normcase(path).replace(os.sep, '/')
+
+    def get(self, stimulus, default=None):
+        emotion = self.answers.get(self.normalize(stimulus))
+        if emotion is None and self.fallback:
+            emotion = ravdess_emotion(stimulus)
+        return default if emotion is None else emotion
+
+    def __len__(self):
+        return len(self.answers)
+
+
+def parse_csv(csv_path, folder, fallback=False):
+    # Column-wise: the keys are built with one normalize pass over the name column
+    with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+        rows = csv.reader(f)
+        header = next(rows, [])
+        if 'File Name' not in header or 'Emotion' not in header:
+            return {}
+        name_column, emotion_column = header.index('File Name'), header.index('Emotion')
+        columns = [(row[name_column], row[emotion_column]) for row in rows if len(row) > max(name_column, emotion_column)]
+    if not columns:
+        return {}
+    if fallback:
+        columns = [(name, emotion) for name, emotion in columns if ravdess_emotion(name) != emotion]
+        if not columns:
+            return {}
+    names, emotions = zip(*columns)
+    prefix = os.path.normpath(folder) + os.sep
+    keys = map(os.path.normpath, map(prefix.__add__, names))
+    keys = (os.path.normcase(key).replace(os.sep, '/') for key in keys)
+    return dict(zip(keys, emotions))
+
+
+def read_cache(cache_path, signature):
+    try:
+        with open(cache_path, 'rb') as f:
+            # loads() of the whole file is much faster than load() on the file
+            cached_signature, answers = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    return answers if cached_signature == signature else None
+
+
+def write_cache(cache_path, signature, answers):
+    # A read-only share just means the CSV is parsed on every start
+    temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary_path, 'wb') as f:
+            marshal.dump((signature, answers), f)
+        os.replace(temporary_path, cache_path)
+    except OSError:
+        try:
+            os.remove(temporary_path)
+        except OSError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the answer key cache and measure how fast it loads.")
+    parser.add_argument("folder", help="clip folder next to the app, e.g. Trainingsset")
+    parser.add_argument("--csv", default="selected_videos.csv", help="answer CSV next to the app")
+    args = parser.parse_args()
+
+    script_folder = os.path.dirname(os.path.abspath(args.folder))
+    folder = os.path.basename(os.path.abspath(args.folder))
+    csv_path = os.path.join(script_folder, args.csv)
+    started = time.perf_counter()
+    answers = parse_csv(csv_path, folder, fallback=True)
+    parsed = time.perf_counter() - started
+    key = AnswerKey.load(script_folder, folder, args.csv)
+    started = time.perf_counter()
+    key = AnswerKey.load(script_folder, folder, args.csv)
+    cached = time.perf_counter() - started
+    print(f"{len(answers)} Antworten weichen vom Dateinamen ab: CSV {parsed * 1000:.1f} ms, Cache {cached * 1000:.1f} ms.")
+    return 0 if len(key) == len(answers) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
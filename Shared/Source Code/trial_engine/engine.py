@@ -0,0 +1,96 @@
+from background_writer import shared_writer
+from .persistence import SessionLog, export_responses
+from .scoring import accuracy
+
+
+class TrialEngine:
+    """Order, responses and scoring of one session, without any GUI.
+
+    The front end asks next_trial() for the clip to present, passes the
+    participant's choice to respond() and goes back one trial with back().
+    With a SessionLog every step is logged, see open_session().
+    """
+
+    def __init__(self, stimuli, answer_key=None, log=None, limit=None):
+        self.stimuli = stimuli
+        self.answer_key = answer_key if answer_key is not None else {}
+        self.log = log
+        self.total = len(stimuli) if limit is None else min(limit, len(stimuli))
+        self.index = -1
+        self.responses = []  # (stimulus, answer) in answer order
+        self.resumed = 0  # answers restored from an unfinished session
+
+    @classmethod
+    def open_session(cls, folder, name, load_stimuli, answer_key=None, limit=None, sync_every=10, background=True,
+                     confirm=None):
+        """Resume the newest session `name` in folder if it is unfinished, or start a new one.
+
+        The apps have no login, so the next participant at the same computer
+        would get the previous one's session: confirm(log) asks whether to
+        resume it, a new session is started otherwise. A resumed session keeps
+        its logged stimulus order and continues at the first unanswered trial;
+        load_stimuli() is only called for a new session. With `background`
+        the log is written by the app's shared writer thread.
+        """
+        writer = shared_writer() if background else None
+        log = SessionLog.find_unfinished(folder, name, sync_every, writer)
+        if log is not None and (confirm is None or confirm(log)):
+            log.resume()
+            engine = cls(log.stimuli, answer_key, log)
+            engine.total = log.total
+            engine.responses = list(log.responses)
+            engine.index = len(engine.responses) - 1
+            engine.resumed = len(engine.responses)
+            return engine
+        engine = cls(load_stimuli(), answer_key, limit=limit)
+        engine.log = SessionLog.create(folder, name, engine.stimuli, engine.total, sync_every, writer)
+        return engine
+
+    @property
+    def current(self):
+        return self.stimuli[self.index] if 0 <= self.index < len(self.stimuli) else None
+
+    @property
+    def done(self):
+        return len(self.responses) >= self.total
+
+    def next_trial(self):
+        """Advance to the next clip and return it; None when the session is complete."""
+        if self.done:
+            return None
+        self.index += 1
+        return self.current
+
+    def upcoming(self, count):
+        return self.stimuli[self.index + 1:min(self.index + 1 + count, self.total)]
+
+    def respond(self, answer):
+        """Record the answer to the current clip; returns the correct answer if it is known."""
+        self.responses.append((self.current, answer))
+        if self.log is not None:
+            self.log.answer(self.current, answer)
+        return self.answer_key.get(self.current)
+
+    def back(self):
+        """Drop the last answer and return to its clip; None if nothing was answered yet."""
+        if not self.responses:
+            return None
+        self.responses.pop()
+        self.index -= 1
+        if self.log is not None:
+            self.log.back()
+        return self.current
+
+    def restart(self):
+        self.index = -1
+        self.responses = []
+        if self.log is not None:
+            self.log.restart()
+
+    def accuracy(self):
+        return accuracy(self.responses, self.answer_key)
+
+    def export(self, path, columns=("Video", "Answer")):
+        export_responses(path, self.responses, columns)
+        if self.log is not None:
+            self.log.sync()
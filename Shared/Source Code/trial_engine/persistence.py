@@ -0,0 +1,190 @@
+import os
+import csv
+import glob
+import json
+import time
+import zlib
+import atexit
+import threading
+
+
+class SessionLog:
+    """Append-only log of one participant's session.
+
+    The first record holds the stimulus order, then every answer, back step
+    and restart is appended as one line "<crc32> <json>". Records are flushed
+    to the OS as soon as they are written and fsynced every `sync_every`
+    records and on exit, so a crash of the app loses nothing and a power cut
+    at most the last batch. Replaying the log gives the order and the answers
+    back for resuming.
+
+    With a BackgroundWriter the writing happens on its thread: records are
+    buffered, and all records that piled up meanwhile go out in one write.
+    """
+
+    def __init__(self, path, sync_every=10, writer=None):
+        self.path = path
+        self.sync_every = sync_every
+        self.writer = writer
+        self.pending = 0
+        self.stimuli = None
+        self.total = 0
+        self.responses = []
+        self._file = None
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def encode(record):
+        payload = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        checksum = zlib.crc32(payload.encode('utf-8'))
+        return f"{checksum:08x} {payload}\n"
+
+    @staticmethod
+    def decode(line):
+        # Returns None for torn or corrupted records
+        if not line.endswith('\n') or len(line) < 10 or line[8] != ' ':
+            return None
+        payload = line[9:-1]
+        try:
+            checksum = int(line[:8], 16)
+        except ValueError:
+            return None
+        if zlib.crc32(payload.encode('utf-8')) != checksum:
+            return None
+        try:
+            return json.loads(payload)
+        except ValueError:
+            return None
+
+    @classmethod
+    def create(cls, folder, name, stimuli, total, sync_every=10, writer=None):
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.log")
+        number = 1
+        while os.path.exists(path):
+            number += 1
+            path = os.path.join(folder, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{number}.log")
+        log = cls(path, sync_every, writer)
+        log.stimuli = list(stimuli)
+        log.total = total
+        log._append({"start": log.stimuli, "total": total})
+        return log.resume()
+
+    @classmethod
+    def find_unfinished(cls, folder, name, sync_every=10, writer=None):
+        """The newest session log of `name` in folder if it has unanswered trials, else None.
+
+        Older logs are not read: once a newer session was started, the older
+        ones count as given up. Call resume() on the log to continue it.
+        """
+        paths = glob.glob(os.path.join(glob.escape(folder), f"{glob.escape(name)}-*.log"))
+        for path in sorted(paths, key=os.path.getmtime, reverse=True):
+            log = cls(path, sync_every, writer)
+            log.replay()
+            if log.stimuli is None:
+                # Crashed before the order was written
+                continue
+            return log if len(log.responses) < log.total else None
+        return None
+
+    def resume(self):
+        """Continue this log in the running session; it is closed at exit."""
+        atexit.register(self.close)
+        return self
+
+    def replay(self):
+        """Read order and answers from the log; a torn tail is cut off."""
+        valid_bytes = 0
+        with open(self.path, 'r', newline='', encoding='utf-8') as f:
+            for line in f:
+                record = self.decode(line)
+                if record is None:
+                    break
+                if "start" in record:
+                    self.stimuli, self.total = record["start"], record["total"]
+                elif "answer" in record:
+                    self.responses.append((record["stimulus"], record["answer"]))
+                elif "back" in record:
+                    self.responses.pop()
+                elif "restart" in record:
+                    self.responses = []
+                valid_bytes += len(line.encode('utf-8'))
+
+        if valid_bytes != os.path.getsize(self.path):
+            self.close()
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_bytes)
+        return self.responses
+
+    def _append(self, record):
+        with self._lock:
+            self._buffer.append(self.encode(record))
+        if self.writer is not None:
+            # Drains submitted while one is still queued are merged into it
+            self.writer.submit(self._drain, key=(self.path, 'drain'))
+        else:
+            self._drain()
+
+    def _drain(self):
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+        if not lines:
+            return
+        try:
+            if self._file is None:
+                self._file = open(self.path, 'a', newline='', encoding='utf-8')
+            self._file.write(''.join(lines))
+        except OSError:
+            # Put the records back so the writer's retry or the next drain writes them
+            with self._lock:
+                self._buffer[:0] = lines
+            raise
+        # What did reach the file buffer is written out by the next flush if this one fails
+        self._file.flush()
+        self.pending += len(lines)
+        if self.pending >= self.sync_every:
+            self._sync()
+
+    def answer(self, stimulus, answer):
+        self._append({"stimulus": stimulus, "answer": answer})
+
+    def back(self):
+        self._append({"back": 1})
+
+    def restart(self):
+        self._append({"restart": 1})
+
+    def _sync(self):
+        if self._file is not None and self.pending:
+            os.fsync(self._file.fileno())
+        self.pending = 0
+
+    def sync(self):
+        if self.writer is not None:
+            self.writer.submit(self._sync, key=(self.path, 'sync'))
+        else:
+            self._sync()
+
+    def close(self):
+        atexit.unregister(self.close)
+        if self.writer is not None:
+            self.writer.flush()
+        self._drain()
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+            self._file = None
+
+
+def resume_question(log):
+    return (f"Eine nicht beendete Sitzung vom {time.strftime('%d.%m.%Y %H:%M', time.localtime(os.path.getmtime(log.path)))} "
+            f"wurde gefunden ({len(log.responses)} von {log.total} Clips beantwortet).\n\n"
+            f"Soll sie fortgesetzt werden? Bei Nein beginnt eine neue Sitzung.")
+
+
+def export_responses(path, responses, columns=("Video", "Answer")):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows(responses)
@@ -0,0 +1,6 @@
+def accuracy(responses, answer_key):
+    """Share of (stimulus, answer) responses that match the key; None without responses."""
+    if not responses:
+        return None
+    correct = sum(1 for stimulus, answer in responses if answer_key.get(stimulus) == answer)
+    return correct / len(responses)
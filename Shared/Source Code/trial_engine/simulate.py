@@ -0,0 +1,81 @@
+import os
+import sys
+import random
+import argparse
+import tempfile
+import time
+from background_writer import shared_writer
+from .engine import TrialEngine
+from .persistence import SessionLog
+from .stimuli import StimulusSource
+
+EMOTIONS = ["Angst", "Freude", "Trauer", "Wut", "Ekel", "Neutral"]
+
+
+def simulate(engine, back_rate=0.02, seed=0):
+    """Run a session to its end with random answers and occasional back steps.
+
+    Returns the time every click took, i.e. what the participant would wait for.
+    """
+    rng = random.Random(seed)
+    clicks = []
+    stimulus = engine.next_trial()
+    while stimulus is not None:
+        started = time.perf_counter()
+        if engine.responses and rng.random() < back_rate:
+            stimulus = engine.back()
+        else:
+            engine.respond(rng.choice(EMOTIONS))
+            stimulus = engine.next_trial()
+        clicks.append(time.perf_counter() - started)
+    return clicks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run simulated sessions through the trial engine without a GUI.")
+    parser.add_argument("--trials", type=int, default=720, help="clips per session")
+    parser.add_argument("--sessions", type=int, default=10, help="number of simulated participants")
+    parser.add_argument("--sync-every", type=int, default=10, help="records per fsync of the session log")
+    parser.add_argument("--folder", help="clip folder to take the stimuli from instead of generated names")
+    parser.add_argument("--inline", action="store_true", help="write the log in the click handler instead of the writer thread")
+    args = parser.parse_args()
+
+    if args.folder:
+        folder = os.path.abspath(args.folder)
+        stimuli = StimulusSource(os.path.dirname(folder), os.path.basename(folder)).load()[:args.trials]
+    else:
+        stimuli = [os.path.join("Testset", f"01-01-{i % 8 + 1:02d}-01-01-01-{i % 24 + 1:02d}.mp4")
+                   for i in range(args.trials)]
+    answer_key = {stimulus: EMOTIONS[i % len(EMOTIONS)] for i, stimulus in enumerate(stimuli)}
+
+    with tempfile.TemporaryDirectory() as folder:
+        trials = 0
+        clicks = []
+        started = time.perf_counter()
+        for session in range(args.sessions):
+            engine = TrialEngine.open_session(folder, f"sim{session}", lambda: stimuli, answer_key,
+                                              sync_every=args.sync_every, background=not args.inline)
+            clicks += simulate(engine, seed=session)
+            engine.export(os.path.join(folder, f"sim{session}.csv"))
+            engine.log.close()
+            trials += len(engine.responses)
+            # Replaying the log has to give the same answers, as after a crash
+            log = SessionLog(engine.log.path)
+            if log.replay() != engine.responses:
+                print(f"Sitzung {session}: das Protokoll stimmt nicht mit den Antworten überein.")
+                return 1
+        elapsed = time.perf_counter() - started
+        written = sum(entry.stat().st_size for entry in os.scandir(folder))
+
+    print(f"{trials} Durchgänge in {elapsed:.2f} s ({trials / elapsed:.0f} pro Sekunde), "
+          f"{written / 1e6:.1f} MB geschrieben.")
+    clicks.sort()
+    print(f"Klick: Ø {sum(clicks) / len(clicks) * 1e6:.0f} µs, 95% {clicks[int(len(clicks) * 0.95)] * 1e6:.0f} µs, "
+          f"max. {clicks[-1] * 1e6:.0f} µs")
+    if not args.inline:
+        print("Hintergrund: " + shared_writer().summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
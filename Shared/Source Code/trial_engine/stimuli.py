@@ -0,0 +1,52 @@
+import os
+import random
+from clip_index import VIDEO_EXTENSIONS, load_clip_paths
+from proxy_cache import ProxyIndex, proxy_folder
+
+# What a participant gets to see and hear, and which proxies fit that
+MODALITIES = {
+    "audio": {"video": False, "muted": False, "proxy_tier": None},
+    "video": {"video": True, "muted": True, "proxy_tier": "video"},
+    "both": {"video": True, "muted": False, "proxy_tier": "both"},
+}
+
+
+class StimulusSource:
+    """The clips of one app folder (Trainingsset, Testset) and the files to play for them.
+
+    Stimuli are the original clip paths; media_path() maps them to a
+    transcoded proxy when one exists, so answers always refer to the originals.
+    """
+
+    def __init__(self, script_folder, folder, modality="video", proxy_tier=None,
+                 extensions=VIDEO_EXTENSIONS, recursive=True):
+        self.script_folder = script_folder
+        self.folder = folder
+        self.modality = MODALITIES[modality]
+        self.extensions = extensions
+        self.recursive = recursive
+        tier = proxy_tier or self.modality["proxy_tier"]
+        self.proxies = ProxyIndex(proxy_folder(script_folder, tier)) if tier else None
+
+    def load(self, shuffle=True, seed=None):
+        # The clip index from clip_index.py saves walking the folder, e.g. on network shares
+        stimuli = load_clip_paths(self.script_folder, self.folder, self.extensions)
+        if stimuli is None:
+            stimuli = self._walk()
+        if shuffle:
+            random.Random(seed).shuffle(stimuli)
+        return stimuli
+
+    def _walk(self):
+        folder_path = os.path.join(self.script_folder, self.folder)
+        stimuli = []
+        for root, _, files in os.walk(folder_path):
+            for file in files:
+                if file.lower().endswith(self.extensions):
+                    stimuli.append(os.path.join(root, file))
+            if not self.recursive:
+                break
+        return stimuli
+
+    def media_path(self, stimulus):
+        return stimulus if self.proxies is None else self.proxies.resolve(stimulus)
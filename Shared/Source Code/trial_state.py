@@ -0,0 +1,95 @@
+import time
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal
+from PyQt5.QtMultimedia import QMediaPlayer
+
+LOADING = "loading"
+PLAYING = "playing"
+RESPONSE = "response"
+FEEDBACK = "feedback"
+SAVING = "saving"
+
+
+class TrialStateMachine(QObject):
+    """Per-trial state: loading -> playing -> response -> (feedback) -> saving.
+
+    The response window opens from the player's real events instead of a
+    fixed delay after every state change. `opens` selects the rule: "start"
+    opens it once playback runs, "end" once the clip has finished; `delay_ms`
+    adds a minimum presentation time. There is exactly one precise timer,
+    restarted for every trial, so no timer of an earlier clip can fire into
+    the next one. respond() accepts only the first answer per trial.
+    """
+
+    stateChanged = pyqtSignal(str)
+    responseWindowOpened = pyqtSignal()
+    responseWindowClosed = pyqtSignal()
+
+    def __init__(self, parent, player_pool, opens="start", delay_ms=0):
+        super().__init__(parent)
+        self.opens = opens
+        self.delay_ms = delay_ms
+        self.state = None
+        self.trial = 0
+        self.response_opened_at = None
+        self.response_time = None  # seconds from window opening to the answer of the last trial
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self._open_response_window)
+
+        player_pool.stateChanged.connect(self._on_player_state_changed)
+        player_pool.mediaStatusChanged.connect(self._on_media_status_changed)
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.state = state
+            self.stateChanged.emit(state)
+
+    def start_trial(self, player):
+        """Call right after the player was told to play the trial's clip."""
+        self.trial += 1
+        self.timer.stop()
+        self.response_opened_at = None
+        self._set_state(LOADING)
+        self.responseWindowClosed.emit()
+        if player.state() == QMediaPlayer.PlayingState:
+            self._on_player_state_changed(QMediaPlayer.PlayingState)
+
+    def _schedule_response_window(self):
+        if self.delay_ms > 0:
+            self.timer.start(self.delay_ms)
+        else:
+            self._open_response_window()
+
+    def _on_player_state_changed(self, state):
+        if state == QMediaPlayer.PlayingState and self.state == LOADING:
+            self._set_state(PLAYING)
+            if self.opens == "start":
+                self._schedule_response_window()
+
+    def _on_media_status_changed(self, status):
+        if status == QMediaPlayer.EndOfMedia and self.state == PLAYING and self.opens == "end":
+            self._schedule_response_window()
+        elif status == QMediaPlayer.InvalidMedia and self.state in (LOADING, PLAYING):
+            # A broken clip must not leave the participant without buttons
+            self.timer.stop()
+            self._open_response_window()
+
+    def _open_response_window(self):
+        if self.state in (LOADING, PLAYING):
+            self._set_state(RESPONSE)
+            self.response_opened_at = time.perf_counter()
+            self.responseWindowOpened.emit()
+
+    def respond(self):
+        """Register the answer of this trial; False if the response window is not open."""
+        if self.state != RESPONSE:
+            return False
+        self.response_time = time.perf_counter() - self.response_opened_at
+        self._set_state(SAVING)
+        self.responseWindowClosed.emit()
+        return True
+
+    def show_feedback(self):
+        self._set_state(FEEDBACK)
@@ -1,11 +1,21 @@
+import sys
 import tkinter as tk
 from tkinter import ttk
+from tkinter import messagebox
 from tkinter import filedialog
-import random
-import pandas as pd
-import os
-from PIL import ImageTk, Image
-from moviepy.editor import VideoFileClip, concatenate_videoclips
+import multiprocessing
+import threading
+import importlib
+from functools import partial
+from pathlib import Path
+
+# Modules shared by all apps live in "Shared/Source Code" at the top of the repository
+sys.path.insert(0, str(Path(__file__).resolve().parents[4] / "Shared" / "Source Code"))
+from trial_engine import StimulusSource, TrialEngine, resume_question
+from frame_cache import FrameCache
+from frame_ring import open_frame_ring
+from read_ahead import ReadAheadCache, spool_folder
+from tk_player import CanvasPlayer, moviepy_frames
 
 class EmotionalRecognitionApp:
     def __init__(self, master):
@@ -14,25 +24,28 @@ class EmotionalRecognitionApp:
         self.master.geometry("1280x720")
 
         # Initialize variables
-        self.video_list = []  # List of video file paths
         self.video_playing = False
-        self.answers = []  # List to store answers
-        self.current_video = None  # Currently displayed video
-        self.current_video_index = -1  # Index of the current video in the list
         self.total_videos = 720
-        self.videos_done = 0
-        self.progress = 0
-        self.autosave_count = 0
+
+        # Clip order and answers are handled by the trial engine; every answer goes to a session log in
+        # Sessions, and an unfinished session can be resumed at the same trial with the same clip order
+        self.source = StimulusSource('', 'Testset', proxy_tier='tk', recursive=False)
+        self.engine = TrialEngine.open_session('Sessions', "EmotionalTest", self.source.load, confirm=self.ask_resume)
 
         # Add widgets
         self.create_widgets()
-
-        # Load video list
-        self.load_video_list()
+        self.total_videos = self.engine.total
 
         # Disable emotion buttons initially
         self.disable_emotion_buttons()
 
+        # moviepy takes seconds to import; load it in the background once the window is up
+        self.master.after(200, lambda: threading.Thread(target=importlib.import_module, args=("moviepy.editor",),
+                                                        daemon=True).start())
+
+    def ask_resume(self, log):
+        return messagebox.askyesno("Sitzung fortsetzen", resume_question(log), parent=self.master)
+
     def disable_emotion_buttons(self):
         # Helper function to disable all emotion buttons
         for widget in self.emotion_frame.winfo_children():
@@ -58,6 +71,16 @@ class EmotionalRecognitionApp:
         # Create video player widget (requires video playback implementation)
         self.video_canvas = tk.Canvas(self.master, bg="black", width=1275, height=715)
         self.video_canvas.pack(pady=10)
+        # Clips are decoded on a separate thread and shown in one reused canvas image
+        # Decoded frames of the previous, current and next clip are kept, so back steps need no decoding
+        self.frame_cache = FrameCache()
+        # The next clips are copied from the (network) clip folder to the local disk while one plays
+        self.read_ahead = ReadAheadCache(spool_folder=spool_folder())
+        self.player = CanvasPlayer(self.video_canvas, on_finished=self.pause_video, cache=self.frame_cache)
+        # With decoder_process.txt next to the program clips are decoded in a separate process
+        self.frame_ring = open_frame_ring('', self.player.size)
+        if self.frame_ring is not None:
+            self.player.decoder_factory = self.frame_ring.decoder
 
         # Create emotion buttons (fear, happy, sad, angry, disgust, neutral)
         self.emotion_frame = tk.Frame(self.master)
@@ -95,91 +118,54 @@ class EmotionalRecognitionApp:
         # Create export button in the final window (requires implementation of final window)
         self.export_button = tk.Button(self.master, text="Export", command=self.on_export_click)
 
-    def load_video_list(self):
-        # Load the list of video file paths from the 'videos' folder
-        video_folder = 'Testset'
-        self.video_list = [
-            os.path.join(video_folder, f) for f in os.listdir(video_folder)
-            if os.path.isfile(os.path.join(video_folder, f))
-        ]
-        random.shuffle(self.video_list)
-        self.total_videos = len(self.video_list)
-
     def start_program(self):
         self.start_button.config(state='disabled')
         self.export_button.pack_forget()
+        self.update_progress()
         self.play_next_video()
 
     def play_next_video(self):
-        if self.videos_done < self.total_videos:
-            self.current_video_index = (self.current_video_index + 1) % len(self.video_list)
-            self.current_video = self.video_list[self.current_video_index]
-            self.play_video(self.current_video)
+        video = self.engine.next_trial()
+        if video is not None:
+            self.play_video(video)
         else:
             self.show_final_window()
 
     def play_video(self, video_path):
-        self.video_clip = VideoFileClip(video_path)
         self.video_playing = True
-        self.current_time = 0
-        self.master.after(1, self.update_video_frame)
-
-    def update_video_frame(self):
-        if not self.video_playing:
-            return
-
-        if self.current_time < self.video_clip.duration:
-            frame = self.video_clip.get_frame(self.current_time)
-            image = Image.fromarray(frame)
-            self.photo = ImageTk.PhotoImage(image=image)
-            self.video_canvas.create_image(0, 0, image=self.photo, anchor=tk.NW)
-            self.current_time += 1 / self.video_clip.fps
-            self.master.after(int(1000 // self.video_clip.fps), self.update_video_frame)
-        else:
-            self.pause_video()
+        self.player.play(self.clip_frames(video_path), video_path)
+        upcoming = self.engine.upcoming(self.read_ahead.depth)
+        self.read_ahead.prefetch([self.source.media_path(path) for path in upcoming])
+        # The preload opens the clip only once the read-ahead has copied it
+        self.player.preload([(path, self.read_ahead.deferred(moviepy_frames, self.source.media_path(path)))
+                             for path in upcoming[:1]])
+
+    def clip_frames(self, video_path):
+        return partial(moviepy_frames, self.read_ahead.local_path(self.source.media_path(video_path)))
 
     def on_emotion_click(self, emotion):
-        self.answers.append((self.current_video, emotion))
-        self.videos_done += 1
+        self.engine.respond(emotion)
         self.update_progress()
 
-        # Check if 5 videos have been completed
-        if self.videos_done % 5 == 0:
-            self.autosave_answers()
-
         self.play_next_video()
 
         # Disable emotion buttons after click
         self.disable_emotion_buttons()
     
-    def autosave_answers(self):
-        self.autosave_count += 1
-        if self.autosave_count == 1:
-            # Create a new file for autosaving
-            self.autosave_file_path = f"autosave_{self.autosave_count}.csv"
-        else:
-            # Overwrite the existing autosave file
-            self.autosave_file_path = f"autosave_{self.autosave_count}.csv"
-
-        df = pd.DataFrame(self.answers, columns=["Video", "Emotion"])
-        df.to_csv(self.autosave_file_path, index=False)
-
     def pause_video(self):
         self.video_playing = False
         # Enable emotion buttons when video stops playing
         self.enable_emotion_buttons()
 
     def on_back_click(self):
-        if self.videos_done > 0:
+        video = self.engine.back()
+        if video is not None:
             self.disable_emotion_buttons()
-            self.answers.pop()
-            self.videos_done -= 1
             self.update_progress()
-            self.current_video_index = (self.current_video_index - 2) % len(self.video_list)
-            self.play_next_video()
+            self.play_video(video)
 
     def update_progress(self):
-        self.progress = (self.videos_done / self.total_videos) * 100
+        self.progress = (len(self.engine.responses) / self.total_videos) * 100
         self.progress_bar['value'] = self.progress
 
     def show_final_window(self):
@@ -191,11 +177,11 @@ class EmotionalRecognitionApp:
                                                  filetypes=[("CSV files", "*.csv")],
                                                  initialfile="Emotional Tratrining NAME.csv")
         if file_path:
-            df = pd.DataFrame(self.answers, columns=["Video", "Emotion"])
-            df.to_csv(file_path, index=False)
+            self.engine.export(file_path, columns=("Video", "Emotion"))
             self.master.destroy()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = EmotionalRecognitionApp(root)
     root.mainloop()
\ No newline at end of file
@@ -1,11 +1,18 @@
+import sys
 import tkinter as tk
 from tkinter import ttk
-from tkinter import filedialog
-import cv2
-import random
-import pandas as pd
-import os
-from PIL import Image, ImageTk
+from tkinter import messagebox
+import multiprocessing
+from functools import partial
+from pathlib import Path
+
+# Modules shared by all apps live in "Shared/Source Code" at the top of the repository
+sys.path.insert(0, str(Path(__file__).resolve().parents[4] / "Shared" / "Source Code"))
+from trial_engine import StimulusSource, TrialEngine, AnswerKey, resume_question
+from frame_cache import FrameCache
+from frame_ring import open_frame_ring
+from read_ahead import ReadAheadCache, spool_folder
+from tk_player import CanvasPlayer, opencv_frames
 
 class EmotionalRecognitionApp:
     def __init__(self, master):
@@ -14,34 +21,24 @@ class EmotionalRecognitionApp:
         self.master.geometry("1280x720")
 
         # Initialize variables
-        self.video_list = []  # List of video file paths
         self.video_playing = False
-        self.answers = []  # List to store answers
-        self.current_video = None  # Currently displayed video
-        self.current_video_index = -1  # Index of the current video in the list
         self.total_videos = 720
-        self.videos_done = 0
-        self.progress = 0
-        self.autosave_count = 0
 
-        # Initialize correct answers dictionary
-        self.correct_answers = {}
-        self.load_correct_answers()
+        # Clip order, answers and scoring are handled by the trial engine; the clips are played in folder order.
+        # Every answer goes to a session log in Sessions, and an unfinished session can be resumed where it stopped
+        self.source = StimulusSource('', 'Trainingsset', proxy_tier='tk', extensions=('.mp4',))
+        self.engine = TrialEngine.open_session('Sessions', "EmotionTrain", lambda: self.source.load(shuffle=False),
+                                               AnswerKey.load('', 'Trainingsset'),
+                                               limit=self.total_videos, confirm=self.ask_resume)
 
         # Add widgets
         self.create_widgets()
 
-        # Load video list
-        self.load_video_list()
-
         # Disable emotion buttons initially
         self.disable_emotion_buttons()
 
-    def load_correct_answers(self):
-        # Load correct answers from 'selected_videos.csv'
-        df = pd.read_csv('selected_videos.csv')
-        for _, row in df.iterrows():
-            self.correct_answers["Trainingsset/"+row['File Name']] = row['Emotion']
+    def ask_resume(self, log):
+        return messagebox.askyesno("Sitzung fortsetzen", resume_question(log), parent=self.master)
 
     def disable_emotion_buttons(self):
         # Helper function to disable all emotion buttons
@@ -75,6 +72,16 @@ class EmotionalRecognitionApp:
         # Create video player widget (requires video playback implementation)
         self.video_canvas = tk.Canvas(self.master, bg="black", width=1275, height=715)
         self.video_canvas.pack(pady=10)
+        # Frames are shown at their timestamps; late frames are dropped so clips keep their speed
+        # Decoded frames of the previous, current and next clip are kept, so back steps need no decoding
+        self.frame_cache = FrameCache()
+        # The next clips are copied from the (network) clip folder to the local disk while one plays
+        self.read_ahead = ReadAheadCache(spool_folder=spool_folder())
+        self.player = CanvasPlayer(self.video_canvas, on_finished=self.enable_emotion_buttons, cache=self.frame_cache)
+        # With decoder_process.txt next to the program clips are decoded in a separate process
+        self.frame_ring = open_frame_ring('', self.player.size)
+        if self.frame_ring is not None:
+            self.player.decoder_factory = self.frame_ring.decoder
 
         # Create emotion buttons (fear, happy, sad, angry, disgust, neutral)
         self.emotion_frame = tk.Frame(self.master)
@@ -97,54 +104,34 @@ class EmotionalRecognitionApp:
             )
             button.pack(side="left", padx=10)
 
-    def load_video_list(self):
-        # Load video list from a directory
-        video_directory = 'Trainingsset'
-        for root, _, files in os.walk(video_directory):
-            for file in files:
-                if file.endswith('.mp4'):
-                    self.video_list.append(os.path.join(root, file))
-
     def play_next_video(self):
         # Play the next video in the list
-        self.current_video_index += 1
-        if self.current_video_index < len(self.video_list):
-            self.current_video = self.video_list[self.current_video_index]
-            self.play_video(self.current_video) 
+        video = self.engine.next_trial()
+        if video is not None:
+            self.play_video(video)
         else:
             self.end_program()
 
     def play_video(self, video_path):
         # Play the video using OpenCV and display it in the video_canvas
-        cap = cv2.VideoCapture(video_path)
-
-        # Helper function to update the video frame in the canvas
-        def update_frame():
-            ret, frame = cap.read()
-            if ret:
-                cv2image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA)
-                img = Image.fromarray(cv2image)
-                imgtk = ImageTk.PhotoImage(image=img)
-                self.video_canvas.create_image(0, 0, anchor="nw", image=imgtk)
-                self.video_canvas.imgtk = imgtk  # Keep a reference to the image to avoid garbage collection
-                self.video_canvas.after(20, update_frame)
-            else:
-                cap.release()
-                self.enable_emotion_buttons()  # Enable emotion buttons after video ends
-
-        # Update the first frame and start the video playback loop
-        update_frame()
+        self.player.play(self.clip_frames(video_path), video_path)
+        upcoming = self.engine.upcoming(self.read_ahead.depth)
+        self.read_ahead.prefetch([self.source.media_path(path) for path in upcoming])
+        # The preload opens the clip only once the read-ahead has copied it
+        self.player.preload([(path, self.read_ahead.deferred(opencv_frames, self.source.media_path(path)))
+                             for path in upcoming[:1]])
+
+    def clip_frames(self, video_path):
+        return partial(opencv_frames, self.read_ahead.local_path(self.source.media_path(video_path)))
 
     def on_emotion_click(self, emotion):
         # Handle emotion button click
-        self.answers.append((self.current_video, emotion))
+        self.engine.respond(emotion)
         self.disable_emotion_buttons()
-        self.videos_done += 1
-        self.progress_bar["value"] = self.videos_done
-        self.progress = (self.videos_done / self.total_videos) * 100
+        self.progress_bar["value"] = len(self.engine.responses)
         self.progress_bar.update()
 
-        if self.videos_done < self.total_videos:
+        if not self.engine.done:
             self.play_next_video()
             self.enable_emotion_buttons()
         else:
@@ -153,6 +140,7 @@ class EmotionalRecognitionApp:
     def start_program(self):
         # Start the program by playing the first video
         self.start_button.config(state="disabled")
+        self.progress_bar["value"] = len(self.engine.responses)
         self.play_next_video()
         self.enable_emotion_buttons()
 
@@ -162,27 +150,19 @@ class EmotionalRecognitionApp:
         self.start_button.config(text="Restart", command=self.restart_program, state="normal")
 
         # Calculate and display results
-        correct_answers_count = 0
-        for answer in self.answers:
-            video, emotion = answer
-            if self.correct_answers[video] == emotion:
-                correct_answers_count += 1
-
-        accuracy = (correct_answers_count / len(self.answers)) * 100
+        accuracy = (self.engine.accuracy() or 0) * 100
         result_text = f"Accuracy: {accuracy:.2f}%"
         self.result_label = tk.Label(self.master, text=result_text)
         self.result_label.pack(pady=10)
 
     def restart_program(self):
         # Restart the program
-        self.answers = []
-        self.current_video_index = -1
-        self.videos_done = 0
-        self.progress = 0
+        self.engine.restart()
         self.progress_bar["value"] = 0
         self.start_program()
 
 def main():
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = EmotionalRecognitionApp(root)
     root.mainloop()
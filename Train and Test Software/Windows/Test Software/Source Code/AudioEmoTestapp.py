@@ -1,14 +1,18 @@
 import sys
 import os
-import random
-import pandas as pd
-from PyQt5.QtWidgets import QApplication, QMainWindow, QLabel, QPushButton, QVBoxLayout, QWidget, QProgressBar, QFileDialog
-from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent
-from PyQt5.QtMultimediaWidgets import QVideoWidget
-from PyQt5.QtCore import QUrl, Qt, QTimer
+from PyQt5.QtWidgets import QApplication, QMainWindow, QLabel, QPushButton, QVBoxLayout, QWidget, QProgressBar, QFileDialog, QMessageBox
+from PyQt5.QtMultimedia import QMediaPlayer
+from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
 from pathlib import Path
-from functools import partial
+
+# Modules shared by all apps live in "Shared/Source Code" at the top of the repository
+sys.path.insert(0, str(Path(__file__).resolve().parents[4] / "Shared" / "Source Code"))
+from player_pool import PlayerPool
+from read_ahead import ReadAheadCache
+from trial_engine import StimulusSource, TrialEngine, resume_question
+from response_panel import ResponsePanel, BASIC_EMOTIONS
+from trial_state import TrialStateMachine
 
 class EmotionalRecognitionApp(QMainWindow):
     def __init__(self):
@@ -17,20 +21,21 @@ class EmotionalRecognitionApp(QMainWindow):
         self.setWindowTitle("Emotional Recognition Test via audio")
         self.setGeometry(100, 100, 1280, 720)
 
-        self.video_list = []  # List of video file paths
-        self.answers = []  # List to store answers
-        self.correct_answers = {}
-        
-        self.load_video_list()
-
-        self.current_video = None
-        self.current_video_index = -1
+        script_folder = Path(sys.argv[0]).parent
+        # Clip order and answers are handled by the trial engine; every answer goes to a session log in
+        # Sessions, and an unfinished session can be resumed at the same trial with the same clip order
+        self.source = StimulusSource(script_folder, 'Testset', modality='audio')
+        self.engine = TrialEngine.open_session(os.path.join(script_folder, 'Sessions'), "Audio-test",
+                                               self.source.load,
+                                               confirm=self.ask_resume)
         self.total_videos = 720
-        self.videos_done = 0
-        self.autosave_count = 0
 
         self.init_ui()
 
+    def ask_resume(self, log):
+        answer = QMessageBox.question(self, "Sitzung fortsetzen", resume_question(log), QMessageBox.Yes | QMessageBox.No)
+        return answer == QMessageBox.Yes
+
     def init_ui(self):
         self.central_widget = QWidget(self)
         self.setCentralWidget(self.central_widget)
@@ -71,28 +76,18 @@ class EmotionalRecognitionApp(QMainWindow):
         # self.video_widget = QVideoWidget(self)
         # self.layout.addWidget(self.video_widget)
 
-        self.media_player = QMediaPlayer(self, QMediaPlayer.LowLatency)
         # only Audio version
-        # self.media_player.setVideoOutput(self.video_widget)
-        self.media_player.stateChanged.connect(self.media_state_changed)
-
-        emotions = [
-            ("Angst", "#FF5733"),
-            ("Freude", "#FFFF66"),
-            ("Trauer", "#4DA6FF"),
-            ("Wut", "#B22222"),
-            ("Ekel", "#3CB371"),
-            ("Neutral", "#C0C0C0")
-        ]
-
-        self.emotion_buttons = []
-        for emotion, color in emotions:
-            button = QPushButton(emotion, self)
-            button.setStyleSheet(f"background-color: {color}; color: black")
-            button.clicked.connect(partial(self.on_emotion_click, emotion))
-            button.setEnabled(False)
-            self.layout.addWidget(button)
-            self.emotion_buttons.append(button)
+        self.player_pool = PlayerPool(self, flags=QMediaPlayer.LowLatency, read_ahead=ReadAheadCache())
+        # The answer buttons open once the clip really plays and close again with the answer
+        self.trial_state = TrialStateMachine(self, self.player_pool)
+        self.trial_state.responseWindowOpened.connect(self.enable_emotion_buttons)
+        self.trial_state.responseWindowClosed.connect(self.disable_emotion_buttons)
+        self.media_player = self.player_pool.current
+
+        self.response_panel = ResponsePanel(BASIC_EMOTIONS, self)
+        self.response_panel.selected.connect(self.on_emotion_click)
+        self.response_panel.setEnabled(False)
+        self.layout.addWidget(self.response_panel)
 
         self.back_button = QPushButton("Zurück", self)
         self.back_button.setStyleSheet("color: black")
@@ -105,56 +100,38 @@ class EmotionalRecognitionApp(QMainWindow):
         self.layout.addWidget(self.export_button)
         self.export_button.hide()
 
-    def load_video_list(self):
-        script_folder = Path(sys.argv[0]).parent
-        video_folder = 'Testset'
-        video_folder_path = os.path.join(script_folder, video_folder)
-        for root, _, files in os.walk(video_folder_path):
-            for file in files:
-                if file.lower().endswith(('.mp4', '.mkv', '.avi', '.flv', '.wmv', '.mov')):
-                    self.video_list.append(os.path.join(root, file))
-
-        random.shuffle(self.video_list)
-
     def start_program(self):
         self.start_button.hide()
         self.description_label.hide()
+        self.progress_bar.setValue(len(self.engine.responses))
         self.play_next_video()
         self.audio_label.show()
 
     def play_next_video(self):
-        self.current_video_index += 1
-        if self.current_video_index < len(self.video_list):
-            self.current_video = self.video_list[self.current_video_index]
-            self.media_player.setMedia(QMediaContent(QUrl.fromLocalFile(os.path.abspath(self.current_video))))
-            self.media_player.play()
-        else:
+        self.play_video(self.engine.next_trial())
+
+    def play_video(self, video):
+        if video is None:
             self.show_export_button()
+            return
+        upcoming = self.engine.upcoming(self.player_pool.lookahead)
+        self.media_player = self.player_pool.play(self.source.media_path(video),
+                                                  [self.source.media_path(path) for path in upcoming])
+        self.trial_state.start_trial(self.media_player)
 
     def on_emotion_click(self, emotion):
-        self.answers.append(emotion)
-        self.videos_done += 1
-        self.progress_bar.setValue(self.videos_done)
-        self.autosave_count += 1
-
-        if self.autosave_count % 10 == 0:
-            self.save_progress()
+        if not self.trial_state.respond():
+            return
+        self.engine.respond(emotion)
+        self.progress_bar.setValue(len(self.engine.responses))
 
-        for button in self.emotion_buttons:
-            button.setEnabled(False)
         self.play_next_video()
 
     def on_back_click(self):
-        if self.videos_done > 0:
-            self.autosave_count -= 1
-            self.videos_done -= 1
-            self.progress_bar.setValue(self.videos_done)
-            self.current_video_index -= 2
-            self.answers.pop()
-            self.play_next_video()
-
-    def media_state_changed(self, state):
-        QTimer.singleShot(1000, self.enable_emotion_buttons)
+        video = self.engine.back()
+        if video is not None:
+            self.progress_bar.setValue(len(self.engine.responses))
+            self.play_video(video)
 
     def on_export_click(self):
         options = QFileDialog.Options()
@@ -165,18 +142,13 @@ class EmotionalRecognitionApp(QMainWindow):
             self.export_results(file_name)
 
     def export_results(self, file_name):
-        data = {"Video": self.video_list[:len(self.answers)], "Answer": self.answers}
-        df = pd.DataFrame(data)
-        df.to_csv(file_name, index=False)
-
-    def save_progress(self):
-        data = {"Video": self.video_list[:len(self.answers)], "Answer": self.answers}
-        df = pd.DataFrame(data)
-        df.to_csv("Audio-test-progress"+str(self.autosave_count)+".csv", index=False)
+        self.engine.export(file_name)
 
     def enable_emotion_buttons(self):
-        for button in self.emotion_buttons:
-            button.setEnabled(True) 
+        self.response_panel.setEnabled(True)
+
+    def disable_emotion_buttons(self):
+        self.response_panel.setEnabled(False)
 
     def show_export_button(self):
         self.export_button.show()
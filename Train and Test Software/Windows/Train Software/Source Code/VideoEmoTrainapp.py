@@ -1,14 +1,18 @@
 import sys
 import os
-import random
-import pandas as pd
-from PyQt5.QtWidgets import QApplication, QMainWindow, QLabel, QPushButton, QVBoxLayout, QWidget, QProgressBar, QFileDialog
-from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent
+from PyQt5.QtWidgets import QApplication, QMainWindow, QLabel, QPushButton, QVBoxLayout, QWidget, QProgressBar, QFileDialog, QMessageBox
+from PyQt5.QtMultimedia import QMediaPlayer
 from PyQt5.QtMultimediaWidgets import QVideoWidget
-from PyQt5.QtCore import QUrl, Qt, QTimer
+from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
 from pathlib import Path
-from functools import partial
+
+# Modules shared by all apps live in "Shared/Source Code" at the top of the repository
+sys.path.insert(0, str(Path(__file__).resolve().parents[4] / "Shared" / "Source Code"))
+from player_pool import PlayerPool
+from read_ahead import ReadAheadCache
+from trial_engine import StimulusSource, TrialEngine, AnswerKey, resume_question
+from response_panel import ResponsePanel, BASIC_EMOTIONS
 
 class EmotionalRecognitionApp(QMainWindow):
     def __init__(self):
@@ -17,21 +21,22 @@ class EmotionalRecognitionApp(QMainWindow):
         self.setWindowTitle("Emotional Recognition Training via video")
         self.setGeometry(100, 100, 1280, 720)
 
-        self.video_list = []  # List of video file paths
-        self.answers = []  # List to store answers
-        self.correct_answers = {}
-        
-        self.load_correct_answers()
-        self.load_video_list()
-
-        self.current_video = None
-        self.current_video_index = -1
+        script_folder = Path(sys.argv[0]).parent
+        # Clip order and answers are handled by the trial engine; every answer goes to a session log in
+        # Sessions, and an unfinished session can be resumed at the same trial with the same clip order
+        self.source = StimulusSource(script_folder, 'Trainingsset', modality='video')
+        self.engine = TrialEngine.open_session(os.path.join(script_folder, 'Sessions'), "Video-train",
+                                               self.source.load,
+                                               AnswerKey.load(script_folder, 'Trainingsset'),
+                                               confirm=self.ask_resume)
         self.total_videos = 720
-        self.videos_done = 0
-        self.autosave_count = 0
 
         self.init_ui()
 
+    def ask_resume(self, log):
+        answer = QMessageBox.question(self, "Sitzung fortsetzen", resume_question(log), QMessageBox.Yes | QMessageBox.No)
+        return answer == QMessageBox.Yes
+
     def init_ui(self):
         self.central_widget = QWidget(self)
         self.setCentralWidget(self.central_widget)
@@ -61,28 +66,15 @@ class EmotionalRecognitionApp(QMainWindow):
         self.video_widget = QVideoWidget(self)
         self.layout.addWidget(self.video_widget)
 
-        self.media_player = QMediaPlayer(self, QMediaPlayer.VideoSurface)
-        self.media_player.setVideoOutput(self.video_widget)
-        self.media_player.setMuted(True)
-        self.media_player.stateChanged.connect(self.media_state_changed)
-
-        emotions = [
-            ("Angst", "#FF5733"),
-            ("Freude", "#FFFF66"),
-            ("Trauer", "#4DA6FF"),
-            ("Wut", "#B22222"),
-            ("Ekel", "#3CB371"),
-            ("Neutral", "#C0C0C0")
-        ]
-
-        self.emotion_buttons = []
-        for emotion, color in emotions:
-            button = QPushButton(emotion, self)
-            button.setStyleSheet(f"background-color: {color}; color: black")
-            button.clicked.connect(partial(self.on_emotion_click, emotion))
-            button.setEnabled(False)
-            self.layout.addWidget(button)
-            self.emotion_buttons.append(button)
+        self.player_pool = PlayerPool(self, self.video_widget, flags=QMediaPlayer.VideoSurface,
+                                      muted=self.source.modality["muted"], read_ahead=ReadAheadCache())
+        self.player_pool.stateChanged.connect(self.media_state_changed)
+        self.media_player = self.player_pool.current
+
+        self.response_panel = ResponsePanel(BASIC_EMOTIONS, self)
+        self.response_panel.selected.connect(self.on_emotion_click)
+        self.response_panel.setEnabled(False)
+        self.layout.addWidget(self.response_panel)
 
         self.back_button = QPushButton("Zurück", self)
         self.back_button.setStyleSheet("color: black")
@@ -101,70 +93,43 @@ class EmotionalRecognitionApp(QMainWindow):
         self.layout.addWidget(self.export_button)
         self.export_button.hide()
 
-    def load_correct_answers(self):
-        script_folder = Path(sys.argv[0]).parent
-        df = pd.read_csv(os.path.join(script_folder, 'selected_videos.csv'))
-        for _, row in df.iterrows():
-            self.correct_answers["./Trainingsset/" + row['File Name']] = row['Emotion']
-
-    def load_video_list(self):
-        script_folder = Path(sys.argv[0]).parent
-        video_folder = 'Trainingsset'
-        video_folder_path = os.path.join(script_folder, video_folder)
-        for root, _, files in os.walk(video_folder_path):
-            for file in files:
-                if file.lower().endswith(('.mp4', '.mkv', '.avi', '.flv', '.wmv', '.mov')):
-                    self.video_list.append(os.path.join(root, file))
-
-        random.shuffle(self.video_list)
-
     def start_program(self):
         self.start_button.hide()
         self.description_label.hide()
+        self.progress_bar.setValue(len(self.engine.responses))
         self.play_next_video()
 
     def play_next_video(self):
-        self.current_video_index += 1
-        if self.current_video_index < len(self.video_list):
-            self.current_video = self.video_list[self.current_video_index]
-            self.media_player.setMedia(QMediaContent(QUrl.fromLocalFile(os.path.abspath(self.current_video))))
-            self.media_player.play()
-        else:
-            self.show_export_button()
-
+        self.play_video(self.engine.next_trial())
 
+    def play_video(self, video):
+        if video is None:
+            self.show_export_button()
+            return
+        upcoming = self.engine.upcoming(self.player_pool.lookahead)
+        self.media_player = self.player_pool.play(self.source.media_path(video),
+                                                  [self.source.media_path(path) for path in upcoming])
 
     def on_emotion_click(self, emotion):
-        self.answers.append(emotion)
-        self.videos_done += 1
-        self.progress_bar.setValue(self.videos_done)
-        self.autosave_count += 1
-
-        if self.autosave_count % 10 == 0:
-            self.save_progress()
+        correct_emotion = self.engine.respond(emotion)
+        self.progress_bar.setValue(len(self.engine.responses))
 
-        for button in self.emotion_buttons:
-            button.setEnabled(False)
-        self.show_correct_answer()
+        self.response_panel.setEnabled(False)
+        self.show_correct_answer(correct_emotion)
         self.verstanden_button.setEnabled(True)
 
     def on_back_click(self):
-        if self.videos_done > 0:
-            self.videos_done -= 1
-            self.autosave_count -= 1
-            self.progress_bar.setValue(self.videos_done)
-            self.current_video_index -= 2
-            self.answers.pop()
-            self.play_next_video()
+        video = self.engine.back()
+        if video is not None:
+            self.progress_bar.setValue(len(self.engine.responses))
+            self.play_video(video)
 
     def on_verstanden_click(self):
         self.verstanden_button.setEnabled(False)
         self.correct_answer_label.hide()
         self.play_next_video()
 
-
-    def show_correct_answer(self):
-        correct_emotion = self.correct_answers[self.current_video]
+    def show_correct_answer(self, correct_emotion):
         self.correct_answer_label.setText(f"Correct answer: {correct_emotion}")
         self.correct_answer_label.show()
         self.correct_answer_label.setAlignment(Qt.AlignCenter)
@@ -173,9 +138,7 @@ class EmotionalRecognitionApp(QMainWindow):
         self.correct_answer_label.setFont(font)
 
     def media_state_changed(self, state):
-
-        for button in self.emotion_buttons:
-            button.setEnabled(True) 
+        self.response_panel.setEnabled(True)
 
     def on_export_click(self):
         options = QFileDialog.Options()
@@ -186,14 +149,7 @@ class EmotionalRecognitionApp(QMainWindow):
             self.export_results(file_name)
 
     def export_results(self, file_name):
-        data = {"Video": self.video_list[:len(self.answers)], "Answer": self.answers}
-        df = pd.DataFrame(data)
-        df.to_csv(file_name, index=False)
-
-    def save_progress(self):
-        data = {"Video": self.video_list[:len(self.answers)], "Answer": self.answers}
-        df = pd.DataFrame(data)
-        df.to_csv("Video-train-progress"+str(self.autosave_count)+".csv", index=False)
+        self.engine.export(file_name)
 
     def show_export_button(self):
         self.export_button.show()
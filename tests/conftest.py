@@ -0,0 +1,18 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# The programs import their modules from these folders, see the bootstrap lines in the apps
+REPOSITORY = Path(__file__).resolve().parents[1]
+for folder in ("Labeling Software/Source Code", "Shared/Source Code"):
+    sys.path.insert(0, str(REPOSITORY / folder))
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    """One QApplication for the widget tests, without a display."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
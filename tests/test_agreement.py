@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from agreement import MISSING, LabelMatrix, fleiss_kappa, krippendorff_alpha
+
+
+def test_fleiss_kappa_of_the_worked_example():
+    # Fleiss (1971) as worked through on Wikipedia: 10 subjects, 14 raters, 5 categories
+    counts = np.array([
+        [0, 0, 0, 0, 14],
+        [0, 2, 6, 4, 2],
+        [0, 0, 3, 5, 6],
+        [0, 3, 9, 2, 0],
+        [2, 2, 8, 1, 1],
+        [7, 7, 0, 0, 0],
+        [3, 2, 6, 3, 0],
+        [2, 5, 3, 2, 2],
+        [6, 5, 2, 1, 0],
+        [0, 2, 2, 3, 7],
+    ])
+    assert fleiss_kappa(counts) == pytest.approx(0.2099, abs=5e-5)
+
+
+def test_krippendorff_alpha_with_missing_ratings():
+    # Krippendorff's nominal example: 4 coders, 12 units, None where a coder gave no value
+    ratings = [
+        [1, 2, 3, 3, 2, 1, 4, 1, 2, None, None, None],
+        [1, 2, 3, 3, 2, 2, 4, 1, 2, 5, None, 3],
+        [None, 3, 3, 3, 2, 3, 4, 2, 2, 5, 1, None],
+        [1, 2, 3, 3, 2, 4, 4, 1, 2, 5, 1, None],
+    ]
+    codes = np.full((4, 12, 3), MISSING, dtype=np.int8)
+    for user, row in enumerate(ratings):
+        for clip, value in enumerate(row):
+            if value is not None:
+                codes[user, clip, 0] = value - 1
+    matrix = LabelMatrix(codes, users=list("ABCD"), clips=[f"{i}.mp4" for i in range(12)])
+    counts = matrix.counts(0)
+    assert counts.sum() == 41
+    assert krippendorff_alpha(counts) == pytest.approx(0.743, abs=5e-4)
+
+
+def test_full_agreement():
+    counts = np.array([[3, 0], [0, 3], [3, 0]])
+    assert fleiss_kappa(counts) == pytest.approx(1.0)
+    assert krippendorff_alpha(counts) == pytest.approx(1.0)
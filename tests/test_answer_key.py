@@ -0,0 +1,30 @@
+import os
+
+from trial_engine import AnswerKey, StimulusSource
+
+
+def test_relative_app_folder(tmp_path, monkeypatch):
+    # Started as "python app/VideoEmoTrainapp.py" from the folder above the app
+    monkeypatch.chdir(tmp_path)
+    clips = tmp_path / "app" / "Trainingsset"
+    clips.mkdir(parents=True)
+    (clips / "01-01-05-01-01-01-01.mp4").write_bytes(b"clip")
+    (clips / "x.mp4").write_bytes(b"clip")
+    # The CSV says Freude although the file name codes Wut (05)
+    (tmp_path / "app" / "selected_videos.csv").write_text(
+        "File Name,Emotion\n01-01-05-01-01-01-01.mp4,Freude\nx.mp4,Angst\n", encoding="utf-8")
+
+    key = AnswerKey.load("app", "Trainingsset")
+    stimuli = StimulusSource("app", "Trainingsset").load(shuffle=False)
+    assert sorted(stimuli) == [os.path.join("app", "Trainingsset", "01-01-05-01-01-01-01.mp4"),
+                               os.path.join("app", "Trainingsset", "x.mp4")]
+    assert key.get(os.path.join("app", "Trainingsset", "01-01-05-01-01-01-01.mp4")) == "Freude"
+    assert key.get(os.path.join("app", "Trainingsset", "x.mp4")) == "Angst"
+    assert key.get(str(clips / "x.mp4")) == "Angst"
+
+
+def test_filename_code_is_the_fallback(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    key = AnswerKey.load("", "Trainingsset")
+    assert key.get(os.path.join("Trainingsset", "01-01-05-01-01-01-01.mp4")) == "Wut"
+    assert key.get(os.path.join(".", "Trainingsset", "x.mp4")) is None
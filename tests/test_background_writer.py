@@ -0,0 +1,52 @@
+import pytest
+
+from background_writer import BackgroundWriter
+
+
+def test_failed_task_is_retried():
+    writer = BackgroundWriter(retries=2, retry_delay=0)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise OSError("disk busy")
+
+    writer.submit(flaky)
+    writer.flush()
+    writer.close()
+    assert len(calls) == 3
+    assert writer.stats()["errors"] == 0
+
+
+def test_first_error_is_raised_from_flush_once():
+    writer = BackgroundWriter(retries=1, retry_delay=0)
+
+    def fail(message):
+        raise OSError(message)
+
+    writer.submit(fail, "first")
+    writer.submit(fail, "second")
+    with pytest.raises(OSError, match="first"):
+        writer.flush()
+    writer.flush()
+    assert writer.stats()["errors"] == 2
+    writer.close()
+
+
+def test_error_is_raised_from_close():
+    writer = BackgroundWriter(retries=0)
+    writer.submit(lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        writer.close()
+    writer.close()
+
+
+def test_write_times_are_bounded():
+    writer = BackgroundWriter(history=5)
+    for _ in range(20):
+        writer.submit(lambda: None)
+    writer.flush()
+    writer.close()
+    assert len(writer.write_times) == 5
+    assert writer.stats()["writes"] == 20
@@ -0,0 +1,55 @@
+import csv
+import os
+
+from build_dataset import collect_labels
+
+
+def write_clips(user_folder, rows):
+    os.makedirs(user_folder, exist_ok=True)
+    with open(os.path.join(user_folder, 'clips.csv'), 'w', newline='') as f:
+        csv.writer(f).writerows(rows)
+
+
+def test_unchanged_folders_come_from_the_cache(tmp_path):
+    folder = str(tmp_path / "users")
+    cache_path = str(tmp_path / "cache.pickle")
+    write_clips(os.path.join(folder, "anna"), [["a.mp4", "True", "Wut", "None", "None"],
+                                               ["b.mp4", "False", "None", "None", "None"]])
+    write_clips(os.path.join(folder, "ben"), [["a.mp4", "True", "Freude", "None", "Scham"]])
+
+    labels, parsed = collect_labels(folder, cache_path, workers=1)
+    assert parsed == 2
+    assert labels == {"anna": [("a.mp4", "Wut", "None", "None")],
+                      "ben": [("a.mp4", "Freude", "None", "Scham")]}
+
+    cached, parsed = collect_labels(folder, cache_path, workers=1)
+    assert parsed == 0
+    assert cached == labels
+
+
+def test_modified_folder_is_parsed_again(tmp_path):
+    folder = str(tmp_path / "users")
+    cache_path = str(tmp_path / "cache.pickle")
+    write_clips(os.path.join(folder, "anna"), [["a.mp4", "True", "Wut", "None", "None"]])
+    write_clips(os.path.join(folder, "ben"), [["a.mp4", "True", "Freude", "None", "Scham"]])
+    collect_labels(folder, cache_path, workers=1)
+
+    write_clips(os.path.join(folder, "anna"), [["a.mp4", "True", "Wut", "None", "None"],
+                                               ["b.mp4", "True", "Ekel", "Angst", "None"]])
+    labels, parsed = collect_labels(folder, cache_path, workers=1)
+    assert parsed == 1
+    assert labels["anna"] == [("a.mp4", "Wut", "None", "None"), ("b.mp4", "Ekel", "Angst", "None")]
+    assert labels["ben"] == [("a.mp4", "Freude", "None", "Scham")]
+
+
+def test_removed_folder_leaves_the_cache(tmp_path):
+    folder = str(tmp_path / "users")
+    cache_path = str(tmp_path / "cache.pickle")
+    write_clips(os.path.join(folder, "anna"), [["a.mp4", "True", "Wut", "None", "None"]])
+    write_clips(os.path.join(folder, "ben"), [["a.mp4", "True", "Freude", "None", "Scham"]])
+    collect_labels(folder, cache_path, workers=1)
+
+    os.remove(os.path.join(folder, "ben", "clips.csv"))
+    labels, parsed = collect_labels(folder, cache_path, workers=1)
+    assert parsed == 0
+    assert list(labels) == ["anna"]
@@ -0,0 +1,46 @@
+import os
+
+from clip_dedup import ClipDeduplicator, sample_unique
+from clip_sampler import StratifiedSampler, walk_files
+
+
+def write(folder, name, data):
+    path = os.path.join(folder, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def test_identical_files_collapse_to_one(tmp_path):
+    source = str(tmp_path)
+    write(source, "a.mp4", b"x" * 300000)
+    write(source, os.path.join("sub", "b.mp4"), b"x" * 300000)
+    write(source, "c.mp4", b"other")
+    deduplicator = ClipDeduplicator(source, cache_path=str(tmp_path / "hashes.csv"), workers=2)
+    names = ["a.mp4", os.path.join("sub", "b.mp4"), "c.mp4"]
+    assert deduplicator.find_duplicates(names) == {"a.mp4": [os.path.join("sub", "b.mp4")]}
+    assert deduplicator.unique(names) == ["a.mp4", "c.mp4"]
+
+
+def test_same_size_different_content_is_kept(tmp_path):
+    source = str(tmp_path)
+    # Same size and same head and tail, differing only in the middle
+    write(source, "a.mp4", b"h" * 70000 + b"1" + b"t" * 70000)
+    write(source, "b.mp4", b"h" * 70000 + b"2" + b"t" * 70000)
+    deduplicator = ClipDeduplicator(source, workers=2)
+    assert deduplicator.find_duplicates(["a.mp4", "b.mp4"]) == {}
+    assert deduplicator.unique(["a.mp4", "b.mp4"]) == ["a.mp4", "b.mp4"]
+
+
+def test_sample_keeps_its_size_without_duplicates(tmp_path):
+    source = str(tmp_path)
+    for index in range(1, 21):
+        # Clips 1 to 10 exist twice, under a second actor number
+        write(source, f"01-01-01-01-01-01-{index:02d}.mp4", f"clip {index % 10}".encode())
+    deduplicator = ClipDeduplicator(source, workers=2)
+    sampler, excluded = sample_unique(deduplicator, lambda: StratifiedSampler(10, seed=4),
+                                      lambda: walk_files(source))
+    sample = sampler.sample()
+    assert len(sample) == 10
+    assert deduplicator.find_duplicates(sample) == {}
+    assert excluded and not excluded & set(sample)
@@ -0,0 +1,123 @@
+import os
+import sqlite3
+
+from clip_index import INDEX_NAME, ClipIndex, load_clip_names
+
+
+def make_clips(folder, names):
+    for name in names:
+        path = os.path.join(folder, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(b"clip")
+
+
+def build(tmp_path, folder="Clips"):
+    index = ClipIndex(str(tmp_path / INDEX_NAME))
+    index.update(str(tmp_path), folder, workers=2, ffprobe="missing-ffprobe")
+    index.close()
+
+
+def bump(path):
+    # Make sure the directory mtime differs even on coarse file system clocks
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_no_index_returns_none(tmp_path):
+    make_clips(tmp_path / "Clips", ["a.mp4"])
+    assert load_clip_names(str(tmp_path), "Clips") is None
+
+
+def test_unindexed_folder_returns_none(tmp_path):
+    make_clips(tmp_path / "Clips", ["a.mp4"])
+    make_clips(tmp_path / "Testset", ["b.mp4"])
+    build(tmp_path, "Clips")
+    assert load_clip_names(str(tmp_path), "Testset") is None
+
+
+def test_added_and_removed_clips_are_picked_up_at_load(tmp_path):
+    clips = tmp_path / "Clips"
+    make_clips(clips, ["a.mp4", "b.mp4", os.path.join("sub", "c.mp4")])
+    build(tmp_path)
+    assert load_clip_names(str(tmp_path), "Clips") == ["a.mp4", "b.mp4", os.path.join("sub", "c.mp4")]
+
+    os.remove(clips / "b.mp4")
+    make_clips(clips, ["d.mp4", os.path.join("new", "e.mp4")])
+    bump(clips)
+    os.remove(clips / "sub" / "c.mp4")
+    bump(clips / "sub")
+    assert load_clip_names(str(tmp_path), "Clips") == ["a.mp4", "d.mp4", os.path.join("new", "e.mp4")]
+
+
+def test_unchanged_folder_lists_nothing(tmp_path):
+    make_clips(tmp_path / "Clips", ["a.mp4", os.path.join("sub", "b.mp4")])
+    build(tmp_path)
+    index = ClipIndex(str(tmp_path / INDEX_NAME))
+    assert index.revalidate(str(tmp_path), "Clips")["changed"] == 0
+    index.close()
+
+
+def test_only_changed_entries_are_stored_and_not_probed(tmp_path):
+    clips = tmp_path / "Clips"
+    make_clips(clips, ["a.mp4", os.path.join("sub", "b.mp4")])
+    build(tmp_path)
+    make_clips(clips / "sub", ["c.mp4"])
+    bump(clips / "sub")
+    index = ClipIndex(str(tmp_path / INDEX_NAME))
+    counts = index.revalidate(str(tmp_path), "Clips")
+    index.close()
+    assert counts == {"clips": None, "probed": 0, "changed": 1, "removed": 0}
+
+
+def test_new_top_level_clip_keeps_nested_folders(tmp_path):
+    clips = tmp_path / "Clips"
+    make_clips(clips, ["r.mp4", os.path.join("a", "y.mp4"), os.path.join("a", "b", "x.mp4"),
+                       os.path.join("a", "b", "c", "z.mp4")])
+    build(tmp_path)
+    make_clips(clips, ["new.mp4"])
+    bump(clips)
+    expected = [os.path.join("a", "b", "c", "z.mp4"), os.path.join("a", "b", "x.mp4"), os.path.join("a", "y.mp4"),
+                "new.mp4", "r.mp4"]
+    assert load_clip_names(str(tmp_path), "Clips") == expected
+    # Still there on the next start, when nothing changed
+    assert load_clip_names(str(tmp_path), "Clips") == expected
+
+
+def test_clips_added_at_load_are_probed_by_the_next_update(tmp_path):
+    clips = tmp_path / "Clips"
+    make_clips(clips, ["a.mp4"])
+    build(tmp_path)
+    make_clips(clips, ["b.mp4"])
+    bump(clips)
+    load_clip_names(str(tmp_path), "Clips")
+    index = ClipIndex(str(tmp_path / INDEX_NAME))
+    # ffprobe is missing here, so both clips stay without metadata and are tried again
+    assert index.update(str(tmp_path), "Clips", workers=2, ffprobe="missing-ffprobe")["probed"] == 2
+    index.close()
+
+
+def test_removed_subdirectory_drops_its_clips(tmp_path):
+    clips = tmp_path / "Clips"
+    make_clips(clips, ["a.mp4", os.path.join("sub", "deep", "b.mp4")])
+    build(tmp_path)
+    os.remove(clips / "sub" / "deep" / "b.mp4")
+    os.rmdir(clips / "sub" / "deep")
+    os.rmdir(clips / "sub")
+    bump(clips)
+    assert load_clip_names(str(tmp_path), "Clips") == ["a.mp4"]
+    connection = sqlite3.connect(str(tmp_path / INDEX_NAME))
+    assert connection.execute("SELECT directory FROM directories").fetchall() == [("",)]
+    connection.close()
+
+
+def test_index_without_directories_is_checked_in_full(tmp_path):
+    clips = tmp_path / "Clips"
+    make_clips(clips, ["a.mp4"])
+    build(tmp_path)
+    connection = sqlite3.connect(str(tmp_path / INDEX_NAME))
+    connection.execute("DELETE FROM directories")
+    connection.commit()
+    connection.close()
+    make_clips(clips, ["b.mp4"])
+    assert load_clip_names(str(tmp_path), "Clips") == ["a.mp4", "b.mp4"]
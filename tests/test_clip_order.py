@@ -0,0 +1,67 @@
+import csv
+import os
+from clip_index import ClipIndex, load_clip_names
+from clip_order import ClipOrder, ClipPermutation, load_catalog, read_catalog, write_catalog, write_seed
+from label_store import LabelStore
+
+
+def test_permutation_is_a_bijection():
+    for n in (1, 2, 7, 100, 1000):
+        assert sorted(ClipPermutation(n, seed=42)) == list(range(n))
+
+
+def test_catalog_snapshot_pins_the_order(tmp_path):
+    catalog = [f"{i:03d}.mp4" for i in range(50)]
+    write_catalog(str(tmp_path), catalog)
+    order = list(ClipOrder(read_catalog(str(tmp_path)), 7).filenames())
+    # A clip added to the folder later does not change the stored catalog
+    assert list(ClipOrder(read_catalog(str(tmp_path)), 7).filenames()) == order
+    assert list(ClipOrder(catalog + ["new.mp4"], 7).filenames()) != order
+
+
+def test_import_folder_rebuilds_pending_clips_of_seeded_users(tmp_path):
+    catalog = [f"{i:03d}.mp4" for i in range(20)]
+    user_folder = tmp_path / "anna"
+    user_folder.mkdir()
+    write_seed(str(user_folder), 7)
+    write_catalog(str(user_folder), catalog)
+    order = list(ClipOrder(catalog, 7).filenames())
+    labeled = [order[0], order[5]]
+    with open(user_folder / "clips.csv", "w", newline="") as f:
+        csv.writer(f).writerows([name, "True", "Freude", "None", "None"] for name in labeled)
+
+    store = LabelStore(str(tmp_path / "labels.db"))
+    assert store.import_folder(str(tmp_path)) == ["anna"]
+    assert store.pending_clips("anna") == [name for name in order if name not in labeled]
+    store.close()
+
+
+def test_import_folder_uses_the_clip_folder_for_users_without_snapshot(tmp_path):
+    clips = tmp_path / "Clips"
+    clips.mkdir()
+    for i in range(5):
+        (clips / f"{i}.mp4").write_bytes(b"")
+    (clips / "staging_manifest.csv").write_text("")
+    user_folder = tmp_path / "ben"
+    user_folder.mkdir()
+    write_seed(str(user_folder), 3)
+    (user_folder / "clips.csv").write_text("")
+
+    store = LabelStore(str(tmp_path / "labels.db"))
+    store.import_folder(str(tmp_path))
+    assert sorted(store.pending_clips("ben")) == [f"{i}.mp4" for i in range(5)]
+    store.close()
+
+
+def test_catalog_lists_subfolders_like_the_clip_index(tmp_path):
+    clips = tmp_path / "Clips"
+    (clips / "Actor_02").mkdir(parents=True)
+    for name in ("b.mp4", "a.MOV", "notes.txt", os.path.join("Actor_02", "c.mp4")):
+        (clips / name).write_bytes(b"")
+    index = ClipIndex(str(tmp_path / "clip_index.db"))
+    index.update(str(tmp_path), "Clips", ffprobe=None)
+    index.close()
+
+    catalog = load_catalog(str(clips))
+    assert catalog == [os.path.join("Actor_02", "c.mp4"), "a.MOV", "b.mp4"]
+    assert load_clip_names(str(tmp_path), "Clips") == catalog
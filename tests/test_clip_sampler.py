@@ -0,0 +1,83 @@
+import random
+from clip_sampler import StratifiedSampler, UNPARSED
+
+
+def ravdess(emotion, index):
+    return f"01-01-{emotion:02d}-01-01-01-{index:02d}.mp4"
+
+
+def test_sample_is_balanced_and_independent_of_order():
+    names = [ravdess(emotion, index) for emotion in range(1, 5) for index in range(1, 51)]
+    first = StratifiedSampler(40, seed=1)
+    for name in names:
+        first.add(name)
+    random.Random(2).shuffle(names)
+    second = StratifiedSampler(40, seed=1)
+    for name in names:
+        second.add(name)
+    assert first.sample() == second.sample()
+    assert list(first.counts().values()) == [10, 10, 10, 10]
+
+
+def test_names_without_ravdess_pattern_form_a_fallback_stratum():
+    sampler = StratifiedSampler(5, seed=1)
+    for index in range(20):
+        sampler.add(f"clip_{index}.mp4")
+    assert len(sampler.sample()) == 5
+    assert sampler.counts() == {UNPARSED: 5}
+    assert sampler.unparsed == 20
+
+
+def test_leftover_quota_goes_to_the_larger_strata():
+    sampler = StratifiedSampler(50, seed=1)
+    for index in range(1, 3):
+        sampler.add(ravdess(1, index))
+    for index in range(1, 101):
+        sampler.add(ravdess(2, index))
+    assert len(sampler.sample()) == 50
+    assert sampler.counts() == {("01",): 2, ("02",): 48}
+
+
+def test_more_strata_than_total_does_not_overshoot():
+    sampler = StratifiedSampler(3, seed=1, strata=("actor",))
+    for actor in range(1, 11):
+        for emotion in range(1, 3):
+            sampler.add(ravdess(emotion, actor))
+    assert len(sampler.sample()) == 3
+    assert sum(sampler.counts().values()) == 3
+
+
+def reference_sample(names, total, seed, strata=("emotion",)):
+    # The sampler without any trimming: every item of every stratum is kept
+    sampler = StratifiedSampler(total, seed, strata)
+    sampler.cap = len(names)
+    sampler.total = len(names)
+    for name in names:
+        sampler.add(name)
+    sampler.total = total
+    return sampler.sample()
+
+
+def test_memory_is_bounded_by_the_sample_size():
+    sampler = StratifiedSampler(20, seed=3, strata=("emotion", "actor"))
+    peak = 0
+    for index in range(1, 25):
+        for emotion in range(1, 9):
+            for repetition in range(1, 20):
+                sampler.add(f"01-01-{emotion:02d}-01-01-{repetition:02d}-{index:02d}.mp4")
+                peak = max(peak, sum(len(reservoir) for reservoir in sampler.reservoirs.values()))
+    assert peak <= 2 * 20 + len(sampler.reservoirs)
+    assert len(sampler.sample()) == 20
+
+
+def test_trimming_does_not_change_the_sample():
+    rng = random.Random(5)
+    for total in (1, 7, 30, 100):
+        names = [f"01-01-{rng.randint(1, 8):02d}-01-01-{index % 99 + 1:02d}-{rng.randint(1, 24):02d}.mp4"
+                 for index in range(600)]
+        names = list(dict.fromkeys(names))
+        for strata in (("emotion",), ("emotion", "actor")):
+            sampler = StratifiedSampler(total, seed=total, strata=strata)
+            for name in names:
+                sampler.add(name)
+            assert sampler.sample() == reference_sample(names, total, total, strata)
@@ -0,0 +1,38 @@
+import os
+from clip_order import load_catalog
+from clip_staging import stage_files
+
+
+def test_manifest_stays_out_of_the_clip_folder(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    for i in range(3):
+        (source / f"{i}.mp4").write_bytes(os.urandom(1000))
+    target = tmp_path / "Clips"
+
+    counts = stage_files([f"{i}.mp4" for i in range(3)], str(source), str(target), workers=2, mode='copy')
+    assert counts["copied"] == 3
+    assert sorted(os.listdir(target)) == ["0.mp4", "1.mp4", "2.mp4"]
+    assert (tmp_path / "Clips_staging_manifest.csv").exists()
+
+    counts = stage_files([f"{i}.mp4" for i in range(3)], str(source), str(target), workers=2, mode='copy')
+    assert counts["skipped"] == 3
+
+
+def test_kernel_copies_are_counted_apart_from_links(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "a.mp4").write_bytes(os.urandom(1000))
+    target = tmp_path / "Clips"
+
+    counts = stage_files(["a.mp4"], str(source), str(target), mode='auto')
+    assert counts["linked"] == 0
+    assert counts["kernel-copied"] + counts["copied"] == 1
+    counts = stage_files(["a.mp4"], str(source), str(tmp_path / "Linked"), mode='hardlink')
+    assert counts["linked"] == 1
+
+
+def test_catalog_ignores_manifest_and_partial_files(tmp_path):
+    for name in ("a.mp4", "b.mp4.part", "staging_manifest.csv"):
+        (tmp_path / name).write_bytes(b"")
+    assert load_catalog(str(tmp_path)) == ["a.mp4"]
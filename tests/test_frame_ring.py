@@ -0,0 +1,73 @@
+import queue
+import threading
+import types
+
+import pytest
+
+pytest.importorskip("PIL")
+from frame_ring import FrameRing, RingDecoder
+from tk_player import END
+
+
+def make_ring(size=(2, 2), slots=4):
+    # The ring without its decoder process; the test puts the decoder's reports into `filled`
+    ring = object.__new__(FrameRing)
+    ring.size = size
+    ring.slots = slots
+    ring.frame_bytes = size[0] * size[1] * 4
+    ring.memory = types.SimpleNamespace(buf=memoryview(bytearray(slots * ring.frame_bytes)))
+    ring.control = types.SimpleNamespace(send=lambda command: None)
+    ring.filled = queue.Queue()
+    ring.free = threading.Semaphore(0)
+    ring.generation = 0
+    ring.held = None
+    ring.peeked = None
+    return ring
+
+
+def free_slots(ring):
+    count = 0
+    while ring.free.acquire(blocking=False):
+        count += 1
+    return count
+
+
+def test_stale_frames_do_not_count():
+    ring = make_ring()
+    old = RingDecoder(ring, None)
+    old.start()
+    ring.filled.put((old.generation, 0, 0.0))
+    ring.filled.put((old.generation, 1, 0.04))
+    old.stop()
+    decoder = RingDecoder(ring, None)
+    decoder.start()
+    assert decoder.empty()
+    assert free_slots(ring) == 2
+
+
+def test_peeked_frame_is_returned_next():
+    ring = make_ring()
+    decoder = RingDecoder(ring, None)
+    decoder.start()
+    ring.filled.put((decoder.generation - 1, 3, 0.0))
+    ring.filled.put((decoder.generation, 0, 0.5))
+    ring.filled.put((decoder.generation, None, None))
+    assert not decoder.empty()
+    assert not decoder.empty()
+    pts, _ = decoder.get_nowait()
+    assert pts == 0.5
+    assert not decoder.empty()
+    assert decoder.get_nowait() is END
+    assert decoder.empty()
+    with pytest.raises(queue.Empty):
+        decoder.get_nowait()
+
+
+def test_peeked_frame_is_released_by_the_next_clip():
+    ring = make_ring()
+    decoder = RingDecoder(ring, None)
+    decoder.start()
+    ring.filled.put((decoder.generation, 2, 0.0))
+    assert not decoder.empty()
+    RingDecoder(ring, None).start()
+    assert free_slots(ring) == 1
@@ -0,0 +1,61 @@
+import csv
+import os
+
+from label_journal import LabelJournal
+
+
+def test_append_then_replay(tmp_path):
+    journal = LabelJournal(str(tmp_path), compact_every=0, sync=False)
+    journal.append("a.mp4", "Wut", "None", "Angst")
+    journal.append("b, c.mp4", "Freude", "Trauer", "None")
+    journal.append("a.mp4", "Ekel", "None", "None")
+    journal.close()
+    assert LabelJournal(str(tmp_path)).replay() == {
+        "a.mp4": ("Ekel", "None", "None"),
+        "b, c.mp4": ("Freude", "Trauer", "None"),
+    }
+
+
+def test_torn_last_record_is_skipped_and_cut_off(tmp_path):
+    journal = LabelJournal(str(tmp_path), compact_every=0, sync=False)
+    journal.append("a.mp4", "Wut", "None", "None")
+    journal.close()
+    valid_size = os.path.getsize(journal.journal_path)
+    with open(journal.journal_path, 'a', encoding='utf-8') as f:
+        f.write(LabelJournal.encode("b.mp4", "Angst", "None", "None")[:-6])
+    assert journal.replay() == {"a.mp4": ("Wut", "None", "None")}
+    assert os.path.getsize(journal.journal_path) == valid_size
+
+
+def test_corrupted_record_stops_the_replay(tmp_path):
+    journal = LabelJournal(str(tmp_path), compact_every=0, sync=False)
+    journal.append("a.mp4", "Wut", "None", "None")
+    journal.close()
+    record = LabelJournal.encode("b.mp4", "Angst", "None", "None").replace("Angst", "Angsx")
+    with open(journal.journal_path, 'a', encoding='utf-8') as f:
+        f.write(record)
+    assert LabelJournal.decode(record) is None
+    assert journal.replay() == {"a.mp4": ("Wut", "None", "None")}
+
+
+def test_appending_after_truncation_recovers(tmp_path):
+    journal = LabelJournal(str(tmp_path), compact_every=0, sync=False)
+    journal.append("a.mp4", "Wut", "None", "None")
+    journal.close()
+    with open(journal.journal_path, 'a', encoding='utf-8') as f:
+        f.write("0badc0de torn")
+    journal.replay()
+    journal.append("b.mp4", "Angst", "None", "None")
+    journal.close()
+    assert journal.replay() == {"a.mp4": ("Wut", "None", "None"), "b.mp4": ("Angst", "None", "None")}
+
+
+def test_compact_folds_the_journal_into_clips_csv(tmp_path):
+    with open(tmp_path / "clips.csv", 'w', newline='') as f:
+        csv.writer(f).writerows([["a.mp4", "False", "", "", ""], ["b.mp4", "False", "", "", ""]])
+    journal = LabelJournal(str(tmp_path), compact_every=0, sync=False)
+    journal.append("b.mp4", "Wut", "None", "Angst")
+    journal.compact()
+    with open(tmp_path / "clips.csv", newline='') as f:
+        assert list(csv.reader(f)) == [["a.mp4", "False", "", "", ""], ["b.mp4", "True", "Wut", "None", "Angst"]]
+    assert not os.path.exists(journal.journal_path)
@@ -0,0 +1,131 @@
+import csv
+import os
+import sqlite3
+import threading
+
+from clip_order import ClipOrder, read_catalog, read_seed
+from label_store import LabelStore
+
+
+def test_saved_label_is_loaded_again(tmp_path):
+    db_path = str(tmp_path / "labels.db")
+    store = LabelStore(db_path)
+    store.create_user("anna", ["c.mp4", "a.mp4", "b.mp4"])
+    store.save_label("anna", "a.mp4", "Wut", "None", "Scham")
+    store.close()
+
+    store = LabelStore(db_path)
+    assert store.pending_clips("anna") == ["c.mp4", "b.mp4"]
+    assert store.next_pending_clip("anna") == "c.mp4"
+    assert list(store.rows("anna")) == [
+        ["c.mp4", "False", "None", "None", "None"],
+        ["a.mp4", "True", "Wut", "None", "Scham"],
+        ["b.mp4", "False", "None", "None", "None"],
+    ]
+    store.close()
+
+
+def test_registering_a_user_twice_keeps_the_labels(tmp_path):
+    store = LabelStore(str(tmp_path / "labels.db"))
+    store.create_user("anna", ["a.mp4", "b.mp4"])
+    store.save_label("anna", "a.mp4", "Wut", "None", "None")
+    store.create_user("anna", ["a.mp4", "b.mp4"])
+    assert store.usernames() == ["anna"]
+    assert store.pending_clips("anna") == ["b.mp4"]
+    assert list(store.rows("anna"))[0] == ["a.mp4", "True", "Wut", "None", "None"]
+    store.close()
+
+
+def test_concurrent_writers_on_two_connections(tmp_path):
+    db_path = str(tmp_path / "labels.db")
+    clips = {name: [f"{name}-{index}.mp4" for index in range(50)] for name in ("anna", "ben")}
+    setup = LabelStore(db_path)
+    for username, filenames in clips.items():
+        setup.create_user(username, filenames)
+    setup.close()
+
+    errors = []
+
+    def label_all(username):
+        store = LabelStore(db_path, check_same_thread=False)
+        try:
+            for filename in clips[username]:
+                store.save_label(username, filename, "Freude", "None", "None")
+        except Exception as error:
+            errors.append(error)
+        finally:
+            store.close()
+
+    threads = [threading.Thread(target=label_all, args=(username,)) for username in clips]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    store = LabelStore(db_path)
+    for username, filenames in clips.items():
+        assert store.pending_clips(username) == []
+        assert [row[0] for row in store.rows(username)] == filenames
+    store.close()
+
+
+def test_seeded_users_share_one_catalog_snapshot(tmp_path):
+    catalog = [f"{i:03d}.mp4" for i in range(30)]
+    store = LabelStore(str(tmp_path / "labels.db"))
+    store.create_seeded_user("anna", catalog, 7)
+    store.create_seeded_user("ben", list(catalog), 8)
+    # Only the seed and the snapshot id per user, no row per clip
+    assert store.connection.execute("SELECT COUNT(*) FROM catalogs").fetchone() == (1,)
+    assert store.connection.execute("SELECT COUNT(*) FROM labels").fetchone() == (0,)
+    assert store.clip_order("anna") == (catalog, 7)
+
+    order = list(ClipOrder(catalog, 7).filenames())
+    store.save_label("anna", order[0], "Wut", "None", "None")
+    store.save_label("anna", order[3], "Ekel", "None", "None")
+    assert store.next_pending_clip("anna") == order[1]
+    assert store.pending_clips("anna") == [name for name in order if name not in (order[0], order[3])]
+    assert store.labeled_clips("anna") == {order[0], order[3]}
+    assert [row[0] for row in store.rows("anna")] == [order[0], order[3]]
+    assert len(store.pending_clips("ben")) == 30
+
+    store.create_seeded_user("anna", catalog, 7)
+    assert store.labeled_clips("anna") == {order[0], order[3]}
+    store.close()
+
+
+def test_seeded_users_are_exported_and_imported_with_seed_and_snapshot(tmp_path):
+    catalog = [f"{i:03d}.mp4" for i in range(10)]
+    store = LabelStore(str(tmp_path / "labels.db"))
+    store.create_seeded_user("anna", catalog, 7)
+    store.save_label("anna", catalog[4], "Freude", "None", "Scham")
+    store.export_folder(str(tmp_path / "users"))
+    store.close()
+
+    user_folder = str(tmp_path / "users" / "anna")
+    assert read_seed(user_folder) == 7
+    assert read_catalog(user_folder) == catalog
+    with open(os.path.join(user_folder, "clips.csv"), newline='') as f:
+        assert list(csv.reader(f)) == [[catalog[4], "True", "Freude", "None", "Scham"]]
+
+    imported = LabelStore(str(tmp_path / "imported.db"))
+    assert imported.import_folder(str(tmp_path / "users")) == ["anna"]
+    assert imported.clip_order("anna") == (catalog, 7)
+    assert imported.labeled_clips("anna") == {catalog[4]}
+    imported.close()
+
+
+def test_database_from_before_seeded_users_is_upgraded(tmp_path):
+    db_path = str(tmp_path / "labels.db")
+    connection = sqlite3.connect(db_path)
+    connection.executescript("""
+        CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+        INSERT INTO users(name) VALUES ('anna');
+    """)
+    connection.close()
+
+    store = LabelStore(db_path)
+    assert store.clip_order("anna") is None
+    store.create_seeded_user("ben", ["a.mp4", "b.mp4"], 1)
+    assert sorted(store.pending_clips("ben")) == ["a.mp4", "b.mp4"]
+    store.close()
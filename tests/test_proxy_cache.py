@@ -0,0 +1,65 @@
+import os
+import sys
+from proxy_cache import ProxyIndex, build_proxies, proxy_folder
+
+
+def fake_ffmpeg(folder):
+    # Copies the input to the output, enough for the index bookkeeping
+    path = folder / "ffmpeg"
+    path.write_text(f"#!{sys.executable}\n"
+                    "import sys, shutil\n"
+                    "args = sys.argv[1:]\n"
+                    "shutil.copyfile(args[args.index('-i') + 1], args[-1])\n")
+    path.chmod(0o755)
+    return str(path)
+
+
+def test_equal_names_in_different_folders_and_changed_sources(tmp_path):
+    for folder, content in (("Testset/a", b"first"), ("Testset/b", b"second")):
+        (tmp_path / folder).mkdir(parents=True)
+        (tmp_path / folder / "clip.mp4").write_bytes(content)
+    proxy_dir = proxy_folder(str(tmp_path), "video")
+    counts = build_proxies(str(tmp_path / "Testset"), proxy_dir, "video", workers=2, ffmpeg=fake_ffmpeg(tmp_path))
+    assert counts == {'transcoded': 2, 'reused': 0, 'failed': 0}
+
+    index = ProxyIndex(proxy_dir)
+    first, second = (str(tmp_path / folder / "clip.mp4") for folder in ("Testset/a", "Testset/b"))
+    assert open(index.resolve(first), 'rb').read() == b"first"
+    assert open(index.resolve(second), 'rb').read() == b"second"
+
+    with open(first, 'wb') as f:
+        f.write(b"replaced")
+    os.utime(first, ns=(1, 1))
+    assert index.resolve(first) == first
+
+
+def test_paths_without_proxies_resolve_to_themselves(tmp_path):
+    index = ProxyIndex(proxy_folder(str(tmp_path), "video"))
+    assert index.resolve("Testset/x.mp4") == "Testset/x.mp4"
+
+
+def test_duplicates_are_transcoded_once_and_failures_do_not_stop_the_batch(tmp_path):
+    ffmpeg = tmp_path / "ffmpeg"
+    # Fails for clips named bad*, counts its runs in runs.txt
+    ffmpeg.write_text(f"#!{sys.executable}\n"
+                      "import os, sys, shutil\n"
+                      "args = sys.argv[1:]\n"
+                      "source = args[args.index('-i') + 1]\n"
+                      f"open({str(tmp_path / 'runs.txt')!r}, 'a').write(source + '\\n')\n"
+                      "if os.path.basename(source).startswith('bad'):\n"
+                      "    sys.exit('kaputt')\n"
+                      "shutil.copyfile(source, args[-1])\n")
+    ffmpeg.chmod(0o755)
+    clips = tmp_path / "Clips"
+    clips.mkdir()
+    for index in range(6):
+        (clips / f"copy{index}.mp4").write_bytes(b"same content")
+    (clips / "bad.mp4").write_bytes(b"broken")
+    proxy_dir = proxy_folder(str(tmp_path), "labeling")
+    counts = build_proxies(str(clips), proxy_dir, "labeling", workers=4, ffmpeg=str(ffmpeg))
+    assert counts == {'transcoded': 1, 'reused': 5, 'failed': 1}
+    assert len((tmp_path / "runs.txt").read_text().splitlines()) == 2
+    assert [name for name in os.listdir(proxy_dir) if name.endswith('.part.mp4')] == []
+    index = ProxyIndex(proxy_dir)
+    assert index.resolve(str(clips / "copy3.mp4")) != str(clips / "copy3.mp4")
+    assert index.resolve(str(clips / "bad.mp4")) == str(clips / "bad.mp4")
@@ -0,0 +1,42 @@
+import os
+import shutil
+import threading
+
+from read_ahead import ReadAheadCache
+
+
+def test_deferred_waits_for_the_copy(tmp_path, monkeypatch):
+    clip = tmp_path / "share" / "a.mp4"
+    clip.parent.mkdir()
+    clip.write_bytes(b"clip")
+    copy_started, copy_allowed = threading.Event(), threading.Event()
+    copyfile = shutil.copyfile
+
+    def slow_copy(source, target):
+        copy_started.set()
+        copy_allowed.wait(5)
+        return copyfile(source, target)
+
+    monkeypatch.setattr(shutil, "copyfile", slow_copy)
+    cache = ReadAheadCache(spool_folder=str(tmp_path / "spool"))
+    frames = cache.deferred(lambda path: path, str(clip))
+    cache.prefetch([str(clip)])
+    assert copy_started.wait(5)
+
+    opened = []
+    thread = threading.Thread(target=lambda: opened.append(frames()))
+    thread.start()
+    thread.join(0.2)
+    assert opened == []
+    copy_allowed.set()
+    thread.join(5)
+    assert os.path.dirname(opened[0]) == str(tmp_path / "spool")
+    cache.close()
+
+
+def test_deferred_without_read_ahead_uses_the_clip(tmp_path):
+    clip = tmp_path / "a.mp4"
+    clip.write_bytes(b"clip")
+    cache = ReadAheadCache()
+    assert cache.deferred(lambda path: path, str(clip))() == str(clip)
+    assert cache.trials == []
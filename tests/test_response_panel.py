@@ -0,0 +1,48 @@
+import pytest
+
+pytest.importorskip("PyQt5.QtWidgets")
+
+from response_panel import BASIC_EMOTIONS, ResponsePanel
+
+
+def test_click_selects_and_emits(qapp):
+    panel = ResponsePanel(BASIC_EMOTIONS, columns=3, selectable=True)
+    answers = []
+    panel.selected.connect(answers.append)
+    panel.buttons[1].click()
+    panel.buttons[3].click()
+    assert answers == ["Freude", "Wut"]
+    assert panel.selection() == "Wut"
+    assert [button.isChecked() for button in panel.buttons] == [False, False, False, True, False, False]
+
+
+def test_reset_clears_the_checked_button(qapp):
+    panel = ResponsePanel(BASIC_EMOTIONS, columns=3, selectable=True)
+    panel.select("Ekel")
+    assert panel.selection() == "Ekel"
+    panel.reset()
+    assert panel.selection() is None
+    assert not any(button.isChecked() for button in panel.buttons)
+    # The group is exclusive again after the reset
+    panel.buttons[0].click()
+    panel.buttons[2].click()
+    assert [button.isChecked() for button in panel.buttons] == [False, False, True, False, False, False]
+
+
+def test_disabled_panel_ignores_clicks(qapp):
+    panel = ResponsePanel(BASIC_EMOTIONS, columns=3, selectable=True)
+    answers = []
+    panel.selected.connect(answers.append)
+    panel.setEnabled(False)
+    panel.buttons[0].click()
+    assert answers == []
+    assert panel.selection() is None
+
+
+def test_plain_buttons_are_not_checkable(qapp):
+    panel = ResponsePanel(["Ja", "Nein"])
+    answers = []
+    panel.selected.connect(answers.append)
+    panel.buttons[1].click()
+    assert answers == ["Nein"]
+    assert panel.selection() is None
@@ -0,0 +1,62 @@
+import atexit
+import os
+
+from trial_engine import SessionLog, TrialEngine
+
+
+def start(folder, name, stimuli, answers):
+    engine = TrialEngine.open_session(str(folder), name, lambda: list(stimuli), background=False)
+    for answer in answers:
+        engine.next_trial()
+        engine.respond(answer)
+    engine.log.close()
+    return engine
+
+
+def age(path, seconds):
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime - seconds, stat.st_mtime - seconds))
+
+
+def test_unfinished_session_is_resumed(tmp_path):
+    start(tmp_path, "test", ["a", "b", "c"], ["Wut"])
+    engine = TrialEngine.open_session(str(tmp_path), "test", lambda: ["x"], background=False)
+    assert engine.stimuli == ["a", "b", "c"]
+    assert engine.responses == [("a", "Wut")]
+    assert engine.next_trial() == "b"
+    engine.log.close()
+
+
+def test_declined_session_starts_a_new_one(tmp_path):
+    old = start(tmp_path, "test", ["a", "b", "c"], ["Wut"])
+    age(old.log.path, 60)
+    asked = []
+
+    def confirm(log):
+        asked.append(len(log.responses))
+        return False
+
+    engine = TrialEngine.open_session(str(tmp_path), "test", lambda: ["x", "y"], confirm=confirm, background=False)
+    assert asked == [1]
+    assert engine.stimuli == ["x", "y"] and engine.responses == []
+    engine.log.close()
+
+    # The declined session is older than the new one and is not offered again
+    assert SessionLog.find_unfinished(str(tmp_path), "test").stimuli == ["x", "y"]
+
+
+def test_only_the_newest_log_is_considered(tmp_path):
+    unfinished = start(tmp_path, "test", ["a", "b"], ["Wut"])
+    age(unfinished.log.path, 60)
+    start(tmp_path, "test", ["c"], ["Angst"])
+    assert SessionLog.find_unfinished(str(tmp_path), "test") is None
+
+
+def test_scanned_logs_are_not_registered_at_exit(tmp_path, monkeypatch):
+    start(tmp_path, "test", ["a", "b"], ["Wut"])
+    registered = []
+    monkeypatch.setattr(atexit, "register", registered.append)
+    log = SessionLog.find_unfinished(str(tmp_path), "test")
+    assert registered == []
+    log.resume()
+    assert registered == [log.close]
@@ -0,0 +1,77 @@
+import pytest
+
+pytest.importorskip("PyQt5.QtMultimedia")
+
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtMultimedia import QMediaPlayer
+
+from trial_state import LOADING, PLAYING, RESPONSE, SAVING, TrialStateMachine
+
+
+class FakePlayer:
+    def __init__(self, state=QMediaPlayer.StoppedState):
+        self._state = state
+
+    def state(self):
+        return self._state
+
+
+class FakePool(QObject):
+    stateChanged = pyqtSignal(int)
+    mediaStatusChanged = pyqtSignal(int)
+
+
+def make_machine(opens):
+    pool = FakePool()
+    machine = TrialStateMachine(None, pool, opens=opens)
+    events = []
+    machine.responseWindowOpened.connect(lambda: events.append("opened"))
+    machine.responseWindowClosed.connect(lambda: events.append("closed"))
+    return pool, machine, events
+
+
+def test_buttons_stay_disabled_until_playback_finished(qapp):
+    pool, machine, events = make_machine("end")
+    machine.start_trial(FakePlayer())
+    assert machine.state == LOADING
+    assert events == ["closed"]
+
+    pool.stateChanged.emit(QMediaPlayer.PlayingState)
+    assert machine.state == PLAYING
+    assert "opened" not in events
+    assert not machine.respond()
+
+    pool.mediaStatusChanged.emit(QMediaPlayer.EndOfMedia)
+    assert machine.state == RESPONSE
+    assert events == ["closed", "opened"]
+
+
+def test_window_opens_when_playback_starts(qapp):
+    pool, machine, events = make_machine("start")
+    machine.start_trial(FakePlayer(QMediaPlayer.PlayingState))
+    assert machine.state == RESPONSE
+    assert events == ["closed", "opened"]
+
+
+def test_only_the_first_answer_counts(qapp):
+    pool, machine, events = make_machine("start")
+    machine.start_trial(FakePlayer(QMediaPlayer.PlayingState))
+    assert machine.respond()
+    assert machine.state == SAVING
+    assert not machine.respond()
+    assert events == ["closed", "opened", "closed"]
+
+
+def test_end_of_an_earlier_clip_does_not_open_the_next_trial(qapp):
+    pool, machine, events = make_machine("end")
+    machine.start_trial(FakePlayer())
+    pool.mediaStatusChanged.emit(QMediaPlayer.EndOfMedia)
+    assert machine.state == LOADING
+    assert "opened" not in events
+
+
+def test_broken_clip_opens_the_window(qapp):
+    pool, machine, events = make_machine("end")
+    machine.start_trial(FakePlayer())
+    pool.mediaStatusChanged.emit(QMediaPlayer.InvalidMedia)
+    assert machine.state == RESPONSE
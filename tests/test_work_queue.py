@@ -0,0 +1,166 @@
+import threading
+from work_queue import WorkQueue, WorkQueueServer, WorkQueueClient, LoopbackClient
+
+LABELS = ("Freude", "None", "None")
+
+
+def test_lease_hands_out_each_clip_once_per_user():
+    queue = WorkQueue(["a.mp4", "b.mp4", "c.mp4"], target=2)
+    lease_id, clips = queue.lease("anna", count=2, now=0)
+    assert clips == ["a.mp4", "b.mp4"]
+    _, more = queue.lease("anna", count=5, now=0)
+    assert more == ["c.mp4"]
+    assert queue.lease("anna", count=5, now=0) == (None, [])
+    _, other = queue.lease("ben", count=5, now=0)
+    assert sorted(other) == ["a.mp4", "b.mp4", "c.mp4"]
+
+
+def test_expired_lease_returns_its_clips():
+    queue = WorkQueue(["a.mp4", "b.mp4"], target=1, lease_seconds=10)
+    queue.lease("anna", count=2, now=0)
+    assert queue.lease("ben", count=2, now=5) == (None, [])
+    _, clips = queue.lease("ben", count=2, now=11)
+    assert sorted(clips) == ["a.mp4", "b.mp4"]
+
+
+def test_renew_keeps_the_lease():
+    queue = WorkQueue(["a.mp4"], target=1, lease_seconds=10)
+    lease_id, _ = queue.lease("anna", now=0)
+    assert queue.renew(lease_id, now=8)
+    assert queue.lease("ben", now=15) == (None, [])
+    assert queue.commit(lease_id, "a.mp4", *LABELS, now=17)
+    assert not queue.renew(lease_id, now=18)
+
+
+def test_repeated_commit_is_counted_once():
+    queue = WorkQueue(["a.mp4", "b.mp4"], target=1)
+    lease_id, _ = queue.lease("anna", count=2, now=0)
+    assert queue.commit(lease_id, "a.mp4", *LABELS, user="anna", now=1)
+    assert queue.commit(lease_id, "a.mp4", *LABELS, user="anna", now=2)
+    assert not queue.commit(lease_id, "a.mp4", "Wut", "None", "None", user="anna", now=3)
+    assert queue.stats()["commits"] == 1
+    assert queue.label_counts["a.mp4"] == 1
+
+
+def test_commit_of_a_finished_lease_can_be_sent_again():
+    # The reply to the last commit got lost and the client sends it again
+    queue = WorkQueue(["a.mp4"], target=1, lease_seconds=10)
+    lease_id, _ = queue.lease("anna", now=0)
+    assert queue.commit(lease_id, "a.mp4", *LABELS, user="anna", now=1)
+    assert queue.commit(lease_id, "a.mp4", *LABELS, user="anna", now=30)
+    assert queue.stats()["commits"] == 1
+
+
+def test_lease_does_not_walk_over_clips_seen_before():
+    queue = WorkQueue([f"{i}.mp4" for i in range(100)], target=2)
+    lease_id, first = queue.lease("anna", count=50, now=0)
+    for clip in first:
+        queue.commit(lease_id, clip, *LABELS, now=1)
+    assert queue.cursors["anna"] == 50
+    _, second = queue.lease("anna", count=50, now=2)
+    assert second == [f"{i}.mp4" for i in range(50, 100)]
+    assert queue.cursors["anna"] == 100
+    assert queue.lease("anna", now=3) == (None, [])
+    _, other = queue.lease("ben", count=100, now=4)
+    assert sorted(other) == sorted(first + second)
+    assert queue.stats()["ready"] == 0
+
+
+def test_released_clip_is_offered_to_the_same_user_again():
+    queue = WorkQueue(["a.mp4", "b.mp4"], target=2, lease_seconds=10)
+    queue.lease("anna", count=1, now=0)
+    queue.lease("ben", count=2, now=1)
+    # anna's cursor is past the offer of a.mp4 that ben's lease left behind
+    assert queue.lease("anna", count=2, now=10.5)[1] == ["b.mp4", "a.mp4"]
+
+
+def test_stale_offers_are_compacted():
+    queue = WorkQueue([f"{i}.mp4" for i in range(20)], target=1)
+    queue.COMPACT_AFTER = 4
+    for user in ("anna", "ben", "carla"):
+        queue.lease(user, count=5, now=0)
+    _, clips = queue.lease("dora", count=10, now=0)
+    assert clips == [f"{i}.mp4" for i in range(15, 20)]
+    assert len(queue.offers) < 20
+    assert all(queue.offers[position] == clip for clip, position in queue.offered.items())
+
+
+def test_commit_after_expiry_reclaims_a_free_clip():
+    queue = WorkQueue(["a.mp4", "b.mp4"], target=1, lease_seconds=10)
+    lease_id, _ = queue.lease("anna", count=2, now=0)
+    assert not queue.commit(lease_id, "a.mp4", *LABELS, now=20)
+    assert queue.commit(lease_id, "a.mp4", *LABELS, user="anna", now=20)
+    _, clips = queue.lease("ben", count=2, now=21)
+    assert clips == ["b.mp4"]
+
+
+def test_commit_after_expiry_fails_once_the_clip_was_given_away():
+    queue = WorkQueue(["a.mp4"], target=1, lease_seconds=10)
+    lease_id, _ = queue.lease("anna", now=0)
+    queue.lease("ben", now=20)
+    assert not queue.commit(lease_id, "a.mp4", *LABELS, user="anna", now=21)
+
+
+def test_labels_are_replayed_after_a_restart(tmp_path):
+    labels_path = str(tmp_path / "queue_labels.csv")
+    queue = WorkQueue(["a.mp4", "b.mp4"], target=1, labels_path=labels_path)
+    lease_id, _ = queue.lease("anna", count=1, now=0)
+    queue.commit(lease_id, "a.mp4", *LABELS, now=1)
+    queue.close()
+    restarted = WorkQueue(["a.mp4", "b.mp4"], target=1, labels_path=labels_path)
+    assert restarted.lease("ben", count=2, now=0)[1] == ["b.mp4"]
+    restarted.close()
+
+
+def test_loopback_client():
+    client = LoopbackClient(WorkQueue(["a.mp4"], target=1))
+    lease_id, clips = client.lease("anna")
+    assert clips == ["a.mp4"]
+    assert client.renew(lease_id)
+    assert client.commit(lease_id, "a.mp4", *LABELS, user="anna")
+
+
+def test_http_client_from_two_threads():
+    server = WorkQueueServer(("127.0.0.1", 0), WorkQueue([f"{i}.mp4" for i in range(20)], target=1))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = WorkQueueClient(f"http://127.0.0.1:{server.server_address[1]}")
+    try:
+        lease_id, clips = client.lease("anna", count=20)
+        results = []
+        worker = threading.Thread(target=lambda: results.extend(
+            client.commit(lease_id, clip, *LABELS, user="anna") for clip in clips[:10]))
+        worker.start()
+        for clip in clips[10:]:
+            assert client.commit(lease_id, clip, *LABELS, user="anna")
+        worker.join()
+        assert results == [True] * 10
+        assert len(client.connections) == 2
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+
+
+def test_http_commit_sent_again_after_a_lost_reply():
+    server = WorkQueueServer(("127.0.0.1", 0), WorkQueue(["a.mp4"], target=1))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = WorkQueueClient(f"http://127.0.0.1:{server.server_address[1]}")
+    try:
+        lease_id, _ = client.lease("anna")
+        assert client.commit(lease_id, "a.mp4", *LABELS, user="anna")
+        assert client.commit(lease_id, "a.mp4", *LABELS, user="anna")
+        assert server.queue.stats()["commits"] == 1
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+
+
+def test_unreachable_server_raises_oserror():
+    client = WorkQueueClient("http://127.0.0.1:9", timeout=1)
+    try:
+        client.lease("anna")
+    except OSError:
+        pass
+    else:
+        raise AssertionError("lease on a closed port succeeded")